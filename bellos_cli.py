@@ -0,0 +1,176 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import sys, json, argparse, threading
+from typing import Optional, List
+
+from gui.script_manager import ScriptManager, ScriptJob
+
+class BatchRunner:
+    def __init__(self, script_manager: ScriptManager, summary, output):
+        self.script_manager = script_manager
+        self.summary = summary
+        self.output = output
+        self.remaining = 0
+        self.failed = False
+        self.output_lock = threading.Lock()
+        self.all_done = threading.Event()
+        self.script_manager.add_job_listener(self.on_job_updated)
+
+    def run(self, scripts: List[str], cwd: Optional[str] = None, timeout: Optional[int] = None,
+            limits: Optional[dict] = None) -> bool:
+        self.all_done.clear()
+        jobs = []
+        for script in scripts:
+            try:
+                with open(script, 'r') as f:
+                    script_content = f.read()
+            except Exception as e:
+                self.write_output(script, f"Error: {str(e)}", "stderr")
+                self.write_summary({"script": script, "status": "failed", "exit_code": None, "duration": 0.0})
+                self.failed = True
+                continue
+            jobs.append((script, script_content))
+
+        if not jobs:
+            return not self.failed
+
+        # Fast scripts can finish before submit_job returns, so the count is set up front
+        self.remaining = len(jobs)
+        for script, script_content in jobs:
+            self.script_manager.submit_job(script_content, cwd=cwd, timeout=timeout,
+                                           on_output=self.on_job_output, name=script, limits=limits)
+
+        try:
+            # Waiting in slices keeps Ctrl+C deliverable to the main thread
+            while not self.all_done.wait(0.2):
+                pass
+        except KeyboardInterrupt:
+            self.script_manager.kill_all_processes()
+            self.all_done.wait()
+            raise
+        return not self.failed
+
+    def on_job_output(self, job: ScriptJob, text: str, stream: str):
+        self.write_output(job.name, text, stream)
+
+    def on_job_updated(self, job: ScriptJob):
+        # Listeners run under the scheduler lock, one job update at a time
+        if job.on_output == self.on_job_output and job.status not in ("queued", "running"):
+            self.record(job)
+            self.remaining -= 1
+            if self.remaining == 0:
+                self.all_done.set()
+
+    def record(self, job: ScriptJob):
+        if job.status != "finished" or job.exit_code != 0:
+            self.failed = True
+        wall_time = job.wall_time
+        record = {
+            "script": job.name,
+            "status": job.status,
+            "exit_code": job.exit_code,
+            "duration": round(wall_time, 3) if wall_time is not None else 0.0
+        }
+        if job.metrics is not None:
+            record.update(user_time=job.metrics.user_time, system_time=job.metrics.system_time,
+                          peak_rss_kb=job.metrics.peak_rss_kb, stdout_bytes=job.metrics.stdout_bytes,
+                          stderr_bytes=job.metrics.stderr_bytes)
+        self.write_summary(record)
+
+    def write_output(self, name: str, text: str, stream: str):
+        # Every line carries its script's name so parallel output stays attributable
+        prefix = f"[{name}] "
+        target = self.output if stream == "stdout" else sys.stderr
+        with self.output_lock:
+            target.write(prefix + text.replace("\n", "\n" + prefix) + "\n")
+            target.flush()
+
+    def write_summary(self, record: dict):
+        with self.output_lock:
+            self.summary.write(json.dumps(record) + "\n")
+            self.summary.flush()
+
+
+def validate_scripts(script_manager: ScriptManager, scripts: List[str], summary) -> bool:
+    results = script_manager.validator.validate_files(scripts)
+    for script in scripts:
+        summary.write(json.dumps(dict(script=script, **results[script].to_dict())) + "\n")
+    summary.flush()
+    return all(result.valid for result in results.values())
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="bellos_manager.py",
+                                     description="Run or validate Bellos scripts without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run scripts in parallel")
+    run_parser.add_argument("scripts", nargs="+")
+    run_parser.add_argument("--cwd", help="Working directory for every script")
+    run_parser.add_argument("--timeout", type=int,
+                            help="Seconds before a script is killed, 0 disables (default: from settings)")
+    run_parser.add_argument("--cpu-limit", type=int, metavar="SECONDS", help="CPU time limit per script")
+    run_parser.add_argument("--memory-limit", type=int, metavar="MB", help="Address space limit per script")
+    run_parser.add_argument("--open-files-limit", type=int, metavar="N", help="Open file limit per script")
+    run_parser.add_argument("--max-output", type=int, metavar="BYTES",
+                            help="Stop a script once it has written this much output")
+    run_parser.add_argument("--warm-pool", type=int, metavar="N",
+                            help="Keep N interpreters running and feed scripts to them, 0 disables "
+                                 "(default: from settings)")
+
+    validate_parser = commands.add_parser("validate", help="Check scripts for syntax errors")
+    validate_parser.add_argument("scripts", nargs="+")
+
+    for command_parser in (run_parser, validate_parser):
+        command_parser.add_argument("-j", "--jobs", type=int, help="Scripts handled at once (default: from settings)")
+        command_parser.add_argument("--shell", help="Interpreter to use (default: from settings)")
+        command_parser.add_argument("--summary", default="-",
+                                    help="JSON Lines summary file, '-' for stdout (default), "
+                                         "in which case script stdout goes to stderr")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    script_manager = ScriptManager()
+    if args.shell:
+        script_manager.settings["default_shell"] = args.shell
+    if args.jobs:
+        script_manager.set_max_concurrency(args.jobs)
+        script_manager.validator.max_workers = args.jobs
+
+    summary = sys.stdout if args.summary == "-" else open(args.summary, 'w')
+    output = sys.stderr if summary is sys.stdout else sys.stdout
+    try:
+        if args.command == "validate":
+            ok = validate_scripts(script_manager, args.scripts, summary)
+        else:
+            limits = {"cpu_seconds": args.cpu_limit, "address_space_mb": args.memory_limit,
+                      "open_files": args.open_files_limit, "max_output_bytes": args.max_output}
+            limits = {key: value for key, value in limits.items() if value is not None}
+            if args.warm_pool is not None:
+                script_manager.settings["warm_pool_size"] = args.warm_pool
+            ok = BatchRunner(script_manager, summary, output).run(args.scripts, cwd=args.cwd, timeout=args.timeout,
+                                                                  limits=limits)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        script_manager.close_warm_pool()
+        if summary is not sys.stdout:
+            summary.close()
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
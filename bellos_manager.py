@@ -17,10 +17,15 @@
 
 import sys
 
-from PyQt6.QtWidgets import QApplication
-from gui.bellos_main_window import BellosMainWindow
-
 def main():
+    # The run and validate commands are headless and never load PyQt
+    if len(sys.argv) > 1 and sys.argv[1] in ("run", "validate"):
+        from bellos_cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from PyQt6.QtWidgets import QApplication
+    from gui.bellos_main_window import BellosMainWindow
+
     app = QApplication(sys.argv)
     window = BellosMainWindow()
     window.show()
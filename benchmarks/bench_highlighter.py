@@ -0,0 +1,78 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Full-document rehighlight time: per-rule legacy highlighter against BellosSyntaxHighlighter
+# Usage: python3 benchmarks/bench_highlighter.py [lines ...]
+
+import os, sys, time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QRegularExpression
+from PyQt6.QtGui import QSyntaxHighlighter, QTextCharFormat, QTextDocument, QColor
+
+from gui.script_editor import BellosSyntaxHighlighter
+
+class LegacyHighlighter(QSyntaxHighlighter):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        text_format = QTextCharFormat()
+        text_format.setForeground(QColor("#569CD6"))
+        self.highlighting_rules = [(f"\\b{word}\\b", text_format) for word in BellosSyntaxHighlighter.KEYWORDS]
+        self.highlighting_rules.append((r'"[^"\\]*(\\.[^"\\]*)*"', text_format))
+        self.highlighting_rules.append((r"#[^\n]*", text_format))
+
+    def highlightBlock(self, text):
+        for pattern, text_format in self.highlighting_rules:
+            expression = QRegularExpression(pattern)
+            match_iterator = expression.globalMatch(text)
+            while match_iterator.hasNext():
+                match = match_iterator.next()
+                self.setFormat(match.capturedStart(), match.capturedLength(), text_format)
+
+def generate_script(lines):
+    template = [
+        "# maintenance step {0}",
+        "export STEP_{0}=\"value {0} # not a comment\"",
+        "for item in $(ls /tmp); do",
+        "    if [ -f \"$item\" ]; then echo \"file $item\"; else echo skipped; fi",
+        "done",
+        "while read line; do echo \"$line\"; done < input_{0}.txt",
+    ]
+    return "\n".join(template[i % len(template)].format(i) for i in range(lines))
+
+def bench(highlighter_class, text):
+    document = QTextDocument()
+    document.setPlainText(text)
+    highlighter = highlighter_class(document)
+    start = time.perf_counter()
+    highlighter.rehighlight()
+    return time.perf_counter() - start
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [5000, 50000]
+    for lines in sizes:
+        text = generate_script(lines)
+        legacy = bench(LegacyHighlighter, text)
+        current = bench(BellosSyntaxHighlighter, text)
+        print(f"{lines:>8} lines  legacy {legacy:7.3f}s  current {current:7.3f}s  speedup {legacy / current:5.1f}x")
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv[:1])
+    main()
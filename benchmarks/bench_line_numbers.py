@@ -0,0 +1,94 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Per-frame cost of scrolling with the line number gutter: a gutter that walks the document from its
+# first block against ScriptEditor's, which starts at the first visible block
+# Usage: python3 benchmarks/bench_line_numbers.py [lines ...]
+
+import os, sys, time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor, QPainter
+
+from gui.script_editor import ScriptEditor
+
+FRAMES = 200
+
+# The legacy gutter costs seconds per frame on large documents, so it gets a few frames and a size cap
+LEGACY_FRAMES = 5
+LEGACY_MAX_LINES = 100000
+
+class LegacyGutterEditor(ScriptEditor):
+    def line_number_area_paint_event(self, event):
+        painter = QPainter(self.line_number_area)
+        painter.fillRect(event.rect(), QColor("#F0F0F0"))
+        block = self.document().begin()
+        width = self.line_number_area.width() - 3
+        height = self.fontMetrics().height()
+        while block.isValid():
+            top = round(self.blockBoundingGeometry(block).translated(self.contentOffset()).top())
+            if event.rect().top() <= top <= event.rect().bottom():
+                painter.drawText(0, top, width, height, Qt.AlignmentFlag.AlignRight, str(block.blockNumber() + 1))
+            block = block.next()
+
+def bench(editor_class, text, frames):
+    editor = editor_class()
+    editor.resize(900, 700)
+    editor.setPlainText(text)
+    # Highlighting catches up block by block after a long jump, which is not the gutter's cost
+    editor.release_memory()
+    editor.show()
+    QApplication.processEvents()
+
+    # Frames spread over the whole document, each one scrolled and then painted
+    scroll_bar = editor.verticalScrollBar()
+    positions = [scroll_bar.maximum() * frame // max(1, frames - 1) for frame in range(frames)]
+    frame_samples, gutter_samples = [], []
+    for position in positions:
+        start = time.perf_counter()
+        scroll_bar.setValue(position)
+        editor.viewport().repaint()
+        gutter_start = time.perf_counter()
+        editor.line_number_area.repaint()
+        end = time.perf_counter()
+        frame_samples.append(end - start)
+        gutter_samples.append(end - gutter_start)
+    editor.document().setModified(False)
+    editor.close()
+    frame_samples.sort()
+    gutter_samples.sort()
+    return frame_samples[len(frame_samples) // 2], gutter_samples[len(gutter_samples) // 2], gutter_samples[-1]
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    for lines in sizes:
+        text = "\n".join(f"echo line {i}" for i in range(lines))
+        runs = [("current", ScriptEditor, FRAMES)]
+        if lines <= LEGACY_MAX_LINES:
+            runs.insert(0, ("legacy", LegacyGutterEditor, LEGACY_FRAMES))
+        for label, editor_class, frames in runs:
+            frame, gutter, worst = bench(editor_class, text, frames)
+            print(f"{lines:>8} lines  {label:<8} frame {frame * 1000:8.3f} ms  gutter median {gutter * 1000:8.3f} ms  "
+                  f"max {worst * 1000:8.3f} ms", flush=True)
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv[:1])
+    main()
@@ -0,0 +1,83 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# run_script time for a report-style script, run every time against replayed from the result cache,
+# and the cost of keying the cache on declared input files by mtime and size or by content hash
+# Usage: python3 benchmarks/bench_result_cache.py [runs] [input files] [input file KB]
+
+import os, sys, time, shutil, tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gui.script_manager import ScriptManager
+
+SCRIPT = """
+for file in inputs/*; do
+    wc -l "$file"
+done | sort -n | tail -n 20
+cat inputs/* | tr ' ' '\\n' | sort | uniq -c | sort -rn | head -n 50
+"""
+
+def make_inputs(work_dir, count, size_kb):
+    input_dir = os.path.join(work_dir, "inputs")
+    os.makedirs(input_dir)
+    line = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor\n"
+    for i in range(count):
+        with open(os.path.join(input_dir, f"part{i}.txt"), "w") as f:
+            f.write(line * (size_kb * 1024 // len(line) + i % 7))
+    return [os.path.join("inputs", name) for name in sorted(os.listdir(input_dir))]
+
+def timed(function, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    input_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    size_kb = int(sys.argv[3]) if len(sys.argv) > 3 else 256
+
+    work_dir = tempfile.mkdtemp(prefix="bellos-bench-")
+    try:
+        inputs = make_inputs(work_dir, input_count, size_kb)
+        manager = ScriptManager()
+        manager.settings.update(default_shell="sh", history_file=":memory:", run_log_dir=work_dir,
+                                result_cache_file=os.path.join(work_dir, "results.sqlite3"))
+
+        uncached = timed(lambda: manager.run_script(SCRIPT, cwd=work_dir, cache=False), runs)
+        expected = manager.run_script(SCRIPT, cwd=work_dir, cache=True, inputs=inputs)
+        cached = timed(lambda: manager.run_script(SCRIPT, cwd=work_dir, cache=True, inputs=inputs), runs)
+        if manager.run_script(SCRIPT, cwd=work_dir, cache=True, inputs=inputs) != expected:
+            raise RuntimeError("cached output differs from the run")
+
+        by_stat = timed(lambda: manager.result_key(SCRIPT, work_dir, inputs), runs)
+        manager.settings.update(result_cache_hash_inputs=True)
+        by_hash = timed(lambda: manager.result_key(SCRIPT, work_dir, inputs), runs)
+
+        print(f"{input_count} inputs of {size_kb} KB, median of {runs} runs")
+        print(f"  run_script   uncached {uncached * 1000:8.2f} ms  cached {cached * 1000:8.2f} ms  "
+              f"speedup {uncached / cached:6.1f}x")
+        print(f"  cache key    mtime/size {by_stat * 1000:8.2f} ms  content hash {by_hash * 1000:8.2f} ms")
+        print(f"  stats        {manager.get_result_cache_stats()}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
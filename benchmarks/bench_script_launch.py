@@ -0,0 +1,74 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Launch overhead per run: legacy temp file + Timer path against the current ScriptManager path
+# Usage: python3 benchmarks/bench_script_launch.py [runs] [shell]
+
+import os, sys, time, signal, tempfile, statistics, threading, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gui.script_manager import ScriptManager
+
+SCRIPT = "echo bench\n"
+
+def legacy_run(shell, script_content, timeout=30):
+    script_file = "temp_script.bellos"
+    try:
+        with open(script_file, 'w') as f:
+            f.write(script_content)
+        os.chmod(script_file, 0o755)
+        process = subprocess.Popen([shell, script_file], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        timer = threading.Timer(timeout, os.kill, args=[process.pid, signal.SIGTERM])
+        timer.start()
+        stdout, stderr = process.communicate()
+        timer.cancel()
+        return stdout
+    finally:
+        if os.path.exists(script_file):
+            os.remove(script_file)
+
+def bench(variants, runs):
+    # Variants take turns run by run, so a change in machine load lands on all of them alike
+    times = {label: [] for label in variants}
+    for run in variants.values():
+        run()  # Warm up
+    for _ in range(runs):
+        for label, run in variants.items():
+            start = time.perf_counter()
+            run()
+            times[label].append(time.perf_counter() - start)
+    for label, samples in times.items():
+        median = statistics.median(samples)
+        print(f"{label:<28} {median * 1000:8.3f} ms/run  {1 / median:8.1f} runs/s")
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    shell = sys.argv[2] if len(sys.argv) > 2 else "sh"
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Runs are recorded in memory and logged to the temporary directory, so only the launch is measured
+        variants = {"legacy (cwd file + Timer)": lambda: legacy_run(shell, SCRIPT)}
+        for script_input in ("file", "stdin", "memfd"):
+            manager = ScriptManager()
+            manager.settings.update(default_shell=shell, history_file=":memory:", script_input=script_input,
+                                    run_log_dir=os.path.join(work_dir, script_input))
+            variants[f"script_input={script_input}"] = lambda manager=manager: manager.run_script(SCRIPT)
+        os.chdir(work_dir)
+        bench(variants, runs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Time from launching a fresh interpreter to the main window's first painted frame
+# Cold runs start from an empty bytecode cache, warm runs reuse one
+# Usage: python3 benchmarks/bench_startup.py [runs] [checkout]
+
+import os, sys, time, tempfile, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mirrors bellos_manager.main, reporting once the first frame has been drawn
+CHILD = r"""
+import os, sys
+sys.path.insert(0, os.getcwd())
+from PyQt6.QtCore import QObject, QEvent, QTimer
+from PyQt6.QtWidgets import QApplication
+from gui.bellos_main_window import BellosMainWindow
+
+def report():
+    sys.stdout.write("painted\n")
+    sys.stdout.flush()
+    os._exit(0)
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and not self.seen:
+            self.seen = True
+            QTimer.singleShot(0, report)
+        return False
+
+app = QApplication(sys.argv)
+first_paint = FirstPaint()
+first_paint.seen = False
+app.installEventFilter(first_paint)
+window = BellosMainWindow()
+window.show()
+app.exec()
+"""
+
+def launch(checkout, pycache):
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache)
+    # Warm runs need the bytecode written by the runs before them
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", CHILD], cwd=checkout, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    line = process.stdout.readline()
+    elapsed = time.perf_counter() - start
+    process.wait()
+    if line.strip() != "painted":
+        raise RuntimeError(f"{checkout} did not paint a window")
+    return elapsed
+
+def report(label, samples):
+    samples.sort()
+    print(f"{label:<6} median {samples[len(samples) // 2] * 1000:8.1f} ms  "
+          f"min {samples[0] * 1000:8.1f} ms  max {samples[-1] * 1000:8.1f} ms")
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    checkout = os.path.abspath(sys.argv[2]) if len(sys.argv) > 2 else ROOT
+
+    cold = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as pycache:
+            cold.append(launch(checkout, pycache))
+
+    with tempfile.TemporaryDirectory() as pycache:
+        launch(checkout, pycache)  # Populate the cache
+        warm = [launch(checkout, pycache) for _ in range(runs)]
+
+    print(f"time to first paint, {runs} runs: {checkout}")
+    report("cold", cold)
+    report("warm", warm)
+
+if __name__ == "__main__":
+    main()
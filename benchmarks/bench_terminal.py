@@ -0,0 +1,96 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# ANSI parser throughput and terminal append time, plain against colored output
+# The legacy terminal inserts the raw text with appendPlainText, escapes and all
+# Usage: python3 benchmarks/bench_terminal.py [lines ...]
+
+import os, sys, time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt6.QtWidgets import QApplication
+
+from gui.ansi_parser import AnsiParser
+from gui.terminal import Terminal
+
+# Lines per output chunk, and chunks per flush, roughly what a busy script delivers per frame
+CHUNK_LINES = 50
+CHUNKS_PER_FLUSH = 20
+
+class LegacyTerminal(Terminal):
+    def append_output(self, text):
+        self.pending_output.append(text)
+
+    def flush_output(self):
+        text = "\n".join(self.pending_output)
+        self.pending_output.clear()
+        self.appendPlainText(text)
+
+# Plain text, a colored status per line as test runners and compilers print, and a color change every few words
+STYLES = ["plain", "status", "dense"]
+
+def generate_output(lines, style):
+    if style == "plain":
+        return [f"[{i:08d}] building target number {i} from source file src/module_{i % 97}.c ... ok"
+                for i in range(lines)]
+    if style == "status":
+        return [f"[{i:08d}] building target number {i} from source file src/module_{i % 97}.c ... "
+                f"\x1b[1;3{1 + (i % 5 == 0)}m{'fail' if i % 5 == 0 else 'ok'}\x1b[0m" for i in range(lines)]
+    return [f"\x1b[2m[{i:08d}]\x1b[0m building target \x1b[1;3{i % 7 + 1}mnumber {i}\x1b[0m from source "
+            f"file \x1b[4msrc/module_{i % 97}.c\x1b[24m ... \x1b[32mok\x1b[0m" for i in range(lines)]
+
+def chunks(lines):
+    return ["\n".join(lines[i:i + CHUNK_LINES]) for i in range(0, len(lines), CHUNK_LINES)]
+
+def bench_parser(output):
+    parser = AnsiParser()
+    start = time.perf_counter()
+    for chunk in output:
+        parser.feed(chunk)
+    return time.perf_counter() - start
+
+def bench_terminal(terminal_class, output, history_size):
+    terminal = terminal_class(history_size)
+    start = time.perf_counter()
+    for index, chunk in enumerate(output, 1):
+        terminal.append_output(chunk)
+        if index % CHUNKS_PER_FLUSH == 0:
+            terminal.flush_output()
+    terminal.flush_output()
+    return time.perf_counter() - start
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [20000, 200000]
+    for lines in sizes:
+        outputs = {style: chunks(generate_output(lines, style)) for style in STYLES}
+        print(f"{lines:>8} lines")
+        rates = []
+        for style, output in outputs.items():
+            # Throughput counts the visible text, so escapes do not inflate the colored figures
+            visible = sum(len(text) for chunk in output for text, _ in AnsiParser().feed(chunk)) / 1e6
+            rates.append(f"{style} {visible / bench_parser(output):8.1f} MB/s")
+        print("  parser                   " + "  ".join(rates))
+        for history_size in (1000, lines):
+            times = [f"legacy {bench_terminal(LegacyTerminal, outputs['plain'], history_size):7.3f}s"]
+            times += [f"{style} {bench_terminal(Terminal, output, history_size):7.3f}s" for style, output in outputs.items()]
+            print(f"  terminal history {history_size:>7}  " + "  ".join(times))
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv[:1])
+    main()
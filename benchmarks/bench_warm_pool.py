@@ -0,0 +1,84 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Throughput of short scripts with cold spawns against the warm worker pool
+# Usage: python3 benchmarks/bench_warm_pool.py [runs] [shell] [pool size]
+
+import os, sys, time, tempfile, statistics, threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gui.script_manager import ScriptManager
+
+SCRIPT = "echo bench\n"
+ROUNDS = 10
+
+def sequential(manager, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        manager.run_script(SCRIPT)
+    return time.perf_counter() - start
+
+def batch(manager, runs):
+    finished = threading.Event()
+    remaining = [runs]
+
+    def on_job(job):
+        if job.status not in ("queued", "running"):
+            remaining[0] -= 1
+            if not remaining[0]:
+                finished.set()
+
+    manager.add_job_listener(on_job)
+    start = time.perf_counter()
+    for _ in range(runs):
+        manager.submit_job(SCRIPT)
+    finished.wait()
+    elapsed = time.perf_counter() - start
+    manager.job_listeners.remove(on_job)
+    manager.clear_finished_jobs()
+    return elapsed
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    shell = sys.argv[2] if len(sys.argv) > 2 else "sh"
+    pool_size = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        managers = {}
+        for label, size in (("cold", 0), ("warm", pool_size)):
+            manager = ScriptManager()
+            manager.settings.update(default_shell=shell, history_file=os.path.join(work_dir, f"{label}.sqlite3"),
+                                    run_log_dir=os.path.join(work_dir, label), warm_pool_size=size)
+            manager.run_script(SCRIPT)  # Warm up
+            managers[label] = manager
+        time.sleep(0.5)  # Let the pool fill
+
+        # Cold and warm take turns a round at a time, so a change in machine load lands on both alike
+        print(f"{runs} runs of {SCRIPT.strip()!r} with {shell}, pool size {pool_size}")
+        for mode, bench in (("sequential", sequential), ("batch", batch)):
+            times = {label: [] for label in managers}
+            for _ in range(ROUNDS):
+                for label, manager in managers.items():
+                    times[label].append(bench(manager, runs // ROUNDS) / (runs // ROUNDS))
+            for label, samples in times.items():
+                per_run = statistics.median(samples)
+                print(f"{label:<5} {mode:<11} {per_run * 1000:8.3f} ms/run  {1 / per_run:8.1f} runs/s")
+        for manager in managers.values():
+            manager.close_warm_pool()
+
+if __name__ == "__main__":
+    main()
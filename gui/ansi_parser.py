@@ -0,0 +1,173 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import re
+from operator import itemgetter
+from typing import Optional, Dict, List, Tuple
+
+class AnsiParser:
+    # CSI (colors, cursor movement, erasing), OSC (window titles) and the short escapes such as charset selection
+    ESCAPE_PATTERN = re.compile(r"\x1b(?:\[([0-?]*)[ -/]*([@-~])|\][^\x07\x1b]*(?:\x07|\x1b\\)|[ -/]*[0-Z\\^-~])")
+    # Color changes, by far the most common escapes and the only ones in most colored output
+    SGR_PATTERN = re.compile(r"\x1b\[([0-9;:]*)m")
+    # The start of an escape that the end of a chunk cut short
+    PARTIAL_PATTERN = re.compile(r"\x1b(?:\[[0-?]*[ -/]*|\][^\x07\x1b]*\x1b?|[ -/]*)")
+
+    # An unterminated escape longer than this is treated as text rather than held forever
+    MAX_PENDING = 4096
+
+    # xterm's palette, normal then bright
+    PALETTE = ["#000000", "#CD0000", "#00CD00", "#CDCD00", "#0000EE", "#CD00CD", "#00CDCD", "#E5E5E5",
+               "#7F7F7F", "#FF0000", "#00FF00", "#FFFF00", "#5C5CFF", "#FF00FF", "#00FFFF", "#FFFFFF"]
+
+    # (foreground, background, bold, italic, underline, inverse)
+    DEFAULT_ATTRIBUTES = (None, None, False, False, False, False)
+
+    # Attribute changes remembered per (attributes, SGR parameters), colored output repeats the same few
+    MAX_TRANSITIONS = 1024
+
+    def __init__(self):
+        self.attributes = self.DEFAULT_ATTRIBUTES
+        self.pending = ""
+        # Each attribute set has a table of SGR parameters to the attributes and table they lead to,
+        # so following a color change is a single lookup
+        self.tables: Dict[tuple, dict] = {}
+        self.transition_count = 0
+
+    def reset(self):
+        self.attributes = self.DEFAULT_ATTRIBUTES
+        self.pending = ""
+
+    def feed(self, text: str) -> List[Tuple[str, tuple]]:
+        # Text split into (text, attributes) runs, an escape cut off at the end is kept for the next chunk.
+        # CRLF becomes a plain newline, a lone carriage return is left for the terminal to act on
+        if self.pending:
+            text = self.pending + text
+            self.pending = ""
+        if "\r" in text:
+            text = text.replace("\r\n", "\n")
+            if text.endswith("\r"):
+                # Possibly the first half of a CRLF split across chunks
+                self.pending = "\r"
+                text = text[:-1]
+        if "\x1b" not in text:
+            return [(text, self.attributes)] if text else []
+
+        # Text alternates with the parameters of each color change. Anything else takes the full pattern,
+        # its other escapes count as a change to the same attributes
+        pieces = self.SGR_PATTERN.split(text)
+        texts = pieces[::2]
+        rest = texts.pop()
+        parameters = pieces[1::2]
+        if "\x1b" in "".join(texts) or "\x1b" in rest and self.ESCAPE_PATTERN.search(rest):
+            pieces = self.ESCAPE_PATTERN.split(text)
+            # A lone ESC that starts no known sequence is dropped
+            texts = [piece.replace("\x1b", "") for piece in pieces[:-1:3]]
+            rest = pieces[-1]
+            parameters = [parameter if final == "m" else None for parameter, final in zip(pieces[1::3], pieces[2::3])]
+
+        attributes = self.attributes
+        table = self.tables.setdefault(attributes, {})
+        states = [attributes]
+        append = states.append
+        for parameter in parameters:
+            attributes, table = table.get(parameter) or self.transition(attributes, table, parameter)
+            append(attributes)
+        self.attributes = attributes
+        spans = list(filter(itemgetter(0), zip(texts, states)))
+
+        escape = rest.rfind("\x1b")
+        if escape != -1 and len(rest) - escape <= self.MAX_PENDING and self.PARTIAL_PATTERN.fullmatch(rest, escape):
+            self.pending = rest[escape:] + self.pending
+            rest = rest[:escape]
+        rest = rest.replace("\x1b", "")
+        if rest:
+            spans.append((rest, attributes))
+        return spans
+
+    def transition(self, attributes: tuple, table: dict, parameters: Optional[str]) -> Tuple[tuple, dict]:
+        if self.transition_count >= self.MAX_TRANSITIONS:
+            self.tables.clear()
+            self.transition_count = 0
+        new_attributes = attributes if parameters is None else self.apply_sgr(attributes, parameters)
+        table[parameters] = new_attributes, self.tables.setdefault(new_attributes, {})
+        self.transition_count += 1
+        return table[parameters]
+
+    def apply_sgr(self, attributes: tuple, parameters: str) -> tuple:
+        foreground, background, bold, italic, underline, inverse = attributes
+        codes = [int(code) if code.isdigit() else 0 for code in parameters.replace(":", ";").split(";")]
+        index = 0
+        while index < len(codes):
+            code = codes[index]
+            if code == 0:
+                foreground, background, bold, italic, underline, inverse = self.DEFAULT_ATTRIBUTES
+            elif code == 1:
+                bold = True
+            elif code == 3:
+                italic = True
+            elif code == 4:
+                underline = True
+            elif code == 7:
+                inverse = True
+            elif code == 22:
+                bold = False
+            elif code == 23:
+                italic = False
+            elif code == 24:
+                underline = False
+            elif code == 27:
+                inverse = False
+            elif 30 <= code <= 37:
+                foreground = self.PALETTE[code - 30]
+            elif 90 <= code <= 97:
+                foreground = self.PALETTE[code - 82]
+            elif code == 39:
+                foreground = None
+            elif 40 <= code <= 47:
+                background = self.PALETTE[code - 40]
+            elif 100 <= code <= 107:
+                background = self.PALETTE[code - 92]
+            elif code == 49:
+                background = None
+            elif code in (38, 48):
+                color, index = self.extended_color(codes, index)
+                if code == 38:
+                    foreground = color
+                else:
+                    background = color
+            index += 1
+        return foreground, background, bold, italic, underline, inverse
+
+    def extended_color(self, codes: List[int], index: int) -> Tuple[Optional[str], int]:
+        # 38;5;n picks from the 256-color table, 38;2;r;g;b is a direct color
+        if index + 2 < len(codes) and codes[index + 1] == 5:
+            return self.color_256(codes[index + 2]), index + 2
+        if index + 4 < len(codes) and codes[index + 1] == 2:
+            red, green, blue = (min(255, value) for value in codes[index + 2:index + 5])
+            return f"#{red:02X}{green:02X}{blue:02X}", index + 4
+        return None, len(codes)
+
+    def color_256(self, number: int) -> Optional[str]:
+        if number < 16:
+            return self.PALETTE[number]
+        if number < 232:
+            number -= 16
+            levels = [0 if value == 0 else 55 + value * 40 for value in (number // 36, number // 6 % 6, number % 6)]
+            return "#{:02X}{:02X}{:02X}".format(*levels)
+        if number < 256:
+            level = 8 + (number - 232) * 10
+            return f"#{level:02X}{level:02X}{level:02X}"
+        return None
@@ -13,14 +13,75 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from header_imports import *
+import os, json, time
+from typing import Optional, List
+from PyQt6.QtWidgets import (QDockWidget, QFileDialog, QMainWindow, QMessageBox, QProgressBar,
+                             QTabBar, QTabWidget, QVBoxLayout, QWidget)
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QAction
+
+from .file_explorer import FileExplorer
+from .job_panel import JobPanel
+from .project_system import ProjectSettings
+from .run_history_panel import RunHistoryPanel
+from .file_io import atomic_write
+from .save_pipeline import SavePipeline
+from .script_editor import ScriptEditor
+from .script_manager import ScriptManager
+from .script_runner import ScriptRunner
+from .settings_service import SettingsService
+from .shell_panel import ShellPanel
+from .terminal import Terminal
+from .validation_service import ValidationService
 
 class BellosMainWindow(QMainWindow):
+    setting_changed = pyqtSignal(str, object)
+
+    # Files above these sizes are streamed into the editor, or paged read-only
+    LARGE_FILE_SIZE = 8 * 1024 * 1024
+    PAGED_FILE_SIZE = 256 * 1024 * 1024
+
+    # Quiet period after the last edit before an auto-save
+    AUTO_SAVE_DELAY_MS = 1000
+
+    SESSION_FILE = "bellos_session.json"
+
     def __init__(self):
         super().__init__()
-        self.script_manager = ScriptManager()
+        # One settings service for the whole window, read on first use and written back in the background
+        self.settings = SettingsService()
+        self.settings.add_listener(self.setting_changed.emit)
+        self.script_manager = ScriptManager(self.settings)
+        self.script_runner = ScriptRunner(self.script_manager, self)
+        self.file_index = None
+        self.go_to_file_dialog = None
+        self.active_editor = None
+        self.recent_editors: List[ScriptEditor] = []
+        self.auto_save_editors: set = set()
+        self.manual_saves: set = set()
+        self.save_pipeline = SavePipeline(self)
+        self.validation_service = ValidationService(self.script_manager.validator, self)
+        self._project_settings: Optional[ProjectSettings] = None
+        self.startup_scheduled = False
+        self.startup_finished = False
         self.init_ui()
 
+    @property
+    def editor(self) -> ScriptEditor:
+        return self.active_editor
+
+    @property
+    def current_file(self) -> Optional[str]:
+        return self.active_editor.file_path if self.active_editor else None
+
+    @property
+    def project_settings(self) -> ProjectSettings:
+        # The settings form is built the first time its tab is opened
+        if self._project_settings is None:
+            self._project_settings = ProjectSettings(self.settings)
+            self.settings_page.layout().addWidget(self._project_settings)
+        return self._project_settings
+
     def init_ui(self):
         self.setWindowTitle('Bellos Application Script Manager')
         self.setGeometry(100, 100, 1200, 800)
@@ -29,18 +90,61 @@ class BellosMainWindow(QMainWindow):
         self.central_widget = QTabWidget()
         self.setCentralWidget(self.central_widget)
 
-        # Create main editor tab
-        self.editor = ScriptEditor()
-        self.central_widget.addTab(self.editor, "Script Editor")
+        # Editor and viewer tabs can be closed, the settings tab cannot
+        self.central_widget.setTabsClosable(True)
+        self.central_widget.setMovable(True)
+        self.settings_page = QWidget()
+        self.settings_page.setLayout(QVBoxLayout())
+        self.settings_page.layout().setContentsMargins(0, 0, 0, 0)
+        settings_index = self.central_widget.addTab(self.settings_page, "Project Settings")
+        self.central_widget.tabBar().setTabButton(settings_index, QTabBar.ButtonPosition.RightSide, None)
+        self.central_widget.tabCloseRequested.connect(self.close_tab)
+        self.central_widget.currentChanged.connect(self.on_tab_changed)
+
+        # Progress for files loaded in chunks
+        self.load_progress = QProgressBar()
+        self.load_progress.setMaximumWidth(200)
+        self.load_progress.hide()
+        self.statusBar().addPermanentWidget(self.load_progress)
 
         # Create and configure dock widgets
         self.setup_file_explorer()
         self.setup_terminal()
+        self.setup_shell_panel()
+        self.setup_job_panel()
+        self.setup_run_history_panel()
         self.setup_menubar()
-        
-        # Project settings tab
-        self.project_settings = ProjectSettings()
-        self.central_widget.addTab(self.project_settings, "Project Settings")
+
+        # Auto-save waits for a pause in typing and goes through the same pipeline as Save
+        self.auto_save_timer = QTimer(self)
+        self.auto_save_timer.setSingleShot(True)
+        self.auto_save_timer.setInterval(self.AUTO_SAVE_DELAY_MS)
+        self.auto_save_timer.timeout.connect(self.auto_save)
+        self.save_pipeline.saved.connect(self.on_file_saved)
+        self.save_pipeline.save_failed.connect(self.on_save_failed)
+        self.validation_service.buffer_validated.connect(self.on_buffer_validated)
+        self.validation_service.project_validated.connect(self.on_project_validated)
+        self.setting_changed.connect(self.on_setting_changed)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        # Everything the first frame does not need happens right after it is drawn
+        if not self.startup_scheduled:
+            self.startup_scheduled = True
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        # Reopen the previous session, documents load when their tab is first shown
+        if not self.restore_session():
+            self.new_file()
+
+        # Directory listing runs in the background, so the tree can be filled right away
+        self.file_explorer.set_root_path(self.settings.get("project_path") or os.getcwd())
+        self.terminal.set_history_size(self.settings.get("terminal_history_size"))
+        self.terminal.set_font_size(self.settings.get("terminal_font_size"))
+        self.job_panel.load_max_concurrency()
+        self.run_history_panel.load_history()
+        self.startup_finished = True
 
     def setup_file_explorer(self):
         self.file_explorer = FileExplorer()
@@ -53,9 +157,41 @@ class BellosMainWindow(QMainWindow):
 
     def setup_terminal(self):
         self.terminal = Terminal()
-        terminal_dock = QDockWidget("Terminal", self)
-        terminal_dock.setWidget(self.terminal)
-        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, terminal_dock)
+        self.terminal_dock = QDockWidget("Terminal", self)
+        self.terminal_dock.setWidget(self.terminal)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.terminal_dock)
+
+        # Stream script output into the terminal as it is produced
+        self.script_runner.output_received.connect(self.on_script_output)
+        self.script_runner.script_finished.connect(self.on_script_finished)
+        self.script_runner.result_reused.connect(self.on_result_reused)
+
+    def setup_shell_panel(self):
+        # An interactive shell next to the script output, started once its tab is brought to the front
+        self.shell_panel = ShellPanel(self.settings)
+        self.shell_dock = QDockWidget("Shell", self)
+        self.shell_dock.setWidget(self.shell_panel)
+        self.shell_dock.visibilityChanged.connect(self.shell_panel.set_active)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.shell_dock)
+        self.tabifyDockWidget(self.terminal_dock, self.shell_dock)
+        self.terminal_dock.raise_()
+
+    def setup_job_panel(self):
+        self.job_panel = JobPanel(self.script_runner)
+        job_dock = QDockWidget("Jobs", self)
+        job_dock.setWidget(self.job_panel)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, job_dock)
+        self.tabifyDockWidget(self.terminal_dock, job_dock)
+        self.terminal_dock.raise_()
+
+    def setup_run_history_panel(self):
+        self.run_history_panel = RunHistoryPanel(self.script_runner)
+        run_history_dock = QDockWidget("Run History", self)
+        run_history_dock.setWidget(self.run_history_panel)
+        self.run_history_panel.log_requested.connect(self.open_paged_file)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, run_history_dock)
+        self.tabifyDockWidget(self.terminal_dock, run_history_dock)
+        self.terminal_dock.raise_()
 
     def setup_menubar(self):
         menubar = self.menuBar()
@@ -75,16 +211,25 @@ class BellosMainWindow(QMainWindow):
         save_action.triggered.connect(self.save_file)
         file_menu.addAction(save_action)
 
+        close_action = QAction("Close Tab", self)
+        close_action.triggered.connect(lambda: self.close_tab(self.central_widget.currentIndex()))
+        file_menu.addAction(close_action)
+
+        go_to_file_action = QAction("Go to File...", self)
+        go_to_file_action.setShortcut("Ctrl+P")
+        go_to_file_action.triggered.connect(self.show_go_to_file)
+        file_menu.addAction(go_to_file_action)
+
         # Edit menu
         edit_menu = menubar.addMenu("Edit")
         
         # Add edit actions (undo, redo, cut, copy, paste)
         undo_action = QAction("Undo", self)
-        undo_action.triggered.connect(self.editor.undo)
+        undo_action.triggered.connect(lambda: self.editor.undo())
         edit_menu.addAction(undo_action)
 
         redo_action = QAction("Redo", self)
-        redo_action.triggered.connect(self.editor.redo)
+        redo_action.triggered.connect(lambda: self.editor.redo())
         edit_menu.addAction(redo_action)
 
         # Run menu
@@ -94,9 +239,109 @@ class BellosMainWindow(QMainWindow):
         run_action.triggered.connect(self.run_script)
         run_menu.addAction(run_action)
 
+        validate_project_action = QAction("Validate Project Scripts", self)
+        validate_project_action.triggered.connect(self.validate_project)
+        run_menu.addAction(validate_project_action)
+
+        run_in_dirs_action = QAction("Run Script in Subdirectories...", self)
+        run_in_dirs_action.triggered.connect(self.run_script_in_subdirectories)
+        run_menu.addAction(run_in_dirs_action)
+
+        send_selection_action = QAction("Send Selection to Shell", self)
+        send_selection_action.setShortcut("Ctrl+Shift+Return")
+        send_selection_action.triggered.connect(self.send_selection_to_shell)
+        run_menu.addAction(send_selection_action)
+
+        open_log_action = QAction("Open Last Run Log", self)
+        open_log_action.triggered.connect(self.open_last_run_log)
+        run_menu.addAction(open_log_action)
+
+        stop_all_action = QAction("Stop All Scripts", self)
+        stop_all_action.triggered.connect(self.script_runner.cancel_all)
+        run_menu.addAction(stop_all_action)
+
     def new_file(self):
-        self.editor.clear()
-        self.current_file = None
+        self.add_editor_tab()
+
+    def add_editor_tab(self, file_path: Optional[str] = None, activate: bool = True) -> ScriptEditor:
+        editor = ScriptEditor(file_path)
+        editor.set_tab_width(self.settings.get("tab_width"))
+        editor.set_line_numbers_visible(self.settings.get("show_line_numbers"))
+        editor.document().modificationChanged.connect(lambda _: self.update_tab_title(editor))
+        editor.textChanged.connect(lambda: self.schedule_auto_save(editor))
+        editor.textChanged.connect(lambda: self.schedule_validation(editor))
+
+        # Editor tabs sit before the settings tab
+        settings_index = self.central_widget.indexOf(self.settings_page)
+        index = self.central_widget.insertTab(settings_index, editor, "")
+        self.update_tab_title(editor)
+        if activate:
+            self.central_widget.setCurrentIndex(index)
+        return editor
+
+    def editor_tabs(self) -> List[ScriptEditor]:
+        return [self.central_widget.widget(index) for index in range(self.central_widget.count())
+                if isinstance(self.central_widget.widget(index), ScriptEditor)]
+
+    def update_tab_title(self, editor: ScriptEditor):
+        index = self.central_widget.indexOf(editor)
+        if index == -1:
+            return
+        title = os.path.basename(editor.file_path) if editor.file_path else "Untitled"
+        self.central_widget.setTabText(index, title + (" *" if editor.is_dirty() else ""))
+        self.central_widget.setTabToolTip(index, editor.file_path or "")
+
+    def on_tab_changed(self, index):
+        editor = self.central_widget.widget(index)
+        if editor is self.settings_page and self.startup_finished:
+            # Build the settings form the first time its tab is opened
+            self.project_settings
+        if not isinstance(editor, ScriptEditor):
+            return
+
+        self.active_editor = editor
+        if editor in self.recent_editors:
+            self.recent_editors.remove(editor)
+        self.recent_editors.append(editor)
+
+        # Restored tabs read their file the first time they are shown
+        if not editor.loaded:
+            editor.loaded = True
+            self.load_editor_file(editor, editor.file_path)
+        editor.restore_memory()
+        self.enforce_memory_budget()
+
+    def enforce_memory_budget(self):
+        # Least recently shown tabs give up undo history and highlighting first
+        budget = self.settings.get("tab_memory_budget") * 1024 * 1024
+        inactive = [editor for editor in self.recent_editors if editor is not self.active_editor]
+        total = sum(editor.memory_estimate() for editor in inactive)
+        for editor in inactive:
+            if total <= budget:
+                break
+            total -= editor.memory_estimate()
+            editor.release_memory()
+
+    def on_setting_changed(self, key: str, value):
+        if key == "terminal_history_size":
+            self.terminal.set_history_size(value)
+            self.shell_panel.set_history_size(value)
+        elif key == "terminal_font_size":
+            self.terminal.set_font_size(value)
+            self.shell_panel.set_font_size(value)
+        elif key == "tab_width":
+            for editor in self.editor_tabs():
+                editor.set_tab_width(value)
+        elif key == "show_line_numbers":
+            for editor in self.editor_tabs():
+                editor.set_line_numbers_visible(value)
+        elif key == "tab_memory_budget":
+            self.enforce_memory_budget()
+        elif key == "result_cache" and self.startup_finished:
+            self.run_history_panel.refresh_cache_stats()
+        elif key == "project_path" and self.startup_finished:
+            self.file_explorer.set_root_path(value or os.getcwd())
+            self.shell_panel.on_project_changed()
 
     def open_file_dialog(self):
         file_name, _ = QFileDialog.getOpenFileName(self, "Open File", "", "Bellos Scripts (*.bellos);;All Files (*)")
@@ -104,32 +349,307 @@ class BellosMainWindow(QMainWindow):
             self.open_file(file_name)
 
     def open_file(self, file_name):
+        # Switch to the file if it is already open
+        for editor in self.editor_tabs():
+            if editor.file_path and os.path.abspath(editor.file_path) == os.path.abspath(file_name):
+                self.central_widget.setCurrentWidget(editor)
+                return
+
         try:
+            if os.path.getsize(file_name) >= self.PAGED_FILE_SIZE:
+                self.open_paged_file(file_name)
+                return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not open file: {str(e)}")
+            return
+
+        # Reuse an empty untitled tab instead of piling up new ones
+        editor = self.active_editor
+        if editor is not None and editor.is_untouched():
+            editor.file_path = file_name
+            self.central_widget.setCurrentWidget(editor)
+            self.load_editor_file(editor, file_name)
+        else:
+            # Activating the new tab loads it through on_tab_changed
+            self.add_editor_tab(file_name)
+
+    def load_editor_file(self, editor: ScriptEditor, file_name: str):
+        try:
+            self.cancel_file_loader(editor)
+            if os.path.getsize(file_name) >= self.LARGE_FILE_SIZE:
+                self.load_large_file(editor, file_name)
+                return
+
             with open(file_name, 'r') as f:
-                self.editor.setPlainText(f.read())
-            self.current_file = file_name
+                content = f.read()
+            editor.setPlainText(content)
+            editor.document().setModified(False)
+            self.save_pipeline.mark_saved(file_name, content)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Could not open file: {str(e)}")
+        self.update_tab_title(editor)
+
+    def load_large_file(self, editor: ScriptEditor, file_name: str):
+        from .large_file_loader import ChunkedFileLoader
+
+        # Stream the file into the editor a chunk per event loop turn
+        editor.file_loader = ChunkedFileLoader(file_name, editor, self)
+        editor.file_loader.progress.connect(self.load_progress.setValue)
+        editor.file_loader.finished.connect(lambda _: self.finish_large_file(editor))
+        self.load_progress.setValue(0)
+        self.load_progress.show()
+        self.statusBar().showMessage(f"Loading {file_name}...")
+        editor.file_loader.start()
+
+    def finish_large_file(self, editor: ScriptEditor):
+        editor.file_loader = None
+        editor.document().setModified(False)
+        self.update_tab_title(editor)
+        self.load_progress.hide()
+        self.statusBar().showMessage(f"Loaded {editor.file_path}", 3000)
+
+    def cancel_file_loader(self, editor: ScriptEditor):
+        if editor.file_loader is not None:
+            editor.file_loader.cancel()
+            editor.file_loader = None
+            self.load_progress.hide()
+            self.statusBar().clearMessage()
+
+    def open_paged_file(self, file_name):
+        from .paged_file_viewer import PagedFileViewer
+
+        viewer = PagedFileViewer(file_name)
+        index = self.central_widget.addTab(viewer, f"{os.path.basename(file_name)} (read-only)")
+        self.central_widget.setCurrentIndex(index)
+
+    def close_tab(self, index):
+        from .paged_file_viewer import PagedFileViewer
+
+        widget = self.central_widget.widget(index)
+        if isinstance(widget, PagedFileViewer):
+            self.central_widget.removeTab(index)
+            widget.close_file()
+            widget.deleteLater()
+            return
+        if not isinstance(widget, ScriptEditor):
+            return
+
+        if widget.is_dirty():
+            name = os.path.basename(widget.file_path) if widget.file_path else "Untitled"
+            reply = QMessageBox.question(self, "Unsaved Changes", f"Discard unsaved changes to {name}?",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+
+        self.cancel_file_loader(widget)
+        self.auto_save_editors.discard(widget)
+        self.validation_service.forget(widget)
+        if widget in self.recent_editors:
+            self.recent_editors.remove(widget)
+        if widget is self.active_editor:
+            self.active_editor = None
+        self.central_widget.removeTab(index)
+        widget.deleteLater()
+
+        # Always keep one editor around for the Run and Edit actions
+        if not self.editor_tabs():
+            self.new_file()
+        elif self.active_editor is None:
+            self.central_widget.setCurrentWidget(self.recent_editors[-1] if self.recent_editors else self.editor_tabs()[0])
+
+    def save_session(self):
+        editors = self.editor_tabs()
+        session = {
+            "open_files": [editor.file_path for editor in editors if editor.file_path],
+            "current_file": self.current_file
+        }
+        try:
+            atomic_write(self.SESSION_FILE, json.dumps(session, indent=4).encode())
+        except Exception:
+            pass
+
+    def restore_session(self) -> bool:
+        try:
+            with open(self.SESSION_FILE, 'r') as f:
+                session = json.load(f)
+        except Exception:
+            return False
+
+        # Only tab headers are created here, on_tab_changed loads the shown one
+        open_files = [path for path in session.get("open_files", []) if os.path.isfile(path)]
+        current_editor = None
+        for file_path in open_files:
+            editor = self.add_editor_tab(file_path, activate=False)
+            if current_editor is None or file_path == session.get("current_file"):
+                current_editor = editor
+        if current_editor is not None:
+            self.central_widget.setCurrentWidget(current_editor)
+        return bool(open_files)
+
+    def closeEvent(self, event):
+        dirty = [editor for editor in self.editor_tabs() if editor.is_dirty()]
+        if dirty:
+            reply = QMessageBox.question(self, "Unsaved Changes",
+                                         f"{len(dirty)} open file(s) have unsaved changes. Quit anyway?",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if reply != QMessageBox.StandardButton.Yes:
+                event.ignore()
+                return
+        # A window closed before its session was restored must not overwrite it
+        if self.startup_finished:
+            self.save_session()
+        self.script_manager.validator.save()
+        self.script_manager.close_warm_pool()
+        self.shell_panel.close_sessions()
+        try:
+            self.settings.flush()
+        except Exception:
+            pass
+        super().closeEvent(event)
+
+    def show_go_to_file(self):
+        from .file_index import FileIndex
+        from .go_to_file_dialog import GoToFileDialog
+
+        # The index follows the project path, rebuilt when it changes
+        root = os.path.abspath(self.settings.get("project_path") or os.getcwd())
+        if self.file_index is None or self.file_index.root != root:
+            if self.file_index is not None:
+                self.file_index.stop()
+            self.file_index = FileIndex(root)
+            self.file_index.start()
+
+        if self.go_to_file_dialog is None:
+            self.go_to_file_dialog = GoToFileDialog(self.file_index, self)
+            # Results open through the same path as a click in the explorer
+            self.go_to_file_dialog.file_selected.connect(self.file_explorer.file_selected.emit)
+        else:
+            self.go_to_file_dialog.set_file_index(self.file_index)
+
+        self.go_to_file_dialog.query.selectAll()
+        self.go_to_file_dialog.show()
+        self.go_to_file_dialog.raise_()
+        self.go_to_file_dialog.query.setFocus()
 
     def save_file(self):
-        if not hasattr(self, 'current_file') or not self.current_file:
+        editor = self.active_editor
+        if editor is None or editor.file_loader is not None:
+            return
+
+        if not editor.file_path:
             file_name, _ = QFileDialog.getSaveFileName(self, "Save File", "", "Bellos Scripts (*.bellos);;All Files (*)")
             if file_name:
-                self.current_file = file_name
+                editor.file_path = file_name
+                self.update_tab_title(editor)
             else:
                 return
 
-        try:
-            with open(self.current_file, 'w') as f:
-                f.write(self.editor.toPlainText())
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Could not save file: {str(e)}")
+        # Snapshot on the GUI thread, the write happens on the save thread
+        self.auto_save_editors.discard(editor)
+        self.manual_saves.add(editor.file_path)
+        self.save_pipeline.save(editor.file_path, editor.toPlainText(), editor.document().revision())
+
+    def schedule_auto_save(self, editor: ScriptEditor):
+        if editor.file_path and editor.file_loader is None and self.settings.get("auto_save"):
+            self.auto_save_editors.add(editor)
+            self.auto_save_timer.start()
+
+    def auto_save(self):
+        for editor in self.auto_save_editors:
+            if editor.file_path and editor.file_loader is None and editor.is_dirty():
+                self.save_pipeline.save(editor.file_path, editor.toPlainText(), editor.document().revision())
+        self.auto_save_editors.clear()
+
+    def on_file_saved(self, file_name, revision):
+        self.manual_saves.discard(file_name)
+        # Text typed after the snapshot was taken is not on disk, so the editor stays modified
+        for editor in self.editor_tabs():
+            if editor.file_path == file_name and editor.document().revision() == revision:
+                editor.document().setModified(False)
+        self.statusBar().showMessage(f"Saved {file_name}", 2000)
+
+    def on_save_failed(self, file_name, error):
+        if file_name in self.manual_saves:
+            self.manual_saves.discard(file_name)
+            QMessageBox.critical(self, "Error", f"Could not save file: {error}")
+        else:
+            self.statusBar().showMessage(f"Auto-save failed for {file_name}: {error}", 5000)
+
+    def schedule_validation(self, editor: ScriptEditor):
+        if (editor.file_loader is None and editor.document().characterCount() < self.LARGE_FILE_SIZE
+                and self.settings.get("live_validation")):
+            self.validation_service.schedule(editor)
+
+    def on_buffer_validated(self, editor, revision, result):
+        # Results for text that has changed since are dropped, a newer check is already queued
+        if editor not in self.editor_tabs() or editor.document().revision() != revision:
+            return
+        editor.set_validation_errors(result.errors)
+        if editor is self.active_editor and result.errors:
+            line, message = result.errors[0]
+            self.statusBar().showMessage(f"Line {line}: {message}" if line else message, 5000)
+
+    def validate_project(self):
+        root = os.path.abspath(self.settings.get("project_path") or os.getcwd())
+        self.terminal.append_output(f"Validating scripts under {root}...")
+        self.validation_service.validate_project(root)
+
+    def on_project_validated(self, root, results):
+        invalid = 0
+        for path, result in results.items():
+            if result.valid:
+                continue
+            invalid += 1
+            for line, message in result.errors or [(None, "invalid")]:
+                self.terminal.append_output(f"{path}:{line}: {message}" if line else f"{path}: {message}")
+        self.terminal.append_output(f"Validated {len(results)} scripts under {root}, {invalid} with errors")
 
     def run_script(self):
         script_content = self.editor.toPlainText()
+        name = os.path.basename(self.current_file) if self.current_file else "Untitled"
         try:
-            output = self.script_manager.run_script(script_content)
-            self.terminal.append_output(output)
+            self.script_runner.run(script_content, name=name)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error running script: {str(e)}")
             self.terminal.append_output(f"Error: {str(e)}")
+
+    def run_script_in_subdirectories(self):
+        parent_dir = QFileDialog.getExistingDirectory(self, "Select Parent Directory")
+        if not parent_dir:
+            return
+
+        script_content = self.editor.toPlainText()
+        directories = sorted(entry.path for entry in os.scandir(parent_dir) if entry.is_dir())
+        for directory in directories:
+            self.script_runner.submit(script_content, cwd=directory)
+        self.terminal.append_output(f"Queued {len(directories)} jobs under {parent_dir}")
+
+    def open_last_run_log(self):
+        # Full output of the latest run, the terminal only keeps its tail
+        runs = self.script_manager.get_run_metrics(limit=1)
+        if runs and runs[-1].log_file and os.path.exists(runs[-1].log_file):
+            self.open_paged_file(runs[-1].log_file)
+        else:
+            self.statusBar().showMessage("The last run did not log any output", 3000)
+
+    def send_selection_to_shell(self):
+        # The selection, or the line under the cursor, runs in the live shell without a new process
+        if self.editor is None:
+            return
+        cursor = self.editor.textCursor()
+        text = cursor.selectedText() if cursor.hasSelection() else cursor.block().text()
+        self.shell_dock.show()
+        self.shell_dock.raise_()
+        self.shell_panel.send_text(text.replace("\u2029", "\n"))
+
+    def on_script_output(self, text, stream):
+        self.terminal.append_output(text)
+
+    def on_script_finished(self, pid, returncode):
+        # A replayed result has no process, on_result_reused has already reported it
+        if pid:
+            self.terminal.append_output(f"Process {pid} exited with code {returncode}")
+
+    def on_result_reused(self, result):
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(result.created_at))
+        self.terminal.append_output(f"Reused the cached result from {when}, exit code {result.exit_code}")
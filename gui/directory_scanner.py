@@ -0,0 +1,66 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, threading, itertools
+from PyQt6.QtCore import pyqtSignal, QObject
+
+class DirectoryScanner(QObject):
+    entries_found = pyqtSignal(int, list)
+    scan_finished = pyqtSignal(int)
+
+    # The first rows show after this many entries, each later batch is twice the size so a large
+    # directory is merged into the view only a few times
+    BATCH_SIZE = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._scan_ids = itertools.count(1)
+
+    def scan(self, path: str) -> int:
+        # Results carry the scan id so callers can drop answers to requests they abandoned
+        scan_id = next(self._scan_ids)
+        threading.Thread(target=self._scan, args=(scan_id, path), daemon=True).start()
+        return scan_id
+
+    def _scan(self, scan_id: int, path: str):
+        # DirEntry caches the file type from the directory read, so no extra stat per entry.
+        # Batches go out as the directory is read, the receiver merges each into place
+        batch = []
+        batch_size = self.BATCH_SIZE
+        try:
+            with os.scandir(path) as iterator:
+                for entry in iterator:
+                    try:
+                        if entry.is_dir():
+                            batch.append((False, entry.name, entry.path))
+                        elif entry.is_file():
+                            batch.append((True, entry.name, entry.path))
+                    except OSError:
+                        continue
+                    if len(batch) >= batch_size:
+                        self._emit_batch(scan_id, batch)
+                        batch = []
+                        batch_size *= 2
+        except OSError:
+            pass
+
+        if batch:
+            self._emit_batch(scan_id, batch)
+        self.scan_finished.emit(scan_id)
+
+    def _emit_batch(self, scan_id: int, batch: list):
+        # Sort items: directories first, then files
+        batch.sort()
+        self.entries_found.emit(scan_id, [(name, entry_path, not is_file) for is_file, name, entry_path in batch])
@@ -13,73 +13,136 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from header_imports import *
+import os
+from typing import Optional, Dict, List
+from PyQt6.QtWidgets import QAbstractItemView, QTreeView
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QFileSystemWatcher
+from PyQt6.QtGui import QStandardItem, QStandardItemModel
+
+from .directory_scanner import DirectoryScanner
 
 class FileExplorer(QTreeView):
     file_selected = pyqtSignal(str)
     _model: Optional[QStandardItemModel]
 
+    LOADED_ROLE = Qt.ItemDataRole.UserRole + 1
+    IS_DIR_ROLE = Qt.ItemDataRole.UserRole + 2
+    SORT_ROLE = Qt.ItemDataRole.UserRole + 3
+
+    # Quiet period that folds a burst of change notifications into one model update
+    REFRESH_DELAY_MS = 250
+    POLL_INTERVAL_MS = 2000
+
     def __init__(self):
         super().__init__()
         self._model = None
         self.current_path = ""
+        self.loading_items: Dict[int, QStandardItem] = {}
+        self.scanner = DirectoryScanner(self)
+
+        # Loaded directories are watched and re-listed incrementally when they change
+        self.directory_items: Dict[str, QStandardItem] = {}
+        self.pending_refreshes: set = set()
+        self.refresh_scans: Dict[int, list] = {}
+        self.polled_directories: Dict[str, int] = {}
+        self.watcher = QFileSystemWatcher(self)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(self.REFRESH_DELAY_MS)
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(self.POLL_INTERVAL_MS)
         self.setup_ui()
 
     def setup_ui(self):
         # Create and set up the model
         self._model = QStandardItemModel(parent=self)
         self._model.setHorizontalHeaderLabels(['Name'])
+        self._model.setSortRole(self.SORT_ROLE)
         
         # Set up the tree view
         super().setModel(self._model)
         self.setAnimated(False)
         self.setIndentation(20)
-        self.setSortingEnabled(True)
         self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         
         # Connect signals
         self.clicked.connect(self.on_item_clicked)
+        self.expanded.connect(self.on_item_expanded)
+        self.scanner.entries_found.connect(self.add_entries)
+        self.scanner.scan_finished.connect(self.finish_loading)
+        self.watcher.directoryChanged.connect(self.queue_refresh)
+        self.refresh_timer.timeout.connect(self.start_pending_refreshes)
+        self.poll_timer.timeout.connect(self.poll_directories)
 
     def populate_tree(self, path: str, parent_item: Optional[QStandardItem] = None) -> None:
         if parent_item is None and self._model is not None:
             self._model.clear()
             self._model.setHorizontalHeaderLabels(['Name'])
+            self.loading_items.clear()
+            self.refresh_scans.clear()
+            self.pending_refreshes.clear()
+            self.unwatch_directories(list(self.directory_items.keys()))
             parent_item = self._model.invisibleRootItem()
-            
-        try:
-            # List directory contents
-            items = os.listdir(path)
-            
-            # Sort items: directories first, then files
-            dirs = sorted([item for item in items if os.path.isdir(os.path.join(path, item))])
-            files = sorted([item for item in items if os.path.isfile(os.path.join(path, item))])
-            
-            # Add directories
-            for dir_name in dirs:
-                dir_path = os.path.join(path, dir_name)
-                try:
-                    item = QStandardItem(dir_name)
-                    item.setData(dir_path, Qt.ItemDataRole.UserRole)
-                    if parent_item:
-                        parent_item.appendRow(item)
-                except Exception:
-                    continue
-            
-            # Add files
-            for file_name in files:
-                file_path = os.path.join(path, file_name)
-                try:
-                    item = QStandardItem(file_name)
-                    item.setData(file_path, Qt.ItemDataRole.UserRole)
-                    if parent_item:
-                        parent_item.appendRow(item)
-                except Exception:
-                    continue
-                    
-        except PermissionError:
-            pass
-        except Exception:
-            pass
+
+        if parent_item is None:
+            return
+
+        # Listing happens on a worker thread, rows arrive in batches through add_entries
+        parent_item.setData(True, self.LOADED_ROLE)
+        self.loading_items[self.scanner.scan(path)] = parent_item
+        self.watch_directory(path, parent_item)
+
+    def create_item(self, name: str, path: str, is_dir: bool) -> QStandardItem:
+        item = QStandardItem(name)
+        item.setData(path, Qt.ItemDataRole.UserRole)
+        item.setData(is_dir, self.IS_DIR_ROLE)
+        # Directories sort before files
+        item.setData(("0" if is_dir else "1") + name, self.SORT_ROLE)
+        if is_dir:
+            # Placeholder child gives the directory an expand arrow until it is first opened
+            item.appendRow(QStandardItem("Loading..."))
+        return item
+
+    def add_entries(self, scan_id: int, entries: list):
+        if scan_id in self.refresh_scans:
+            self.refresh_scans[scan_id][1].extend(entries)
+            return
+
+        parent_item = self.loading_items.get(scan_id)
+        if parent_item is None:
+            return
+
+        # Drop the placeholder before the first real batch lands
+        if parent_item.rowCount() and parent_item.child(0).data(Qt.ItemDataRole.UserRole) is None:
+            parent_item.removeRow(0)
+        # Each batch is sorted on its own and interleaves with the rows already shown. Sorting the children
+        # again keeps any row the user already expanded expanded
+        parent_item.appendRows([self.create_item(name, entry_path, is_dir) for name, entry_path, is_dir in entries])
+        if parent_item.rowCount() > len(entries):
+            parent_item.sortChildren(0)
+
+    def finish_loading(self, scan_id: int):
+        if scan_id in self.refresh_scans:
+            self.refresh_scans[scan_id][2] = True
+            if all(finished for _, _, finished in self.refresh_scans.values()):
+                self.apply_refreshes()
+            return
+
+        parent_item = self.loading_items.pop(scan_id, None)
+        if parent_item is None:
+            return
+
+        # Empty or unreadable directories keep no placeholder
+        if parent_item.rowCount() and parent_item.child(0).data(Qt.ItemDataRole.UserRole) is None:
+            parent_item.removeRow(0)
+
+    def on_item_expanded(self, index):
+        if self._model is None:
+            return
+
+        item = self._model.itemFromIndex(index)
+        if item and not item.data(self.LOADED_ROLE):
+            self.populate_tree(item.data(Qt.ItemDataRole.UserRole), item)
 
     def on_item_clicked(self, index):
         if self._model is None:
@@ -88,12 +151,12 @@ class FileExplorer(QTreeView):
         item = self._model.itemFromIndex(index)
         if item:
             path = item.data(Qt.ItemDataRole.UserRole)
+            if path is None:
+                return
             if os.path.isdir(path):
                 if self.isExpanded(index):
                     self.collapse(index)
                 else:
-                    item.removeRows(0, item.rowCount())
-                    self.populate_tree(path, item)
                     self.expand(index)
             else:
                 self.file_selected.emit(path)
@@ -104,5 +167,113 @@ class FileExplorer(QTreeView):
             self.populate_tree(path)
 
     def refresh(self) -> None:
-        if self.current_path:
-            self.populate_tree(self.current_path)
+        # Re-list every loaded directory and apply only the differences
+        for path in self.directory_items:
+            self.queue_refresh(path)
+
+    def watch_directory(self, path: str, item: QStandardItem):
+        self.directory_items[path] = item
+        if path not in self.watcher.directories() and not self.watcher.addPath(path):
+            # Out of watch descriptors or unsupported filesystem, poll the mtime instead
+            try:
+                self.polled_directories[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                return
+            if not self.poll_timer.isActive():
+                self.poll_timer.start()
+
+    def unwatch_directories(self, paths: List[str]):
+        watched = set(self.watcher.directories())
+        for path in paths:
+            self.directory_items.pop(path, None)
+            self.polled_directories.pop(path, None)
+            self.pending_refreshes.discard(path)
+            if path in watched:
+                self.watcher.removePath(path)
+        if not self.polled_directories:
+            self.poll_timer.stop()
+
+    def poll_directories(self):
+        for path, mtime in list(self.polled_directories.items()):
+            try:
+                current_mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if current_mtime != mtime:
+                self.polled_directories[path] = current_mtime
+                self.queue_refresh(path)
+
+    def queue_refresh(self, path: str):
+        if path in self.directory_items:
+            self.pending_refreshes.add(path)
+            self.refresh_timer.start()
+
+    def start_pending_refreshes(self):
+        # Wait for refreshes already in flight so their results land in the same update
+        if self.refresh_scans:
+            self.refresh_timer.start()
+            return
+
+        # Directories still on their first listing are retried after it lands
+        loading = [id(item) for item in self.loading_items.values()]
+        for path in list(self.pending_refreshes):
+            if id(self.directory_items[path]) not in loading:
+                self.refresh_scans[self.scanner.scan(path)] = [path, [], False]
+                self.pending_refreshes.discard(path)
+        if self.pending_refreshes:
+            self.refresh_timer.start()
+
+    def apply_refreshes(self):
+        refreshes = list(self.refresh_scans.values())
+        self.refresh_scans.clear()
+
+        self.setUpdatesEnabled(False)
+        try:
+            for path, entries, _ in refreshes:
+                parent_item = self.directory_items.get(path)
+                if parent_item is not None:
+                    self.apply_directory_changes(parent_item, entries)
+        finally:
+            self.setUpdatesEnabled(True)
+
+    def apply_directory_changes(self, parent_item: QStandardItem, entries: list):
+        listed = {name: (entry_path, is_dir) for name, entry_path, is_dir in entries}
+
+        # Deleted entries, and the old side of renames or file/directory swaps
+        for row in range(parent_item.rowCount() - 1, -1, -1):
+            child = parent_item.child(row)
+            path = child.data(Qt.ItemDataRole.UserRole)
+            if path is None:
+                continue
+            entry = listed.get(child.text())
+            if entry is None or entry[1] != bool(child.data(self.IS_DIR_ROLE)):
+                self.forget_subtree(path)
+                parent_item.removeRow(row)
+            else:
+                del listed[child.text()]
+
+        # Created entries, and the new side of renames, inserted at their sorted position
+        for name, (entry_path, is_dir) in sorted(listed.items(), key=lambda entry: (not entry[1][1], entry[0])):
+            row = self.sorted_row(parent_item, (not is_dir, name))
+            parent_item.insertRow(row, self.create_item(name, entry_path, is_dir))
+
+    def sorted_row(self, parent_item: QStandardItem, key: tuple) -> int:
+        low, high = 0, parent_item.rowCount()
+        while low < high:
+            middle = (low + high) // 2
+            child = parent_item.child(middle)
+            if (not child.data(self.IS_DIR_ROLE), child.text()) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def forget_subtree(self, path: str):
+        # Items under a removed row are deleted with it, drop every reference to them
+        prefix = path + os.sep
+        self.unwatch_directories([watched for watched in self.directory_items
+                                  if watched == path or watched.startswith(prefix)])
+        for scan_id, item in list(self.loading_items.items()):
+            item_path = item.data(Qt.ItemDataRole.UserRole) or ""
+            if item_path == path or item_path.startswith(prefix):
+                del self.loading_items[scan_id]
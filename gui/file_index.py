@@ -0,0 +1,295 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, threading, heapq, re, time
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Optional, Dict, List, Callable
+
+class FileIndex:
+    SKIP_DIRECTORIES = {".git", ".hg", ".svn", "__pycache__", "node_modules"}
+    CONTENT_EXTENSIONS = (".bellos",)
+    MAX_CONTENT_BYTES = 1024 * 1024
+    MAX_FUZZY_CANDIDATES = 2000
+
+    def __init__(self, root: str, index_contents: bool = True, update_interval: float = 5.0):
+        self.root = os.path.abspath(root)
+        self.index_contents = index_contents
+        self.update_interval = update_interval
+
+        # Relative paths per directory, keyed by the directory's relative path
+        self.directory_files: Dict[str, List[str]] = {}
+        self.directory_mtimes: Dict[str, int] = {}
+
+        # Trigram -> files containing it, and the trigrams indexed for each file
+        self.trigrams: Dict[str, set] = {}
+        self.file_trigrams: Dict[str, tuple] = {}
+
+        self.paths: List[str] = []
+        self._path_blob = ""
+        self._path_starts: List[int] = []
+        self._dirty = False
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+
+        # Content searches read files, so they run on the index thread; a newer query replaces one not yet started
+        self._wake = threading.Event()
+        self._pending_search: Optional[tuple] = None
+        self._thread: Optional[threading.Thread] = None
+        self.ready = threading.Event()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="bellos-file-index", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def search_text_async(self, query: str, on_results: Callable[[str, List[tuple]], None], limit: int = 50):
+        # on_results is called on the index thread
+        with self._lock:
+            self._pending_search = (query, limit, on_results)
+        self._wake.set()
+
+    def _run(self):
+        self.build()
+        self.ready.set()
+        next_update = time.monotonic() + self.update_interval
+        while not self._stop.is_set():
+            self._wake.wait(max(0.0, next_update - time.monotonic()))
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            with self._lock:
+                search, self._pending_search = self._pending_search, None
+            if search is not None:
+                query, limit, on_results = search
+                on_results(query, self.search_text(query, limit))
+            if time.monotonic() >= next_update:
+                self.update()
+                next_update = time.monotonic() + self.update_interval
+
+    def build(self):
+        with self._lock:
+            self.directory_files.clear()
+            self.directory_mtimes.clear()
+            self.trigrams.clear()
+            self.file_trigrams.clear()
+        self._scan_tree("")
+        self._rebuild_paths()
+
+    def update(self):
+        # Only directories whose mtime moved are re-listed, new subdirectories are walked fully
+        for directory, mtime in list(self.directory_mtimes.items()):
+            try:
+                current_mtime = os.stat(os.path.join(self.root, directory)).st_mtime_ns
+            except OSError:
+                self._remove_directory(directory)
+                continue
+            if current_mtime != mtime:
+                self._scan_directory(directory, recurse_new=True)
+
+        # Content edits do not touch the directory mtime
+        if self.index_contents:
+            for path, (mtime, _) in list(self.file_trigrams.items()):
+                try:
+                    if os.stat(os.path.join(self.root, path)).st_mtime_ns != mtime:
+                        self._index_content(path)
+                except OSError:
+                    continue
+
+        if self._dirty:
+            self._rebuild_paths()
+
+    def _scan_tree(self, directory: str):
+        pending = [directory]
+        while pending and not self._stop.is_set():
+            pending.extend(self._scan_directory(pending.pop()))
+
+    def _scan_directory(self, directory: str, recurse_new: bool = False) -> List[str]:
+        absolute = os.path.join(self.root, directory)
+        files = []
+        subdirectories = []
+        try:
+            mtime = os.stat(absolute).st_mtime_ns
+            with os.scandir(absolute) as iterator:
+                for entry in iterator:
+                    relative = os.path.join(directory, entry.name) if directory else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in self.SKIP_DIRECTORIES:
+                                subdirectories.append(relative)
+                        elif entry.is_file():
+                            files.append(relative)
+                    except OSError:
+                        continue
+        except OSError:
+            self._remove_directory(directory)
+            return []
+
+        with self._lock:
+            old_files = set(self.directory_files.get(directory, ()))
+            self.directory_files[directory] = files
+            self.directory_mtimes[directory] = mtime
+            self._dirty = True
+
+            # Subdirectories that disappeared take their whole subtree with them
+            prefix = directory + os.sep if directory else ""
+            for known in [known for known in self.directory_mtimes
+                          if known != directory and known.startswith(prefix)
+                          and os.sep not in known[len(prefix):] and known not in subdirectories]:
+                self._remove_directory(known)
+
+        if self.index_contents:
+            for path in old_files.difference(files):
+                self._drop_content(path)
+            for path in files:
+                if path.endswith(self.CONTENT_EXTENSIONS) and path not in self.file_trigrams:
+                    self._index_content(path)
+
+        new_subdirectories = [subdirectory for subdirectory in subdirectories if subdirectory not in self.directory_mtimes]
+        if recurse_new:
+            for subdirectory in new_subdirectories:
+                self._scan_tree(subdirectory)
+            return []
+        return subdirectories
+
+    def _remove_directory(self, directory: str):
+        prefix = directory + os.sep if directory else ""
+        with self._lock:
+            for known in [known for known in self.directory_mtimes if known == directory or known.startswith(prefix)]:
+                for path in self.directory_files.pop(known, ()):
+                    self._drop_content(path)
+                del self.directory_mtimes[known]
+            self._dirty = True
+
+    def _index_content(self, path: str):
+        absolute = os.path.join(self.root, path)
+        try:
+            mtime = os.stat(absolute).st_mtime_ns
+            with open(absolute, 'rb') as f:
+                text = f.read(self.MAX_CONTENT_BYTES).decode(errors="replace").lower()
+        except OSError:
+            return
+
+        trigrams = {text[i:i + 3] for i in range(len(text) - 2)}
+        with self._lock:
+            self._drop_content(path)
+            for trigram in trigrams:
+                self.trigrams.setdefault(trigram, set()).add(path)
+            self.file_trigrams[path] = (mtime, trigrams)
+
+    def _drop_content(self, path: str):
+        with self._lock:
+            _, trigrams = self.file_trigrams.pop(path, (None, ()))
+            for trigram in trigrams:
+                paths = self.trigrams.get(trigram)
+                if paths is not None:
+                    paths.discard(path)
+                    if not paths:
+                        del self.trigrams[trigram]
+
+    def _rebuild_paths(self):
+        with self._lock:
+            self.paths = sorted(path for files in self.directory_files.values() for path in files)
+            # One lower-cased blob lets a single regex scan every path at C speed, line N of it is paths[N]
+            keys = [path.lower() for path in self.paths]
+            self._path_blob = "\n".join(keys)
+            self._path_starts = list(accumulate((len(key) + 1 for key in keys[:-1]), initial=0)) if keys else []
+            self._dirty = False
+
+    def search_files(self, query: str, limit: int = 50) -> List[str]:
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        with self._lock:
+            paths, blob, starts = self.paths, self._path_blob, self._path_starts
+
+        # Exact substring hits rank best, fuzzy hits only fill the remaining slots
+        matches = self._matching_lines(blob, starts, lambda position: blob.find(query, position))
+        if len(matches) < limit:
+            # Characters of the query must appear in order within one path; each gap stops at the
+            # first occurrence of the next character so the regex never backtracks
+            pattern = re.compile(re.escape(query[0]) + "".join(
+                "[^\n" + re.escape(char) + "]*" + re.escape(char) for char in query[1:]))
+
+            def fuzzy_search(position: int) -> int:
+                match = pattern.search(blob, position)
+                return -1 if match is None else match.start()
+
+            seen = set(matches)
+            matches.extend(line for line in self._matching_lines(blob, starts, fuzzy_search, self.MAX_FUZZY_CANDIDATES)
+                           if line not in seen)
+
+        def score(line: int) -> tuple:
+            path = self._line(blob, starts, line)
+            name = path[path.rfind(os.sep) + 1:]
+            if query in name:
+                return (0, name.index(query), len(path))
+            if query in path:
+                return (1, len(name), len(path))
+            return (2, len(name), len(path))
+
+        return [os.path.join(self.root, paths[line]) for line in heapq.nsmallest(limit, matches, key=score)]
+
+    def _line(self, blob: str, starts: List[int], line: int) -> str:
+        return blob[starts[line]:starts[line + 1] - 1 if line + 1 < len(starts) else len(blob)]
+
+    def _matching_lines(self, blob: str, starts: List[int], search: Callable[[int], int],
+                        limit: Optional[int] = None) -> List[int]:
+        # Numbers of the lines holding a match, each line counted once
+        lines = []
+        position = search(0)
+        while position != -1 and (limit is None or len(lines) < limit):
+            line = bisect_right(starts, position) - 1
+            lines.append(line)
+            if line + 1 == len(starts):
+                break
+            position = search(starts[line + 1])
+        return lines
+
+    def search_text(self, query: str, limit: int = 50) -> List[tuple]:
+        needle = query.lower()
+        if not needle:
+            return []
+
+        with self._lock:
+            if len(needle) >= 3:
+                candidates = None
+                for trigram in {needle[i:i + 3] for i in range(len(needle) - 2)}:
+                    paths = self.trigrams.get(trigram, set())
+                    candidates = set(paths) if candidates is None else candidates & paths
+                    if not candidates:
+                        return []
+            else:
+                candidates = set(self.file_trigrams)
+
+        # Trigrams only narrow the candidates, the lines themselves confirm the hit
+        results = []
+        for path in sorted(candidates):
+            absolute = os.path.join(self.root, path)
+            try:
+                with open(absolute, 'r', errors="replace") as f:
+                    for line_number, line in enumerate(f, 1):
+                        if needle in line.lower():
+                            results.append((absolute, line_number, line.rstrip("\n")))
+                            if len(results) >= limit:
+                                return results
+            except OSError:
+                continue
+        return results
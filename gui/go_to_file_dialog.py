@@ -0,0 +1,111 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+from PyQt6.QtWidgets import QCheckBox, QDialog, QLineEdit, QListWidget, QListWidgetItem, QVBoxLayout
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer
+
+class GoToFileDialog(QDialog):
+    file_selected = pyqtSignal(str)
+    text_results_ready = pyqtSignal(object, str, object)
+
+    def __init__(self, file_index, parent=None):
+        super().__init__(parent)
+        self.file_index = file_index
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(100)
+        self.search_timer.timeout.connect(self.update_results)
+        self.text_results_ready.connect(self.show_text_results)
+        self.init_ui()
+
+    def init_ui(self):
+        self.setWindowTitle("Go to File")
+        self.resize(600, 400)
+        layout = QVBoxLayout()
+
+        self.query = QLineEdit()
+        self.query.setPlaceholderText("File name...")
+        self.query.textChanged.connect(lambda _: self.search_timer.start())
+        self.query.returnPressed.connect(self.open_current)
+        layout.addWidget(self.query)
+
+        self.search_contents = QCheckBox("Search file contents")
+        self.search_contents.toggled.connect(lambda _: self.search_timer.start())
+        layout.addWidget(self.search_contents)
+
+        self.results = QListWidget()
+        self.results.itemActivated.connect(self.open_item)
+        layout.addWidget(self.results)
+
+        self.setLayout(layout)
+
+    def set_file_index(self, file_index):
+        self.file_index = file_index
+        self.update_results()
+
+    def update_results(self):
+        query = self.query.text()
+        if not self.file_index.ready.is_set():
+            self.results.clear()
+            self.results.addItem("Indexing project...")
+            QTimer.singleShot(500, self.search_timer.start)
+            return
+
+        if self.search_contents.isChecked():
+            # The current results stay up until the index thread has read the files
+            file_index = self.file_index
+            file_index.search_text_async(
+                query, lambda query, matches: self.text_results_ready.emit(file_index, query, matches))
+            return
+
+        self.results.clear()
+        for path in self.file_index.search_files(query):
+            item = QListWidgetItem(os.path.relpath(path, self.file_index.root))
+            item.setData(Qt.ItemDataRole.UserRole, path)
+            self.results.addItem(item)
+        if self.results.count():
+            self.results.setCurrentRow(0)
+
+    def show_text_results(self, file_index, query: str, matches: list):
+        # Results for a query or index that has since been replaced are dropped
+        if file_index is not self.file_index or query != self.query.text() or not self.search_contents.isChecked():
+            return
+        self.results.clear()
+        for path, line_number, line in matches:
+            item = QListWidgetItem(f"{os.path.relpath(path, file_index.root)}:{line_number}: {line.strip()}")
+            item.setData(Qt.ItemDataRole.UserRole, path)
+            self.results.addItem(item)
+        if self.results.count():
+            self.results.setCurrentRow(0)
+
+    def open_current(self):
+        item = self.results.currentItem()
+        if item:
+            self.open_item(item)
+
+    def open_item(self, item):
+        path = item.data(Qt.ItemDataRole.UserRole)
+        if path:
+            self.file_selected.emit(path)
+            self.accept()
+
+    def keyPressEvent(self, event):
+        # Arrow keys move through the results while the query keeps focus
+        if event.key() in (Qt.Key.Key_Up, Qt.Key.Key_Down) and self.results.count():
+            row = self.results.currentRow() + (1 if event.key() == Qt.Key.Key_Down else -1)
+            self.results.setCurrentRow(max(0, min(row, self.results.count() - 1)))
+            return
+        super().keyPressEvent(event)
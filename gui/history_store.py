@@ -0,0 +1,167 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, zlib, sqlite3, hashlib, threading
+from typing import Optional, List, Iterator
+
+class HistoryStore:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS scripts (
+            hash TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            size INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            script_hash TEXT NOT NULL REFERENCES scripts(hash),
+            name TEXT,
+            cwd TEXT,
+            status TEXT,
+            exit_code INTEGER,
+            started_at REAL,
+            ended_at REAL,
+            wall_time REAL,
+            user_time REAL,
+            system_time REAL,
+            peak_rss_kb INTEGER,
+            stdout_bytes INTEGER,
+            stderr_bytes INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS runs_by_name ON runs(name, id);
+    """
+
+    RUN_COLUMNS = ["id", "script_hash", "name", "cwd", "status", "exit_code", "started_at", "ended_at",
+                   "wall_time", "user_time", "system_time", "peak_rss_kb", "stdout_bytes", "stderr_bytes"]
+
+    # Oldest runs beyond this are dropped when the store is opened
+    MAX_RUNS = 100000
+    PAGE_SIZE = 200
+
+    # Script hashes known to be stored, a rerun of one of them only adds its run row
+    MAX_KNOWN_SCRIPTS = 4096
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path if path is not None else self.default_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        # Reader threads record runs, one connection behind a lock serves all of them
+        self._lock = threading.Lock()
+        self._known_scripts: set = set()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(self.SCHEMA)
+        self.prune(self.MAX_RUNS)
+
+    @staticmethod
+    def default_path() -> str:
+        data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+        return os.path.join(data_home, "bellos_application_manager", "history.sqlite3")
+
+    @staticmethod
+    def script_hash(script_content: str) -> str:
+        return hashlib.sha256(script_content.encode()).hexdigest()
+
+    def start_run(self, script_content: str, digest: str, name: Optional[str], cwd: Optional[str],
+                  started_at: float) -> int:
+        # Each distinct script body is stored once, compressed, and runs point at it by hash
+        with self._lock:
+            if digest in self._known_scripts:
+                return self._connection.execute(
+                    "INSERT INTO runs (script_hash, name, cwd, status, started_at) VALUES (?, ?, ?, 'running', ?)",
+                    (digest, name, cwd, started_at)).lastrowid
+
+            data = script_content.encode()
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.execute("INSERT OR IGNORE INTO scripts (hash, body, size) VALUES (?, ?, ?)",
+                                         (digest, zlib.compress(data), len(data)))
+                cursor = self._connection.execute(
+                    "INSERT INTO runs (script_hash, name, cwd, status, started_at) VALUES (?, ?, ?, 'running', ?)",
+                    (digest, name, cwd, started_at))
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            if len(self._known_scripts) >= self.MAX_KNOWN_SCRIPTS:
+                self._known_scripts.clear()
+            self._known_scripts.add(digest)
+            return cursor.lastrowid
+
+    def finish_run(self, run_id: int, metrics: dict):
+        # What start_run wrote does not change, fewer columns make a cheaper update
+        columns = [column for column in self.RUN_COLUMNS
+                   if column in metrics and column not in ("id", "script_hash", "cwd", "started_at")]
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        with self._lock:
+            self._connection.execute(f"UPDATE runs SET {assignments} WHERE id = ?",
+                                     [metrics[column] for column in columns] + [run_id])
+
+    def get_runs(self, before_id: Optional[int] = None, limit: Optional[int] = None,
+                 name: Optional[str] = None) -> List[dict]:
+        # Keyset paging, newest first: pass the smallest id of a page to get the next one
+        query = f"SELECT {', '.join(self.RUN_COLUMNS)} FROM runs WHERE 1 = 1"
+        parameters: list = []
+        if before_id is not None:
+            query += " AND id < ?"
+            parameters.append(before_id)
+        if name is not None:
+            query += " AND name = ?"
+            parameters.append(name)
+        query += " ORDER BY id DESC LIMIT ?"
+        parameters.append(limit or self.PAGE_SIZE)
+        with self._lock:
+            rows = self._connection.execute(query, parameters).fetchall()
+        return [dict(zip(self.RUN_COLUMNS, row)) for row in rows]
+
+    def get_script(self, digest: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute("SELECT body FROM scripts WHERE hash = ?", (digest,)).fetchone()
+        return zlib.decompress(row[0]).decode() if row else None
+
+    def iter_scripts(self) -> Iterator[str]:
+        # Bodies of every run, oldest first, read one page at a time
+        after_id = 0
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT runs.id, scripts.body FROM runs JOIN scripts ON scripts.hash = runs.script_hash "
+                    "WHERE runs.id > ? ORDER BY runs.id LIMIT ?", (after_id, self.PAGE_SIZE)).fetchall()
+            if not rows:
+                return
+            for _, body in rows:
+                yield zlib.decompress(body).decode()
+            after_id = rows[-1][0]
+
+    def count_runs(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def prune(self, max_runs: int):
+        with self._lock:
+            self._connection.execute("DELETE FROM runs WHERE id <= (SELECT MAX(id) FROM runs) - ?", (max_runs,))
+            self._connection.execute("DELETE FROM scripts WHERE hash NOT IN (SELECT DISTINCT script_hash FROM runs)")
+            self._known_scripts.clear()
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM runs")
+            self._connection.execute("DELETE FROM scripts")
+            self._known_scripts.clear()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
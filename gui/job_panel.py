@@ -0,0 +1,93 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+from typing import Dict
+from PyQt6.QtWidgets import (QAbstractItemView, QHBoxLayout, QLabel, QPushButton, QSpinBox,
+                             QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget)
+from PyQt6.QtCore import Qt
+
+class JobPanel(QWidget):
+    def __init__(self, script_runner):
+        super().__init__()
+        self.script_runner = script_runner
+        self.job_items: Dict[int, QTreeWidgetItem] = {}
+        self.setup_ui()
+
+        self.script_runner.job_updated.connect(self.update_job)
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        # Job list
+        self.job_tree = QTreeWidget()
+        self.job_tree.setHeaderLabels(["Job", "Directory", "Status", "Exit Code", "Wall Time"])
+        self.job_tree.setRootIsDecorated(False)
+        self.job_tree.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        layout.addWidget(self.job_tree)
+
+        # Controls
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(QLabel("Max Concurrency:"))
+        self.max_concurrency = QSpinBox()
+        self.max_concurrency.setRange(1, 256)
+        button_layout.addWidget(self.max_concurrency)
+
+        cancel_button = QPushButton("Cancel Selected")
+        cancel_button.clicked.connect(self.cancel_selected)
+        cancel_all_button = QPushButton("Cancel All")
+        cancel_all_button.clicked.connect(self.script_runner.cancel_all)
+        clear_button = QPushButton("Clear Finished")
+        clear_button.clicked.connect(self.clear_finished)
+        button_layout.addWidget(cancel_button)
+        button_layout.addWidget(cancel_all_button)
+        button_layout.addWidget(clear_button)
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+    def load_max_concurrency(self):
+        # The limit comes from the script settings, which are read after the window is up
+        self.max_concurrency.setValue(self.script_runner.script_manager.max_concurrency)
+        self.max_concurrency.valueChanged.connect(self.save_max_concurrency)
+
+    def save_max_concurrency(self, max_concurrency: int):
+        # Kept across restarts, the script manager applies the limit as the setting changes
+        self.script_runner.script_manager.settings.update(max_concurrency=max_concurrency)
+
+    def update_job(self, job):
+        item = self.job_items.get(job.job_id)
+        if item is None:
+            item = QTreeWidgetItem([str(job.job_id), job.cwd or os.getcwd()])
+            item.setData(0, Qt.ItemDataRole.UserRole, job.job_id)
+            self.job_tree.addTopLevelItem(item)
+            self.job_items[job.job_id] = item
+
+        item.setText(2, job.status)
+        item.setText(3, "" if job.exit_code is None else str(job.exit_code))
+        wall_time = job.wall_time
+        item.setText(4, "" if wall_time is None or job.end_time is None else f"{wall_time:.2f}s")
+
+    def cancel_selected(self):
+        for item in self.job_tree.selectedItems():
+            self.script_runner.cancel(item.data(0, Qt.ItemDataRole.UserRole))
+
+    def clear_finished(self):
+        self.script_runner.script_manager.clear_finished_jobs()
+        remaining = {job.job_id for job in self.script_runner.script_manager.get_jobs()}
+        for job_id in list(self.job_items.keys()):
+            if job_id not in remaining:
+                item = self.job_items.pop(job_id)
+                self.job_tree.takeTopLevelItem(self.job_tree.indexOfTopLevelItem(item))
@@ -0,0 +1,87 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, mmap
+from PyQt6.QtWidgets import QPlainTextEdit
+from PyQt6.QtCore import pyqtSignal, QObject, QTimer
+from PyQt6.QtGui import QTextCursor
+
+class ChunkedFileLoader(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(str)
+
+    CHUNK_SIZE = 128 * 1024
+
+    def __init__(self, file_name: str, editor: QPlainTextEdit, parent=None):
+        super().__init__(parent)
+        self.file_name = file_name
+        self.editor = editor
+        self.offset = 0
+        self.cancelled = False
+
+        # The mapping lets each chunk be decoded straight from the page cache
+        self.file = open(file_name, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    def start(self):
+        self.editor.clear()
+        self.editor.setReadOnly(True)
+        self.editor.document().setUndoRedoEnabled(False)
+        QTimer.singleShot(0, self.load_next_chunk)
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            self.close()
+
+    def load_next_chunk(self):
+        if self.cancelled:
+            return
+
+        if self.offset < self.size:
+            end = self.next_boundary(min(self.offset + self.CHUNK_SIZE, self.size))
+            cursor = QTextCursor(self.editor.document())
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertText(self.mapping[self.offset:end].decode('utf-8', errors='replace'))
+            self.offset = end
+            self.progress.emit(int(self.offset * 100 / self.size))
+
+        # Yield to the event loop between chunks
+        if self.offset < self.size:
+            QTimer.singleShot(0, self.load_next_chunk)
+        else:
+            self.close()
+            self.finished.emit(self.file_name)
+
+    def next_boundary(self, end: int) -> int:
+        if end >= self.size:
+            return self.size
+
+        # Prefer ending on a line, never in the middle of a UTF-8 sequence
+        newline = self.mapping.rfind(b"\n", self.offset, end)
+        if newline != -1:
+            return newline + 1
+        while end > self.offset + 1 and (self.mapping[end] & 0xC0) == 0x80:
+            end -= 1
+        return end
+
+    def close(self):
+        self.editor.document().setUndoRedoEnabled(True)
+        self.editor.setReadOnly(False)
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+        self.file.close()
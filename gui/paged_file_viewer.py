@@ -0,0 +1,287 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, re, mmap, bisect, threading
+from array import array
+from typing import Optional, Callable
+from PyQt6.QtWidgets import (QHBoxLayout, QLabel, QLineEdit, QPlainTextEdit, QPushButton, QSpinBox,
+                             QVBoxLayout, QWidget)
+from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtGui import QFont, QTextCursor
+
+class LineIndex:
+    # Newlines are counted per chunk, any line is then a bisect plus a scan of at most one chunk away
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, mapping, size: int):
+        self.mapping = mapping
+        self.size = size
+        self.checkpoints = array('q')
+        self.line_count: Optional[int] = None
+        self.stopped = False
+
+    def build(self, progress: Optional[Callable[[int], None]] = None):
+        newlines = 0
+        for start in range(0, self.size, self.CHUNK_SIZE):
+            if self.stopped:
+                return
+            self.checkpoints.append(newlines)
+            newlines += self.mapping[start:start + self.CHUNK_SIZE].count(b"\n")
+            if progress and len(self.checkpoints) % 64 == 0:
+                progress(start)
+        ends_with_newline = not self.size or self.mapping[self.size - 1:self.size] == b"\n"
+        self.line_count = newlines if ends_with_newline else newlines + 1
+
+    def line_number(self, offset: int) -> int:
+        # Zero-based line containing the byte at offset
+        chunk = offset // self.CHUNK_SIZE
+        return self.checkpoints[chunk] + self.mapping[chunk * self.CHUNK_SIZE:offset].count(b"\n")
+
+    def line_offset(self, line: int) -> int:
+        # Byte offset where the zero-based line starts
+        if line <= 0:
+            return 0
+        chunk = bisect.bisect_left(self.checkpoints, line) - 1
+        offset = chunk * self.CHUNK_SIZE
+        for _ in range(line - self.checkpoints[chunk]):
+            offset = self.mapping.find(b"\n", offset) + 1
+        return offset
+
+
+class PagedFileViewer(QWidget):
+    PAGE_SIZE = 1024 * 1024
+
+    # Bytes handed to the regex engine per call, which holds the GIL for the whole call
+    SEARCH_CHUNK_SIZE = 4 * 1024 * 1024
+
+    index_progress = pyqtSignal(int)
+    index_ready = pyqtSignal()
+    search_result = pyqtSignal(int, int, int)
+
+    def __init__(self, file_name: str):
+        super().__init__()
+        self.file_name = file_name
+        self.page = 0
+
+        # Only the current page is ever decoded, the rest stays in the mapping
+        self.file = open(file_name, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self.page_count = max(1, -(-self.size // self.PAGE_SIZE))
+
+        # Line offsets are indexed and searches run on background threads, straight from the mapping
+        self.line_index = LineIndex(self.mapping, self.size)
+        self.search_from = 0
+        self.search_generation = 0
+        self.index_thread: Optional[threading.Thread] = None
+        self.search_thread: Optional[threading.Thread] = None
+
+        self.init_ui()
+        self.index_progress.connect(self.on_index_progress)
+        self.index_ready.connect(self.on_index_ready)
+        self.search_result.connect(self.on_search_result)
+        self.show_page(0)
+        self.start_indexing()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        # Line and search navigation
+        search_layout = QHBoxLayout()
+        self.line_spin = QSpinBox()
+        self.line_spin.setEnabled(False)
+        self.line_spin.editingFinished.connect(lambda: self.go_to_line(self.line_spin.value()))
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Regular expression")
+        self.search_edit.returnPressed.connect(self.find_next)
+        self.find_button = QPushButton("Find Next")
+        self.find_button.clicked.connect(self.find_next)
+        self.status_label = QLabel()
+        search_layout.addWidget(QLabel("Line:"))
+        search_layout.addWidget(self.line_spin)
+        search_layout.addWidget(self.search_edit)
+        search_layout.addWidget(self.find_button)
+        search_layout.addWidget(self.status_label)
+        layout.addLayout(search_layout)
+
+        self.text_view = QPlainTextEdit()
+        self.text_view.setReadOnly(True)
+        self.text_view.setUndoRedoEnabled(False)
+        self.text_view.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text_view.setFont(QFont("Courier New", 10))
+        layout.addWidget(self.text_view)
+
+        # Page navigation
+        navigation_layout = QHBoxLayout()
+        self.previous_button = QPushButton("Previous Page")
+        self.previous_button.clicked.connect(lambda: self.show_page(self.page - 1))
+        self.next_button = QPushButton("Next Page")
+        self.next_button.clicked.connect(lambda: self.show_page(self.page + 1))
+        self.page_spin = QSpinBox()
+        self.page_spin.setRange(1, self.page_count)
+        self.page_spin.editingFinished.connect(lambda: self.show_page(self.page_spin.value() - 1))
+        self.page_label = QLabel()
+        navigation_layout.addWidget(self.previous_button)
+        navigation_layout.addWidget(self.page_spin)
+        navigation_layout.addWidget(self.page_label)
+        navigation_layout.addStretch()
+        navigation_layout.addWidget(self.next_button)
+        layout.addLayout(navigation_layout)
+
+        self.setLayout(layout)
+
+    def page_start(self, page: int) -> int:
+        # Pages start on the line after each PAGE_SIZE boundary so no line is split
+        if page <= 0 or self.mapping is None:
+            return 0
+        offset = page * self.PAGE_SIZE
+        if offset >= self.size:
+            return self.size
+        newline = self.mapping.find(b"\n", offset)
+        return self.size if newline == -1 else newline + 1
+
+    def page_of(self, offset: int) -> int:
+        page = min(offset // self.PAGE_SIZE, self.page_count - 1)
+        if page > 0 and self.page_start(page) > offset:
+            page -= 1
+        return page
+
+    def show_page(self, page: int):
+        self.page = max(0, min(page, self.page_count - 1))
+        start = self.page_start(self.page)
+        end = self.page_start(self.page + 1)
+        text = self.mapping[start:end].decode('utf-8', errors='replace') if self.mapping is not None else ""
+        self.text_view.setPlainText(text)
+        self.search_from = start
+
+        self.page_spin.setValue(self.page + 1)
+        self.page_label.setText(f"of {self.page_count}  ({self.size:,} bytes, read-only)")
+        self.previous_button.setEnabled(self.page > 0)
+        self.next_button.setEnabled(self.page < self.page_count - 1)
+
+    def show_offset(self, offset: int, end: Optional[int] = None):
+        # Shows the page holding offset and selects up to end, positions count UTF-16 units like QTextCursor
+        page = self.page_of(offset)
+        if page != self.page:
+            self.show_page(page)
+        start = self.page_start(self.page)
+
+        def position(byte_offset: int) -> int:
+            return len(self.mapping[start:byte_offset].decode('utf-8', errors='replace').encode('utf-16-le')) // 2
+
+        cursor = self.text_view.textCursor()
+        cursor.setPosition(position(offset))
+        if end is not None:
+            cursor.setPosition(position(min(end, self.page_start(self.page + 1))), QTextCursor.MoveMode.KeepAnchor)
+        self.text_view.setTextCursor(cursor)
+        self.text_view.centerCursor()
+
+    def start_indexing(self):
+        if self.mapping is None:
+            self.line_index.line_count = 0
+            self.on_index_ready()
+            return
+
+        def run():
+            try:
+                self.line_index.build(self.index_progress.emit)
+            except ValueError:
+                return  # Mapping closed underneath
+            if self.line_index.line_count is not None:
+                self.index_ready.emit()
+
+        self.status_label.setText("Indexing lines...")
+        self.index_thread = threading.Thread(target=run, name="bellos-line-index", daemon=True)
+        self.index_thread.start()
+
+    def on_index_progress(self, offset: int):
+        if self.line_index.line_count is None:
+            self.status_label.setText(f"Indexing lines... {offset * 100 // max(1, self.size)}%")
+
+    def on_index_ready(self):
+        self.line_spin.setRange(1, max(1, self.line_index.line_count))
+        self.line_spin.setEnabled(True)
+        self.status_label.setText(f"{self.line_index.line_count:,} lines")
+
+    def go_to_line(self, line: int):
+        if self.line_index.line_count is None or self.mapping is None:
+            return
+        line = max(1, min(line, self.line_index.line_count))
+        self.show_offset(self.line_index.line_offset(line - 1))
+
+    def find_next(self):
+        if self.mapping is None or not self.search_edit.text():
+            return
+        try:
+            regex = re.compile(self.search_edit.text().encode(), re.MULTILINE)
+        except re.error as e:
+            self.status_label.setText(f"Invalid pattern: {e}")
+            return
+
+        # A newer search supersedes one still running
+        self.search_generation += 1
+        generation = self.search_generation
+        start = self.search_from
+
+        def run():
+            try:
+                match = self.search(regex, start, self.size, generation) or self.search(regex, 0, start, generation)
+            except ValueError:
+                return
+            if generation == self.search_generation:
+                self.search_result.emit(generation, match.start() if match else -1, match.end() if match else -1)
+
+        self.status_label.setText("Searching...")
+        self.search_thread = threading.Thread(target=run, name="bellos-log-search", daemon=True)
+        self.search_thread.start()
+
+    def search(self, regex, start: int, end: int, generation: int):
+        # Chunks end on line boundaries, so a match within a line is never split
+        position = start
+        while position < end and generation == self.search_generation:
+            chunk_end = min(end, position + self.SEARCH_CHUNK_SIZE)
+            if chunk_end < end:
+                newline = self.mapping.find(b"\n", chunk_end, end)
+                chunk_end = end if newline == -1 else newline + 1
+            match = regex.search(self.mapping, position, chunk_end)
+            if match:
+                return match
+            position = chunk_end
+        return None
+
+    def on_search_result(self, generation: int, start: int, end: int):
+        if generation != self.search_generation or self.mapping is None:
+            return
+        if start < 0:
+            self.status_label.setText("No matches")
+            return
+        self.show_offset(start, end)
+        self.search_from = max(end, start + 1)
+        if self.line_index.line_count is not None:
+            self.status_label.setText(f"Match on line {self.line_index.line_number(start) + 1:,}")
+        else:
+            self.status_label.setText("Match found")
+
+    def close_file(self):
+        # Background readers stop within one chunk and must let go of the mapping before it is closed
+        self.line_index.stopped = True
+        self.search_generation += 1
+        for thread in (self.index_thread, self.search_thread):
+            if thread is not None:
+                thread.join()
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+        self.file.close()
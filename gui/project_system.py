@@ -13,14 +13,20 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from header_imports import *
+import shlex
+from PyQt6.QtWidgets import (QCheckBox, QComboBox, QFileDialog, QFormLayout, QHBoxLayout, QLineEdit,
+                             QMessageBox, QPushButton, QSpinBox, QVBoxLayout, QWidget)
+
+from .settings_service import SettingsService
 
 class ProjectSettings(QWidget):
-    def __init__(self):
+    def __init__(self, settings: SettingsService):
         super().__init__()
-        self.settings_file = "bellos_settings.bellande"
+        self.settings = settings
+        self.loading = False
         self.init_ui()
         self.load_settings()
+        self.connect_fields()
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -62,6 +68,15 @@ class ProjectSettings(QWidget):
         self.show_line_numbers.setChecked(True)
         form_layout.addRow("Show Line Numbers:", self.show_line_numbers)
 
+        self.live_validation = QCheckBox()
+        self.live_validation.setChecked(True)
+        form_layout.addRow("Live Validation:", self.live_validation)
+
+        self.tab_memory_budget = QSpinBox()
+        self.tab_memory_budget.setRange(16, 4096)
+        self.tab_memory_budget.setValue(256)
+        form_layout.addRow("Inactive Tab Memory Budget (MB):", self.tab_memory_budget)
+
         # Terminal settings
         self.terminal_font_size = QSpinBox()
         self.terminal_font_size.setRange(8, 24)
@@ -82,6 +97,22 @@ class ProjectSettings(QWidget):
         self.default_timeout.setValue(30)
         form_layout.addRow("Default Script Timeout (seconds):", self.default_timeout)
 
+        # Runs whose script, shell, directory and declared inputs match a finished run reuse its output
+        self.result_cache = QCheckBox()
+        form_layout.addRow("Cache Script Results:", self.result_cache)
+
+        self.result_cache_inputs = QLineEdit()
+        self.result_cache_inputs.setPlaceholderText("Files the scripts read, relative to the run directory")
+        form_layout.addRow("Cached Run Input Files:", self.result_cache_inputs)
+
+        self.result_cache_env = QLineEdit()
+        self.result_cache_env.setPlaceholderText("Environment variables the scripts read")
+        form_layout.addRow("Cached Run Environment Variables:", self.result_cache_env)
+
+        # Stored under the project path and applied only while that project is open
+        self.project_override = QCheckBox()
+        form_layout.addRow("Save for This Project Only:", self.project_override)
+
         layout.addLayout(form_layout)
 
         # Buttons
@@ -96,52 +127,102 @@ class ProjectSettings(QWidget):
 
         self.setLayout(layout)
 
+    def connect_fields(self):
+        # Every change reaches the settings service right away, the file is written shortly after
+        for line_edit in (self.project_name, self.project_path, self.script_extension, self.result_cache_inputs,
+                          self.result_cache_env):
+            line_edit.editingFinished.connect(self.apply_settings)
+        self.default_shell.currentTextChanged.connect(self.apply_settings)
+        for spin_box in (self.tab_width, self.tab_memory_budget, self.terminal_font_size,
+                         self.terminal_history_size, self.default_timeout):
+            spin_box.valueChanged.connect(self.apply_settings)
+        for check_box in (self.auto_save, self.auto_indent, self.show_line_numbers, self.live_validation,
+                          self.result_cache, self.project_override):
+            check_box.toggled.connect(self.apply_settings)
+
     def browse_path(self):
         path = QFileDialog.getExistingDirectory(self, "Select Project Directory")
         if path:
             self.project_path.setText(path)
+            self.apply_settings()
+
+    def apply_settings(self, *args):
+        if self.loading:
+            return
+
+        # The project path picks the project, so it is always global, and a new project brings its own values
+        project_path = self.project_path.text()
+        if project_path != self.settings.get("project_path"):
+            self.settings.update(project_path=project_path)
+            self.load_settings()
+            return
 
-    def save_settings(self):
         settings = {
             "project_name": self.project_name.text(),
-            "project_path": self.project_path.text(),
             "default_shell": self.default_shell.currentText(),
             "tab_width": self.tab_width.value(),
             "auto_save": self.auto_save.isChecked(),
             "auto_indent": self.auto_indent.isChecked(),
             "show_line_numbers": self.show_line_numbers.isChecked(),
+            "live_validation": self.live_validation.isChecked(),
+            "tab_memory_budget": self.tab_memory_budget.value(),
             "terminal_font_size": self.terminal_font_size.value(),
             "terminal_history_size": self.terminal_history_size.value(),
             "script_extension": self.script_extension.text(),
-            "default_timeout": self.default_timeout.value()
+            "default_timeout": self.default_timeout.value(),
+            "result_cache": self.result_cache.isChecked(),
+            "result_cache_inputs": self.split_list(self.result_cache_inputs.text()),
+            "result_cache_env": self.result_cache_env.text().split()
         }
 
+        if project_path and self.project_override.isChecked():
+            self.settings.update(settings, project=project_path)
+        else:
+            self.settings.update(settings)
+            if project_path:
+                self.settings.clear_project_overrides(project_path)
+
+    def split_list(self, text: str) -> list:
+        # Shell quoting allows paths with spaces
+        try:
+            return shlex.split(text)
+        except ValueError:
+            return text.split()
+
+    def save_settings(self):
+        self.apply_settings()
         try:
-            with open(self.settings_file, 'w') as f:
-                json.dump(settings, f, indent=4)
+            self.settings.flush()
             QMessageBox.information(self, "Success", "Settings saved successfully!")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Could not save settings: {str(e)}")
 
     def load_settings(self):
-        if os.path.exists(self.settings_file):
-            try:
-                with open(self.settings_file, 'r') as f:
-                    settings = json.load(f)
-                
-                self.project_name.setText(settings.get("project_name", ""))
-                self.project_path.setText(settings.get("project_path", ""))
-                self.default_shell.setCurrentText(settings.get("default_shell", "bellos"))
-                self.tab_width.setValue(settings.get("tab_width", 4))
-                self.auto_save.setChecked(settings.get("auto_save", False))
-                self.auto_indent.setChecked(settings.get("auto_indent", True))
-                self.show_line_numbers.setChecked(settings.get("show_line_numbers", True))
-                self.terminal_font_size.setValue(settings.get("terminal_font_size", 10))
-                self.terminal_history_size.setValue(settings.get("terminal_history_size", 1000))
-                self.script_extension.setText(settings.get("script_extension", ".bellos"))
-                self.default_timeout.setValue(settings.get("default_timeout", 30))
-            except Exception as e:
-                QMessageBox.warning(self, "Warning", f"Could not load settings: {str(e)}")
+        settings = self.settings.values()
+        self.loading = True
+        try:
+            self.project_name.setText(settings["project_name"])
+            self.project_path.setText(settings["project_path"])
+            self.default_shell.setCurrentText(settings["default_shell"])
+            self.tab_width.setValue(settings["tab_width"])
+            self.auto_save.setChecked(settings["auto_save"])
+            self.auto_indent.setChecked(settings["auto_indent"])
+            self.show_line_numbers.setChecked(settings["show_line_numbers"])
+            self.live_validation.setChecked(settings["live_validation"])
+            self.tab_memory_budget.setValue(settings["tab_memory_budget"])
+            self.terminal_font_size.setValue(settings["terminal_font_size"])
+            self.terminal_history_size.setValue(settings["terminal_history_size"])
+            self.script_extension.setText(settings["script_extension"])
+            self.default_timeout.setValue(settings["default_timeout"])
+            self.result_cache.setChecked(settings["result_cache"])
+            self.result_cache_inputs.setText(shlex.join(settings["result_cache_inputs"]))
+            self.result_cache_env.setText(" ".join(settings["result_cache_env"]))
+            self.project_override.setChecked(bool(settings["project_path"]
+                                                  and self.settings.project_overrides(settings["project_path"])))
+        except Exception as e:
+            QMessageBox.warning(self, "Warning", f"Could not load settings: {str(e)}")
+        finally:
+            self.loading = False
 
     def reset_settings(self):
         reply = QMessageBox.question(self, "Confirm Reset", 
@@ -155,7 +236,13 @@ class ProjectSettings(QWidget):
             self.auto_save.setChecked(False)
             self.auto_indent.setChecked(True)
             self.show_line_numbers.setChecked(True)
+            self.live_validation.setChecked(True)
+            self.tab_memory_budget.setValue(256)
             self.terminal_font_size.setValue(10)
             self.terminal_history_size.setValue(1000)
             self.script_extension.setText(".bellos")
             self.default_timeout.setValue(30)
+            self.result_cache.setChecked(False)
+            self.result_cache_inputs.clear()
+            self.result_cache_env.clear()
+            self.apply_settings()
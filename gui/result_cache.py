@@ -0,0 +1,188 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, json, zlib, shutil, sqlite3, hashlib, threading, time
+from typing import Optional, Dict, List, Callable
+
+class CachedResult:
+    def __init__(self, exit_code: int, output: List[tuple], created_at: float):
+        self.exit_code = exit_code
+        # (stream, text) chunks in the order the run produced them
+        self.output = output
+        self.created_at = created_at
+
+
+class ResultRecorder:
+    def __init__(self, key: str, script_hash: str, max_bytes: int):
+        self.key = key
+        self.script_hash = script_hash
+        self.max_bytes = max_bytes
+        self.output: List[tuple] = []
+        self.size = 0
+        self.overflow = False
+
+    def write(self, text: str, stream: str):
+        # A run whose output would not fit in one cache entry is not kept at all
+        if self.overflow:
+            return
+        self.size += len(text) + len(stream) + 8
+        if self.size > self.max_bytes:
+            self.overflow = True
+            self.output = []
+            return
+        self.output.append((stream, text))
+
+    def wrap(self, on_output: Optional[Callable[[str, str], None]]) -> Callable[[str, str], None]:
+        def write_output(text: str, stream: str):
+            self.write(text, stream)
+            if on_output:
+                on_output(text, stream)
+        return write_output
+
+
+class ResultCache:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS results (
+            key TEXT PRIMARY KEY,
+            script_hash TEXT NOT NULL,
+            exit_code INTEGER NOT NULL,
+            output BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            used_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS results_by_use ON results(used_at);
+        CREATE INDEX IF NOT EXISTS results_by_script ON results(script_hash);
+    """
+
+    # Total compressed size kept, least recently used results go first, and the largest single output cached
+    MAX_BYTES = 256 * 1024 * 1024
+    MAX_ENTRY_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.path = path if path is not None else self.default_path()
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(self.SCHEMA)
+        self.evict()
+
+    @staticmethod
+    def default_path() -> str:
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(cache_home, "bellos_application_manager", "results.sqlite3")
+
+    def make_key(self, script_content: str, shell: str, cwd: str, inputs: List[str], env: List[str],
+                 hash_inputs: bool = False) -> str:
+        digest = hashlib.sha256()
+
+        def add(*parts):
+            for part in parts:
+                digest.update(str(part).encode(errors="surrogateescape") + b"\0")
+
+        add("v1", len(script_content))
+        digest.update(script_content.encode(errors="surrogateescape"))
+
+        # The interpreter is identified by the file it resolves to, so an upgrade invalidates its results
+        executable = shutil.which(shell) or shell
+        try:
+            stat = os.stat(executable)
+            add(shell, os.path.realpath(executable), stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            add(shell)
+
+        cwd = os.path.abspath(cwd)
+        add(cwd)
+        for name in sorted(set(inputs)):
+            path = os.path.join(cwd, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                add(name, "missing")
+                continue
+            if hash_inputs and os.path.isfile(path):
+                add(name, self.file_digest(path))
+            else:
+                add(name, stat.st_size, stat.st_mtime_ns)
+        for name in sorted(set(env)):
+            value = os.environ.get(name)
+            add(name, "unset" if value is None else "=" + value)
+        return digest.hexdigest()
+
+    @staticmethod
+    def file_digest(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        with self._lock:
+            row = self._connection.execute("SELECT exit_code, output, created_at FROM results WHERE key = ?",
+                                           (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._connection.execute("UPDATE results SET used_at = ? WHERE key = ?", (time.time(), key))
+        exit_code, output, created_at = row
+        return CachedResult(exit_code, [tuple(chunk) for chunk in json.loads(zlib.decompress(output))], created_at)
+
+    def put(self, recorder: ResultRecorder, exit_code: int) -> bool:
+        if recorder.overflow:
+            return False
+        data = zlib.compress(json.dumps(recorder.output).encode())
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, script_hash, exit_code, output, size, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (recorder.key, recorder.script_hash, exit_code, data, len(data), now, now))
+        self.evict()
+        return True
+
+    def evict(self):
+        # Keep the most recently used results that fit in max_bytes
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM (SELECT key, SUM(size) OVER "
+                "(ORDER BY used_at DESC, key ROWS UNBOUNDED PRECEDING) AS total FROM results) WHERE total > ?)",
+                (self.max_bytes,))
+
+    def invalidate(self, script_hash: Optional[str] = None) -> int:
+        # Every result, or every result of one script whatever its inputs
+        with self._lock:
+            if script_hash is None:
+                cursor = self._connection.execute("DELETE FROM results")
+            else:
+                cursor = self._connection.execute("DELETE FROM results WHERE script_hash = ?", (script_hash,))
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, size = self._connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "size_bytes": size,
+                "max_bytes": self.max_bytes}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,187 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, time
+from typing import Dict
+from PyQt6.QtWidgets import (QFileDialog, QHBoxLayout, QLabel, QMessageBox, QPushButton, QTreeWidget,
+                             QTreeWidgetItem, QVBoxLayout, QWidget)
+from PyQt6.QtCore import Qt, pyqtSignal
+
+class RunItem(QTreeWidgetItem):
+    def __lt__(self, other):
+        # Numeric columns sort by value rather than by their formatted text
+        column = self.treeWidget().sortColumn()
+        mine, theirs = self.data(column, Qt.ItemDataRole.UserRole), other.data(column, Qt.ItemDataRole.UserRole)
+        if mine is not None and theirs is not None:
+            return mine < theirs
+        return super().__lt__(other)
+
+
+class RunHistoryPanel(QWidget):
+    log_requested = pyqtSignal(str)
+
+    COLUMNS = ["Run", "Script", "Started", "Status", "Exit Code", "Wall Time", "User CPU", "Sys CPU",
+               "Peak RSS", "Stdout", "Stderr"]
+
+    # Rows kept in the panel, the export covers whatever the manager still holds
+    MAX_ROWS = 1000
+
+    def __init__(self, script_runner):
+        super().__init__()
+        self.script_runner = script_runner
+        self.run_items: Dict[int, QTreeWidgetItem] = {}
+        self.setup_ui()
+        self.script_runner.run_recorded.connect(self.add_run)
+        self.script_runner.result_reused.connect(lambda _: self.refresh_cache_stats())
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        self.run_tree = QTreeWidget()
+        self.run_tree.setHeaderLabels(self.COLUMNS)
+        self.run_tree.setRootIsDecorated(False)
+        self.run_tree.setSortingEnabled(True)
+        self.run_tree.sortByColumn(0, Qt.SortOrder.DescendingOrder)
+        self.run_tree.itemDoubleClicked.connect(lambda item, _: self.open_log(item))
+        layout.addWidget(self.run_tree)
+
+        button_layout = QHBoxLayout()
+        self.load_older_button = QPushButton("Load Older")
+        self.load_older_button.clicked.connect(self.load_older)
+        button_layout.addWidget(self.load_older_button)
+        open_log_button = QPushButton("Open Log")
+        open_log_button.clicked.connect(lambda: self.open_log(self.run_tree.currentItem()))
+        button_layout.addWidget(open_log_button)
+        export_csv_button = QPushButton("Export CSV...")
+        export_csv_button.clicked.connect(lambda: self.export("csv"))
+        export_json_button = QPushButton("Export JSON...")
+        export_json_button.clicked.connect(lambda: self.export("json"))
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(self.clear)
+        button_layout.addWidget(export_csv_button)
+        button_layout.addWidget(export_json_button)
+        button_layout.addWidget(clear_button)
+        button_layout.addStretch()
+        layout.addLayout(button_layout)
+
+        # Result cache hit rate and size, with a way to drop every cached result
+        cache_layout = QHBoxLayout()
+        self.cache_label = QLabel()
+        cache_layout.addWidget(self.cache_label)
+        cache_layout.addStretch()
+        self.invalidate_cache_button = QPushButton("Invalidate Result Cache")
+        self.invalidate_cache_button.clicked.connect(self.invalidate_cache)
+        cache_layout.addWidget(self.invalidate_cache_button)
+        layout.addLayout(cache_layout)
+
+        self.setLayout(layout)
+
+    def load_history(self):
+        # Past sessions come from the history store a page at a time, newest first
+        self.load_older()
+        self.refresh_cache_stats()
+
+    def load_older(self):
+        before_id = min(self.run_items) if self.run_items else None
+        records = self.script_runner.script_manager.get_run_history(before_id=before_id)
+        for record in records:
+            record["run_id"] = record.pop("id")
+            self.add_record(record)
+        self.load_older_button.setEnabled(bool(records))
+
+    def add_run(self, metrics):
+        self.add_record(metrics.to_dict())
+
+        # Drop the oldest runs, which are the smallest run ids
+        while len(self.run_items) > self.MAX_ROWS:
+            item = self.run_items.pop(min(self.run_items))
+            self.run_tree.takeTopLevelItem(self.run_tree.indexOfTopLevelItem(item))
+        self.load_older_button.setEnabled(True)
+        self.refresh_cache_stats()
+
+    def add_record(self, record: dict):
+        # A run loaded from the store while still in progress is replaced once it finishes
+        run_id = record["run_id"]
+        if run_id in self.run_items:
+            previous = self.run_items.pop(run_id)
+            self.run_tree.takeTopLevelItem(self.run_tree.indexOfTopLevelItem(previous))
+        peak_rss_kb = record["peak_rss_kb"]
+        values = [
+            (str(run_id), run_id),
+            (record["name"] or f"run {run_id}", None),
+            (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record["started_at"])), record["started_at"]),
+            (record["status"], None),
+            self.format_value(record["exit_code"], "{}"),
+            self.format_value(record["wall_time"], "{:.2f}s"),
+            self.format_value(record["user_time"], "{:.2f}s"),
+            self.format_value(record["system_time"], "{:.2f}s"),
+            self.format_value(peak_rss_kb and peak_rss_kb / 1024, "{:.1f} MB"),
+            self.format_value(record["stdout_bytes"], "{} B"),
+            self.format_value(record["stderr_bytes"], "{} B"),
+        ]
+        item = RunItem([text for text, _ in values])
+        for column, (_, value) in enumerate(values):
+            if value is not None:
+                item.setData(column, Qt.ItemDataRole.UserRole, value)
+        item.setToolTip(1, record["cwd"] or "")
+        self.run_tree.addTopLevelItem(item)
+        self.run_items[run_id] = item
+
+    def open_log(self, item):
+        if item is None:
+            return
+        run_id = item.data(0, Qt.ItemDataRole.UserRole)
+        log_file = self.script_runner.script_manager.run_log_path(run_id)
+        if os.path.exists(log_file):
+            self.log_requested.emit(log_file)
+        else:
+            QMessageBox.information(self, "Run Log", f"Run {run_id} has no output log.")
+
+    def refresh_cache_stats(self):
+        script_manager = self.script_runner.script_manager
+        # The cache file is not opened while caching is off
+        enabled = bool(script_manager.settings.get("result_cache"))
+        self.invalidate_cache_button.setEnabled(enabled)
+        if not enabled:
+            self.cache_label.setText("Result cache: off")
+            return
+        stats = script_manager.get_result_cache_stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "n/a"
+        self.cache_label.setText(
+            f"Result cache: {stats['hits']} hits, {stats['misses']} misses ({hit_rate} hit rate), "
+            f"{stats['entries']} results, {stats['size_bytes'] / 1048576:.1f} of {stats['max_bytes'] / 1048576:.0f} MB")
+
+    def invalidate_cache(self):
+        self.script_runner.script_manager.invalidate_results()
+        self.refresh_cache_stats()
+
+    def format_value(self, value, pattern: str) -> tuple:
+        return ("", None) if value is None else (pattern.format(value), value)
+
+    def export(self, format: str):
+        file_name, _ = QFileDialog.getSaveFileName(self, "Export Run History", f"bellos_runs.{format}",
+                                                   f"{format.upper()} Files (*.{format});;All Files (*)")
+        if not file_name:
+            return
+        try:
+            self.script_runner.script_manager.export_metrics(file_name, format)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not export run history: {str(e)}")
+
+    def clear(self):
+        self.script_runner.script_manager.clear_run_metrics()
+        self.run_tree.clear()
+        self.run_items.clear()
@@ -0,0 +1,95 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, threading
+from datetime import datetime
+from typing import Optional, Callable, Iterable
+
+class RunLog:
+    # Newest logs kept when the log directory is first used
+    MAX_LOGS = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def default_dir() -> str:
+        data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+        return os.path.join(data_home, "bellos_application_manager", "logs")
+
+    @staticmethod
+    def file_name(run_id: int) -> str:
+        return f"run-{run_id}.log"
+
+    @classmethod
+    def prune(cls, log_dir: str, max_logs: Optional[int] = None, keep: Iterable[str] = ()):
+        # Oldest first by modification time, run ids restart when the history falls back to memory.
+        # Logs in keep belong to runs still going and are never removed
+        if max_logs is None:
+            max_logs = cls.MAX_LOGS
+        keep = {os.path.abspath(path) for path in keep}
+        logs = []
+        for entry in os.scandir(log_dir):
+            if os.path.abspath(entry.path) in keep:
+                continue
+            if entry.name.startswith("run-") and entry.name.endswith(".log") and entry.name[4:-4].replace("-", "").isdigit():
+                try:
+                    logs.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        logs.sort()
+        for _, path in logs[:max(0, len(logs) - max_logs)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def write(self, text: str, stream: str):
+        # Every line of a chunk carries the time it was read and its stream, so both streams interleave in one file
+        prefix = f"{datetime.now().isoformat(sep=' ', timespec='milliseconds')} {stream} ".encode()
+        data = prefix + text.encode(errors="replace").replace(b"\n", b"\n" + prefix) + b"\n"
+        with self._lock:
+            if self.fd is None:
+                # Created on the first output, a run that prints nothing leaves no file
+                self.fd = self.create()
+            # Unbuffered, each batch is in the file as soon as it is written and a crash loses nothing
+            while data:
+                data = data[os.write(self.fd, data):]
+
+    def create(self):
+        # An older run's log under the same name is kept, this run's log takes the next free suffix
+        base, extension = os.path.splitext(self.path)
+        suffix = 0
+        while True:
+            try:
+                return os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_CLOEXEC, 0o666)
+            except FileExistsError:
+                suffix += 1
+                self.path = f"{base}-{suffix}{extension}"
+
+    def wrap(self, on_output: Optional[Callable[[str, str], None]]) -> Callable[[str, str], None]:
+        def write_output(text: str, stream: str):
+            self.write(text, stream)
+            if on_output:
+                on_output(text, stream)
+        return write_output
+
+    def close(self):
+        with self._lock:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
@@ -0,0 +1,68 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, threading
+from typing import Optional, Dict
+from PyQt6.QtCore import pyqtSignal, QObject
+
+from .file_io import atomic_write
+
+class SavePipeline(QObject):
+    saved = pyqtSignal(str, int)
+    save_failed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Latest snapshot and its document revision per path, a newer save replaces one that has not been written yet
+        self.pending: Dict[str, tuple] = {}
+        self.saved_hashes: Dict[str, str] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def save(self, path: str, text: str, revision: int):
+        with self._condition:
+            self.pending[path] = (text, revision)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="bellos-save", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def mark_saved(self, path: str, text: str):
+        self.saved_hashes[path] = self.content_hash(text.encode())
+
+    def content_hash(self, data: bytes) -> str:
+        import hashlib
+        return hashlib.sha256(data).hexdigest()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self.pending:
+                    self._condition.wait()
+                path, (text, revision) = self.pending.popitem()
+
+            data = text.encode()
+            digest = self.content_hash(data)
+            if self.saved_hashes.get(path) == digest and os.path.exists(path):
+                self.saved.emit(path, revision)
+                continue
+
+            try:
+                atomic_write(path, data)
+            except Exception as e:
+                self.save_failed.emit(path, str(e))
+                continue
+            self.saved_hashes[path] = digest
+            self.saved.emit(path, revision)
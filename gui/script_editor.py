@@ -13,54 +13,202 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from header_imports import *
+from typing import Optional, Dict, List
+from PyQt6.QtWidgets import QPlainTextEdit, QTextEdit, QWidget
+from PyQt6.QtCore import QRect, QRegularExpression, QSize, Qt
+from PyQt6.QtGui import QColor, QFont, QPainter, QSyntaxHighlighter, QTextCharFormat, QTextCursor, QTextFormat
 
 class BellosSyntaxHighlighter(QSyntaxHighlighter):
+    KEYWORDS = ["if", "else", "while", "for", "in", "do", "done", "echo", "export"]
+
+    # Lexer states carried between blocks, heredocs are HEREDOC_BASE + delimiter index
+    NORMAL = 0
+    IN_DOUBLE_STRING = 1
+    IN_SINGLE_STRING = 2
+    HEREDOC_BASE = 16
+
+    # Single pass over each block: comments and strings are tried first at every position,
+    # so keywords inside them are consumed by the earlier alternative and never re-coloured.
+    # Arithmetic comes before heredocs so a shift such as $((1 << 2)) does not open one
+    TOKEN_PATTERN = QRegularExpression(
+        r'(?<comment>#[^\n]*)'
+        r'|(?<string>"[^"\\]*(?:\\.[^"\\]*)*")'
+        r'|(?<open_string>"[^"\\]*(?:\\.[^"\\]*)*\\?$)'
+        r"|(?<quoted>'[^']*')"
+        r"|(?<open_quoted>'[^']*$)"
+        r'|(?<arithmetic>\$?\(\([^()]*(?:\([^()]*\)[^()]*)*\)\))'
+        r'|(?<heredoc>(?<!<)<<(?!<)(?<strip_tabs>-?)\s*[\'"]?(?<delimiter>[A-Za-z_]\w*)[\'"]?)'
+        r'|(?<keyword>\b(?:' + "|".join(KEYWORDS) + r')\b)'
+    )
+    TOKEN_PATTERN.optimize()
+    TOKEN_KINDS = TOKEN_PATTERN.namedCaptureGroups()
+
+    # Where a string left open on a previous line ends
+    STRING_END_PATTERNS = {
+        IN_DOUBLE_STRING: QRegularExpression(r'^[^"\\]*(?:\\.[^"\\]*)*"'),
+        IN_SINGLE_STRING: QRegularExpression(r"^[^']*'"),
+    }
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.highlighting_rules = []
 
         # Define formats for different syntax elements
         keyword_format = QTextCharFormat()
         keyword_format.setForeground(QColor("#569CD6"))
         keyword_format.setFontWeight(QFont.Weight.Bold)
-        keywords = ["if", "else", "while", "for", "in", "do", "done", "echo", "export"]
-        
-        for word in keywords:
-            self.highlighting_rules.append((
-                f"\\b{word}\\b",
-                keyword_format
-            ))
 
         # String format
         string_format = QTextCharFormat()
         string_format.setForeground(QColor("#CE9178"))
-        self.highlighting_rules.append((
-            r'"[^"\\]*(\\.[^"\\]*)*"',
-            string_format
-        ))
 
         # Comment format
         comment_format = QTextCharFormat()
         comment_format.setForeground(QColor("#608B4E"))
-        self.highlighting_rules.append((
-            r"#[^\n]*",
-            comment_format
-        ))
+
+        self.string_format = string_format
+        self.token_formats = {
+            "comment": comment_format,
+            "string": string_format,
+            "open_string": string_format,
+            "quoted": string_format,
+            "open_quoted": string_format,
+            "arithmetic": QTextCharFormat(),
+            "delimiter": keyword_format,
+            "keyword": keyword_format,
+        }
+        self.heredoc_delimiters: List[tuple] = []
+        self.heredoc_states: Dict[tuple, int] = {}
+
+        # Lazy mode: blocks past visible_limit are left for later, highlighted_until is the
+        # number of leading blocks whose formats and end states are up to date
+        self.visible_limit: Optional[int] = None
+        self.highlighted_until = 0
+        self._catching_up = False
+
+        # Our bookkeeping has to see edits before Qt reformats the changed blocks
+        document = self.document()
+        if document is not None:
+            self.setDocument(None)
+            document.contentsChange.connect(self._on_contents_change)
+            self.attach(document)
+
+    def attach(self, document):
+        # Formats and lexer states are rebuilt from scratch on a fresh attach
+        self.highlighted_until = 0
+        self._block_count = document.blockCount()
+        self.setDocument(document)
+
+    def detach(self):
+        # Qt clears the formats it applied, which releases their memory
+        self.setDocument(None)
+
+    def set_visible_limit(self, last_block: int):
+        self.visible_limit = last_block
+        document = self.document()
+        if document is None or self._catching_up:
+            return
+
+        # Highlight in order so each block sees the final state of the one before it
+        self._catching_up = True
+        try:
+            while self.highlighted_until <= last_block and self.highlighted_until < document.blockCount():
+                self.rehighlightBlock(document.findBlockByNumber(self.highlighted_until))
+        finally:
+            self._catching_up = False
+
+    def _on_contents_change(self, position: int, chars_removed: int, chars_added: int):
+        document = self.document()
+        if document is None:
+            return
+        block_count = document.blockCount()
+        delta = block_count - self._block_count
+        self._block_count = block_count
+
+        # Keep the highlighted prefix pointing at the same blocks after lines are inserted or removed
+        changed_block = document.findBlock(position).blockNumber()
+        if delta and changed_block < self.highlighted_until:
+            self.highlighted_until = max(changed_block, self.highlighted_until + delta)
+
+    def _heredoc_state(self, delimiter: str, strip_tabs: bool) -> int:
+        key = (delimiter, strip_tabs)
+        if key not in self.heredoc_states:
+            self.heredoc_states[key] = self.HEREDOC_BASE + len(self.heredoc_delimiters)
+            self.heredoc_delimiters.append(key)
+        return self.heredoc_states[key]
 
     def highlightBlock(self, text):
-        from PyQt6.QtCore import QRegularExpression
-        
-        for pattern, format in self.highlighting_rules:
-            expression = QRegularExpression(pattern)
-            match_iterator = expression.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), format)
+        block_number = self.currentBlock().blockNumber()
+        if self.visible_limit is not None:
+            if block_number > min(self.visible_limit, self.highlighted_until):
+                # Leaving the stored state untouched stops Qt from propagating further
+                self.highlighted_until = min(self.highlighted_until, block_number)
+                return
+            if block_number == self.highlighted_until:
+                self.highlighted_until += 1
+
+        state = max(self.previousBlockState(), self.NORMAL)
+        position = 0
+
+        # Heredoc bodies run until a line holding only the delimiter
+        if state >= self.HEREDOC_BASE:
+            delimiter, strip_tabs = self.heredoc_delimiters[state - self.HEREDOC_BASE]
+            self.setFormat(0, self.currentBlock().length(), self.string_format)
+            if (text.lstrip("\t") if strip_tabs else text) == delimiter:
+                state = self.NORMAL
+            self.setCurrentBlockState(state)
+            return
+
+        # Finish a string carried over from the previous line
+        if state in self.STRING_END_PATTERNS:
+            match = self.STRING_END_PATTERNS[state].match(text)
+            if not match.hasMatch():
+                self.setFormat(0, self.currentBlock().length(), self.string_format)
+                self.setCurrentBlockState(state)
+                return
+            position = match.capturedEnd()
+            self.setFormat(0, position, self.string_format)
+            state = self.NORMAL
+
+        heredoc_state = None
+        match_iterator = self.TOKEN_PATTERN.globalMatch(text, position)
+        while match_iterator.hasNext():
+            match = match_iterator.next()
+            kind = self.TOKEN_KINDS[match.lastCapturedIndex()]
+            if kind == "open_string":
+                state = self.IN_DOUBLE_STRING
+            elif kind == "open_quoted":
+                state = self.IN_SINGLE_STRING
+            elif kind == "delimiter" and heredoc_state is None:
+                heredoc_state = self._heredoc_state(match.captured("delimiter"), bool(match.captured("strip_tabs")))
+            self.setFormat(match.capturedStart(), match.capturedLength(), self.token_formats[kind])
+
+        if heredoc_state is not None and state == self.NORMAL:
+            state = heredoc_state
+        self.setCurrentBlockState(state)
+
+class LineNumberArea(QWidget):
+    def __init__(self, editor: "ScriptEditor"):
+        super().__init__(editor)
+        self.editor = editor
+
+    def sizeHint(self) -> QSize:
+        return QSize(self.editor.line_number_area_width(), 0)
+
+    def paintEvent(self, event):
+        self.editor.line_number_area_paint_event(event)
+
 
 class ScriptEditor(QPlainTextEdit):
-    def __init__(self):
+    # Lines past the bottom of the viewport that are highlighted ahead of scrolling
+    HIGHLIGHT_MARGIN = 100
+
+    def __init__(self, file_path: Optional[str] = None):
         super().__init__()
+        # Per-document state, the text itself may be loaded later on first show
+        self.file_path = file_path
+        self.loaded = file_path is None
+        self.file_loader = None
+        self.validation_errors: List[tuple] = []
         self.setup_editor()
 
     def setup_editor(self):
@@ -73,30 +221,120 @@ class ScriptEditor(QPlainTextEdit):
 
         # Enable line numbers
         self.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.line_number_area = LineNumberArea(self)
+        self.line_number_digits = 0
+        self.blockCountChanged.connect(self.update_line_number_area_width)
+        self.updateRequest.connect(self.update_line_number_area)
+        self.update_line_number_area_width(0)
 
-        # Set syntax highlighter
+        # Set syntax highlighter, only blocks near the viewport are highlighted eagerly
         self.highlighter = BellosSyntaxHighlighter(self.document())
+        self.highlighter.set_visible_limit(self.last_visible_block_number() + self.HIGHLIGHT_MARGIN)
+        self.updateRequest.connect(self.highlight_visible_blocks)
 
         # Set placeholder text
         self.setPlaceholderText("Enter your Bellos script here...")
 
+    def set_tab_width(self, tab_width: int):
+        self.setTabStopDistance(self.fontMetrics().horizontalAdvance(' ') * tab_width)
+
+    def last_visible_block_number(self) -> int:
+        # Lines never wrap, so every block is exactly one line high
+        line_height = max(1, self.fontMetrics().lineSpacing())
+        return self.firstVisibleBlock().blockNumber() + self.viewport().height() // line_height + 1
+
+    def highlight_visible_blocks(self, *args):
+        if self.highlighter.document() is not None:
+            self.highlighter.set_visible_limit(self.last_visible_block_number() + self.HIGHLIGHT_MARGIN)
+
+    def set_validation_errors(self, errors: List[tuple]):
+        # Lines the shell rejected get a full-width marker, errors without a line only reach the status bar
+        self.validation_errors = errors
+        selections = []
+        last_block = self.document().blockCount()
+        for line, message in errors:
+            if line is None:
+                continue
+            selection = QTextEdit.ExtraSelection()
+            selection.format.setBackground(QColor(255, 0, 0, 60))
+            selection.format.setProperty(QTextFormat.Property.FullWidthSelection, True)
+            selection.format.setToolTip(message)
+            selection.cursor = QTextCursor(self.document().findBlockByNumber(max(1, min(line, last_block)) - 1))
+            selections.append(selection)
+        self.setExtraSelections(selections)
+
+    def is_dirty(self) -> bool:
+        return self.document().isModified()
+
+    def is_untouched(self) -> bool:
+        return self.file_path is None and not self.is_dirty() and self.document().isEmpty()
+
+    def memory_estimate(self) -> int:
+        # Undo history and highlight formats both grow roughly with the text size
+        if self.highlighter.document() is None and not self.document().isUndoAvailable():
+            return 0
+        return self.document().characterCount() * 4
+
+    def release_memory(self):
+        self.document().clearUndoRedoStacks()
+        if self.highlighter.document() is not None:
+            self.highlighter.detach()
+
+    def restore_memory(self):
+        if self.highlighter.document() is None:
+            self.highlighter.attach(self.document())
+            self.highlight_visible_blocks()
+
+    def set_line_numbers_visible(self, visible: bool):
+        self.line_number_area.setVisible(visible)
+        self.line_number_digits = 0
+        self.update_line_number_area_width(0)
+
     def line_number_area_width(self):
-        digits = 1
-        max_num = max(1, self.blockCount())
-        while max_num >= 10:
-            max_num //= 10
-            digits += 1
-        space = 3 + self.fontMetrics().horizontalAdvance('9') * digits
-        return space
+        digits = len(str(max(1, self.blockCount())))
+        return 3 + self.fontMetrics().horizontalAdvance('9') * digits
 
     def update_line_number_area_width(self, new_block_count):
-        self.setViewportMargins(self.line_number_area_width(), 0, 0, 0)
+        # Only a change in the number of digits moves the text, other block count changes cost nothing
+        digits = len(str(max(1, self.blockCount())))
+        if digits == self.line_number_digits:
+            return
+        self.line_number_digits = digits
+        width = 0 if self.line_number_area.isHidden() else self.line_number_area_width()
+        self.setViewportMargins(width, 0, 0, 0)
+        self.update_line_number_area_geometry()
 
     def update_line_number_area(self, rect, dy):
+        # Scrolling shifts the painted numbers, only the newly exposed strip is painted
         if dy:
             self.line_number_area.scroll(0, dy)
         else:
             self.line_number_area.update(0, rect.y(), self.line_number_area.width(), rect.height())
 
-        if rect.contains(self.viewport().rect()):
-            self.update_line_number_area_width(0)
+    def update_line_number_area_geometry(self):
+        rect = self.contentsRect()
+        self.line_number_area.setGeometry(QRect(rect.left(), rect.top(), self.line_number_area_width(), rect.height()))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_line_number_area_geometry()
+
+    def line_number_area_paint_event(self, event):
+        painter = QPainter(self.line_number_area)
+        painter.fillRect(event.rect(), QColor("#F0F0F0"))
+        painter.setPen(QColor("#858585"))
+
+        # Walk from the first visible block and stop below the damaged area, the rest of the document is never touched
+        block = self.firstVisibleBlock()
+        number = block.blockNumber()
+        top = round(self.blockBoundingGeometry(block).translated(self.contentOffset()).top())
+        bottom = top + round(self.blockBoundingRect(block).height())
+        width = self.line_number_area.width() - 3
+        height = self.fontMetrics().height()
+        while block.isValid() and top <= event.rect().bottom():
+            if block.isVisible() and bottom >= event.rect().top():
+                painter.drawText(0, top, width, height, Qt.AlignmentFlag.AlignRight, str(number + 1))
+            block = block.next()
+            top = bottom
+            bottom = top + round(self.blockBoundingRect(block).height())
+            number += 1
@@ -13,122 +13,1040 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from header_imports import *
+import os, io, json, resource, threading, signal, subprocess, selectors, time, itertools, heapq
+from collections import deque
+from typing import TYPE_CHECKING, Optional, Dict, List, Callable, Iterator
+
+from .file_io import atomic_write
+from .settings_service import SettingsService
+
+# These pull in sqlite3, hashlib, uuid and datetime, they are imported on first use so startup does not wait for them
+if TYPE_CHECKING:
+    from .history_store import HistoryStore
+    from .result_cache import ResultCache, ResultRecorder
+    from .run_log import RunLog
+    from .script_validator import ScriptValidator
+    from .warm_pool import WarmPool, WarmWorker
+
+class RunMetrics:
+    FIELDS = ["run_id", "name", "script_hash", "cwd", "pid", "status", "exit_code", "started_at", "ended_at", "wall_time",
+              "user_time", "system_time", "peak_rss_kb", "stdout_bytes", "stderr_bytes"]
+
+    def __init__(self, pid: int, script_hash: str, name: Optional[str] = None, cwd: Optional[str] = None):
+        self.run_id: Optional[int] = None
+        self.name = name
+        self.script_hash = script_hash
+        self.cwd = cwd or os.getcwd()
+        self.pid = pid
+        self.status = "running"
+        self.exit_code: Optional[int] = None
+        self.started_at = time.time()
+        self.ended_at: Optional[float] = None
+        self.start_time = time.monotonic()
+        self.wall_time: Optional[float] = None
+
+        # CPU time of the script and the descendants it waited for, from wait4, and the
+        # peak memory of its process group, sampled while it runs and never below what wait4 reports
+        self.user_time: Optional[float] = None
+        self.system_time: Optional[float] = None
+        self.peak_rss_kb: Optional[int] = None
+        self.stdout_bytes = 0
+        self.stderr_bytes = 0
+        self.log_file: Optional[str] = None
+
+    def finish(self, exit_code: int, rusage, status: str, peak_rss_kb: Optional[int] = None):
+        self.exit_code = exit_code
+        self.ended_at = time.time()
+        self.wall_time = time.monotonic() - self.start_time
+        self.status = status
+        self.peak_rss_kb = peak_rss_kb
+        if rusage is not None:
+            self.user_time = rusage.ru_utime
+            self.system_time = rusage.ru_stime
+            self.peak_rss_kb = max(peak_rss_kb or 0, rusage.ru_maxrss) or None
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+class ScriptJob:
+    def __init__(self, job_id: int, script_content: str, cwd: Optional[str] = None, timeout: Optional[int] = None,
+                 on_output: Optional[Callable[["ScriptJob", str, str], None]] = None, name: Optional[str] = None,
+                 limits: Optional[dict] = None):
+        self.job_id = job_id
+        self.name = name or f"job {job_id}"
+        self.limits = limits
+        self.script_content = script_content
+        self.cwd = cwd
+        self.timeout = timeout
+        self.on_output = on_output
+        self.status = "queued"
+        self.pid: Optional[int] = None
+        self.exit_code: Optional[int] = None
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+        self.metrics: Optional[RunMetrics] = None
+
+    @property
+    def wall_time(self) -> Optional[float]:
+        if self.start_time is None:
+            return None
+        end_time = self.end_time if self.end_time is not None else time.monotonic()
+        return end_time - self.start_time
+
+
+class ProcessWatchdog:
+    def __init__(self):
+        self._deadlines: List[tuple] = []
+        # Watches still due, a cancelled or fired watch is dropped here and its deadline skipped
+        self._callbacks: Dict[int, tuple] = {}
+        self._watch_ids = itertools.count(1)
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, timeout: float, callback: Callable, *args) -> int:
+        with self._condition:
+            watch_id = next(self._watch_ids)
+            self._callbacks[watch_id] = (callback, args)
+            heapq.heappush(self._deadlines, (time.monotonic() + timeout, watch_id))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="bellos-watchdog", daemon=True)
+                self._thread.start()
+            elif self._deadlines[0][1] == watch_id:
+                # Only a new earliest deadline needs the thread awake, waking it per run costs the launch a thread switch
+                self._condition.notify()
+            return watch_id
+
+    def cancel(self, watch_id: int):
+        with self._condition:
+            self._callbacks.pop(watch_id, None)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._deadlines:
+                    self._condition.wait()
+                deadline, watch_id = self._deadlines[0]
+                if watch_id not in self._callbacks:
+                    heapq.heappop(self._deadlines)
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                heapq.heappop(self._deadlines)
+                callback, args = self._callbacks.pop(watch_id)
+
+            try:
+                callback(*args)
+            except Exception:
+                pass
+
+
+class MemorySampler:
+    # Seconds between samples of the running scripts' process groups, starting short after a launch
+    # and doubling up to the longest. A script done before its first sample still has the high-water
+    # mark wait4 reports for it and the children it waited for
+    MIN_INTERVAL = 0.02
+    MAX_INTERVAL = 0.2
+
+    # Samples taken with nothing to sample before the thread sleeps until the next launch, so runs
+    # started back to back find it awake
+    IDLE_ROUNDS = 5
 
-class ScriptManager:
     def __init__(self):
+        # Samples are read from /proc, without it runs record no peak memory
+        self.enabled = os.path.isdir("/proc")
+        # Process group -> [pid left out of the group's usage, peak RSS in KiB so far, pids seen in the group]
+        self._groups: Dict[int, list] = {}
+        self._interval = self.MIN_INTERVAL
+        # Set while the thread sleeps until a group is tracked, the only time a launch wakes it
+        self._idle = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def track(self, pgid: int, exclude_pid: Optional[int] = None):
+        if not self.enabled:
+            return
+        with self._condition:
+            self._groups[pgid] = [exclude_pid, None, {pgid}]
+            # A thread between samples picks the group up at its next one without being woken, waking it
+            # per run costs the launch a thread switch and wait4 covers a run over before that sample
+            self._interval = self.MIN_INTERVAL
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="bellos-memory", daemon=True)
+                self._thread.start()
+            elif self._idle:
+                self._condition.notify()
+
+    def untrack(self, pgid: int) -> Optional[int]:
+        # The peak seen so far, the end of a run never waits for another sample
+        with self._condition:
+            group = self._groups.pop(pgid, None)
+        return group[1] if group is not None else None
+
+    def sample(self):
+        with self._condition:
+            groups = [(pgid, group[0], list(group[2])) for pgid, group in self._groups.items()]
+
+        for pgid, exclude_pid, pids in groups:
+            # The group is followed from its leader down through each member's children, so only its
+            # own processes are read. The peak is the summed RSS at a sample, or a single member's
+            # high-water mark if that is larger, which keeps spikes between samples
+            rss_kb = hwm_kb = 0
+            members = set()
+            measured = False
+            while pids:
+                pid = pids.pop()
+                if pid in members:
+                    continue
+                try:
+                    with open(f"/proc/{pid}/status", 'rb') as f:
+                        fields = dict(line.split(b":", 1) for line in f
+                                      if line.startswith((b"NSpgid", b"VmRSS", b"VmHWM")))
+                    if b"NSpgid" in fields and int(fields[b"NSpgid"].split()[0]) != pgid:
+                        continue
+                    with open(f"/proc/{pid}/task/{pid}/children", 'rb') as f:
+                        pids.extend(int(child) for child in f.read().split())
+                except (OSError, ValueError, IndexError):
+                    continue
+                members.add(pid)
+                # Exited members that are not reaped yet have no memory left to count
+                if pid != exclude_pid and b"VmRSS" in fields:
+                    measured = True
+                    rss_kb += int(fields[b"VmRSS"].split()[0])
+                    hwm_kb = max(hwm_kb, int(fields.get(b"VmHWM", b"0 kB").split()[0]))
+
+            with self._condition:
+                group = self._groups.get(pgid)
+                if group is not None:
+                    group[2] = members or group[2]
+                    if measured:
+                        group[1] = max(group[1] or 0, rss_kb, hwm_kb)
+
+    def _run(self):
+        idle_rounds = 0
+        while True:
+            with self._condition:
+                if self._groups:
+                    idle_rounds = 0
+                elif idle_rounds < self.IDLE_ROUNDS:
+                    idle_rounds += 1
+                else:
+                    self._idle = True
+                    while not self._groups:
+                        self._condition.wait()
+                    self._idle = False
+                    idle_rounds = 0
+            self.sample()
+            with self._condition:
+                interval = self._interval
+                self._interval = min(interval * 2, self.MAX_INTERVAL)
+                self._condition.wait(interval)
+
+
+class ScriptManager:
+    # Finished runs kept for the metrics API
+    METRICS_HISTORY = 1000
+
+    # Seconds between SIGTERM and SIGKILL for a script's process group
+    KILL_GRACE_PERIOD = 1
+
+    # Runs a warm worker serves before it is replaced
+    WARM_POOL_MAX_JOBS = 100
+
+    # Lines per stream run_script returns, the rest is only in the run's log file
+    OUTPUT_TAIL_LINES = 1000
+
+    # Per-run limits and the settings that provide their defaults, None means unlimited
+    LIMIT_SETTINGS = {
+        "cpu_seconds": "limit_cpu_seconds",
+        "address_space_mb": "limit_address_space_mb",
+        "open_files": "limit_open_files",
+        "max_output_bytes": "max_output_bytes"
+    }
+
+    def __init__(self, settings: Optional[SettingsService] = None):
         self.active_processes: Dict[int, subprocess.Popen] = {}
-        self.script_history: List[str] = []
-        self.settings = self.load_settings()
-
-    def load_settings(self) -> dict:
-        settings_file = "bellos_settings.json"
-        default_settings = {
-            "default_shell": "bellos",
-            "default_timeout": 30,
-            "script_extension": ".bellos"
-        }
-        
-        if os.path.exists(settings_file):
+
+        # Shared with the window when given, otherwise read on first use and never written back
+        self._settings = settings
+        if settings is not None:
+            settings.add_listener(self._on_setting_changed)
+        self._validator: Optional["ScriptValidator"] = None
+        self._history: Optional["HistoryStore"] = None
+        self._warm_pool: Optional["WarmPool"] = None
+        self._warm_pool_lock = threading.Lock()
+        # Interpreter paths by (name, PATH), so a launch does not try every directory on PATH
+        self._shell_paths: Dict[tuple, Optional[str]] = {}
+        self._has_memfd = hasattr(os, "memfd_create") and os.path.isdir("/dev/fd")
+        # Every script's stdin, held open so a launch does not open /dev/null again
+        self._devnull = os.open(os.devnull, os.O_RDONLY | os.O_CLOEXEC)
+        self._run_log_dir: Optional[str] = None
+        self.run_logs: Dict[int, "RunLog"] = {}
+        # Logs of this session's runs that did not get their run's default name
+        self.run_log_paths: Dict[int, str] = {}
+        self._result_cache: Optional["ResultCache"] = None
+        self.result_recorders: Dict[int, "ResultRecorder"] = {}
+
+        # Job scheduler state
+        self._max_concurrency: Optional[int] = None
+        self.jobs: Dict[int, ScriptJob] = {}
+        self.job_queue: deque = deque()
+        self.running_jobs: Dict[int, ScriptJob] = {}
+        self.job_listeners: List[Callable[[ScriptJob], None]] = []
+        # Why a process was killed, and the pending SIGKILL escalation for each one being stopped
+        self.kill_reasons: Dict[int, str] = {}
+        self.kill_watches: Dict[int, int] = {}
+        self._job_ids = itertools.count(1)
+        self._job_lock = threading.RLock()
+
+        # One shared thread enforces every timeout instead of a Timer per process
+        self.watchdog = ProcessWatchdog()
+        self.memory_sampler = MemorySampler()
+
+        # Cost of every run, newest last
+        self.run_metrics: deque = deque(maxlen=self.METRICS_HISTORY)
+        self.metrics_listeners: List[Callable[[RunMetrics], None]] = []
+
+    @property
+    def settings(self) -> SettingsService:
+        if self._settings is None:
+            self._settings = SettingsService(autosave=False)
+            self._settings.add_listener(self._on_setting_changed)
+        return self._settings
+
+    def _on_setting_changed(self, key: str, value):
+        # Everything else is read at the start of each run
+        if key == "max_concurrency":
+            self.set_max_concurrency(value or os.cpu_count() or 1)
+
+    @property
+    def max_concurrency(self) -> int:
+        if self._max_concurrency is None:
+            self._max_concurrency = self.settings.get("max_concurrency") or os.cpu_count() or 1
+        return self._max_concurrency
+
+    @max_concurrency.setter
+    def max_concurrency(self, max_concurrency: int):
+        self._max_concurrency = max_concurrency
+
+    @property
+    def validator(self) -> "ScriptValidator":
+        if self._validator is None:
+            from .script_validator import ScriptValidator
+            self._validator = ScriptValidator(lambda: self.settings.get("default_shell", "bellos"))
+        return self._validator
+
+    @property
+    def history(self) -> "HistoryStore":
+        # Run history lives on disk, an unusable history file only costs persistence
+        if self._history is None:
+            from .history_store import HistoryStore
+            try:
+                self._history = HistoryStore(self.settings.get("history_file"))
+            except Exception:
+                self._history = HistoryStore(":memory:")
+        return self._history
+
+    @property
+    def warm_pool(self) -> "Optional[WarmPool]":
+        # Off unless warm_pool_size is set, rebuilt when the shell or the pool settings change
+        size = self.settings.get("warm_pool_size") or 0
+        if size <= 0 and self._warm_pool is None:
+            return None
+        shell = self.settings.get("default_shell", "bellos")
+        max_jobs = self.settings.get("warm_pool_max_jobs") or self.WARM_POOL_MAX_JOBS
+        with self._warm_pool_lock:
+            pool = self._warm_pool
+            if pool is not None and (pool.shell, pool.size, pool.max_jobs) != (shell, size, max_jobs):
+                pool.close()
+                self._warm_pool = None
+            if self._warm_pool is None and size > 0:
+                from .warm_pool import WarmPool
+                self._warm_pool = WarmPool(shell, size, max_jobs)
+            return self._warm_pool
+
+    @property
+    def run_log_dir(self) -> str:
+        # Created and trimmed the first time a run is logged
+        if self._run_log_dir is None:
+            from .run_log import RunLog
+            log_dir = self.settings.get("run_log_dir") or RunLog.default_dir()
+            os.makedirs(log_dir, exist_ok=True)
+            RunLog.prune(log_dir, self.settings.get("max_run_logs"))
+            self._run_log_dir = log_dir
+        return self._run_log_dir
+
+    def run_log_path(self, run_id: int) -> str:
+        from .run_log import RunLog
+        log = self.run_logs.get(run_id)
+        if log is not None:
+            return log.path
+        return self.run_log_paths.get(run_id) or os.path.join(self.run_log_dir, RunLog.file_name(run_id))
+
+    @property
+    def result_cache(self) -> "ResultCache":
+        # Opened on first use, like the history an unusable file only costs persistence
+        if self._result_cache is None:
+            from .result_cache import ResultCache
+            max_mb = self.settings.get("result_cache_max_mb")
+            max_bytes = max_mb * 1024 * 1024 if max_mb else None
             try:
-                with open(settings_file, 'r') as f:
-                    return json.load(f)
+                self._result_cache = ResultCache(self.settings.get("result_cache_file"), max_bytes)
             except Exception:
-                return default_settings
-        return default_settings
+                self._result_cache = ResultCache(":memory:", max_bytes)
+        return self._result_cache
 
-    def run_script(self, script_content: str, timeout: Optional[int] = None) -> str:
+    def result_key(self, script_content: str, cwd: Optional[str] = None, inputs: Optional[List[str]] = None,
+                   env: Optional[List[str]] = None) -> str:
+        # Declared inputs are paths relative to the working directory, and the names of environment variables
+        return self.result_cache.make_key(
+            script_content,
+            self.settings.get("default_shell", "bellos"),
+            cwd or os.getcwd(),
+            self.settings.get("result_cache_inputs") or [] if inputs is None else inputs,
+            self.settings.get("result_cache_env") or [] if env is None else env,
+            bool(self.settings.get("result_cache_hash_inputs"))
+        )
+
+    def lookup_result(self, script_content: str, cwd: Optional[str] = None, inputs: Optional[List[str]] = None,
+                      env: Optional[List[str]] = None, cache: Optional[bool] = None) -> tuple:
+        # (key, cached result), the key is None unless caching is on for this run
+        if not (self.settings.get("result_cache") if cache is None else cache):
+            return None, None
+        key = self.result_key(script_content, cwd, inputs, env)
+        return key, self.result_cache.get(key)
+
+    def invalidate_results(self, script_content: Optional[str] = None) -> int:
+        from .history_store import HistoryStore
+        script_hash = None if script_content is None else HistoryStore.script_hash(script_content)
+        return self.result_cache.invalidate(script_hash)
+
+    def get_result_cache_stats(self) -> dict:
+        return self.result_cache.stats()
+
+    def close_warm_pool(self):
+        with self._warm_pool_lock:
+            if self._warm_pool is not None:
+                self._warm_pool.close()
+                self._warm_pool = None
+
+    def run_script(self, script_content: str, timeout: Optional[int] = None, cwd: Optional[str] = None,
+                   cache: Optional[bool] = None, inputs: Optional[List[str]] = None,
+                   env: Optional[List[str]] = None) -> str:
+        # Only the last lines of each stream are kept, the full output is in the run's log file
+        stdout: deque = deque(maxlen=self.OUTPUT_TAIL_LINES)
+        stderr: deque = deque(maxlen=self.OUTPUT_TAIL_LINES)
+        line_counts = {"stdout": 0, "stderr": 0}
+
+        def collect_output(text: str, stream: str):
+            line_counts[stream] += text.count("\n") + 1
+            (stderr if stream == "stderr" else stdout).extend(text.rsplit("\n", self.OUTPUT_TAIL_LINES)[-self.OUTPUT_TAIL_LINES:])
+
+        # With caching on, a run whose script, interpreter, directory and declared inputs match a finished one is replayed
+        key, cached = self.lookup_result(script_content, cwd, inputs, env, cache)
+        if cached is not None:
+            for stream, text in cached.output:
+                collect_output(text, stream)
+            log_file = None
+        else:
+            # Nothing else happens until the script is done, so its output is read on this thread
+            process, stream, args = self._launch_script(script_content, collect_output, None, timeout, cwd,
+                                                        None, None, key)
+            stream(*args)
+            # Settled when the run finishes, the log takes another name if an older one has its run id
+            log_file = process.metrics.log_file
+
+        # Return combined output
+        output = "\n".join(stdout)
+        omitted = line_counts["stdout"] - len(stdout)
+        if omitted:
+            where = f"in {log_file}" if log_file else "omitted"
+            output = f"... {omitted} earlier lines {where}\n" + output
+        if stderr:
+            output += "\nErrors:\n" + "\n".join(stderr)
+        return output
+
+    def start_script(self, script_content: str,
+                     on_output: Optional[Callable[[str, str], None]] = None,
+                     on_finished: Optional[Callable[[int, int], None]] = None,
+                     timeout: Optional[int] = None,
+                     cwd: Optional[str] = None,
+                     name: Optional[str] = None,
+                     limits: Optional[dict] = None,
+                     cache_key: Optional[str] = None) -> subprocess.Popen:
+        process, stream, args = self._launch_script(script_content, on_output, on_finished, timeout, cwd, name,
+                                                    limits, cache_key)
+        # Stream output from a worker thread so the caller is never blocked
+        threading.Thread(target=stream, args=args, daemon=True).start()
+        return process
+
+    def _launch_script(self, script_content: str, on_output: Optional[Callable[[str, str], None]],
+                       on_finished: Optional[Callable[[int, int], None]], timeout: Optional[int], cwd: Optional[str],
+                       name: Optional[str], limits: Optional[dict], cache_key: Optional[str]) -> tuple:
+        # (process, stream function, its arguments), the stream function reads the output and settles the run
         if timeout is None:
             timeout = self.settings.get("default_timeout", 30)
+        limits = self.run_limits(limits)
+        preexec_fn = self._limit_preexec(limits)
+
+        # Per-run resource limits need a fresh process, anything else may go to an idle warm worker
+        pool = self.warm_pool if preexec_fn is None else None
+        worker = pool.acquire() if pool is not None else None
+        if worker is not None:
+            try:
+                worker.submit(script_content, cwd or os.getcwd())
+            except OSError:
+                pool.discard(worker)
+                worker = None
+
+        if worker is not None:
+            process, script_file = worker.process, None
+            target, args = self._stream_pooled_output, (pool, worker)
+        else:
+            process, script_file = self._spawn_script(script_content, cwd, preexec_fn)
+            target, args = self._stream_output, (process, script_file)
 
-        # Create a temporary script file
-        script_file = f"temp_script{self.settings.get('script_extension', '.bellos')}"
+        self.active_processes[process.pid] = process
+        # A warm worker's own shell is not part of the run
+        self.memory_sampler.track(process.pid, process.pid if worker is not None else None)
+        from .history_store import HistoryStore
+        metrics = RunMetrics(process.pid, HistoryStore.script_hash(script_content), name, cwd)
+        process.metrics = metrics
         try:
-            with open(script_file, 'w') as f:
-                f.write(script_content)
+            metrics.run_id = self.history.start_run(script_content, metrics.script_hash, name, metrics.cwd,
+                                                    metrics.started_at)
+        except Exception:
+            self._history = HistoryStore(":memory:")
+            metrics.run_id = self._history.start_run(script_content, metrics.script_hash, name, metrics.cwd,
+                                                     metrics.started_at)
+        metrics.name = name or f"run {metrics.run_id}"
+
+        # Output streams into the run's log file, so callers only ever need to hold a tail of it
+        if self.settings.get("run_logs", True):
+            from .run_log import RunLog
+            try:
+                log = RunLog(os.path.join(self.run_log_dir, RunLog.file_name(metrics.run_id)))
+            except OSError:
+                log = None
+            if log is not None:
+                metrics.log_file = log.path
+                self.run_logs[metrics.run_id] = log
+                on_output = log.wrap(on_output)
+
+        # The output is kept for the result cache, which only takes it if the run finishes on its own
+        if cache_key is not None:
+            from .result_cache import ResultCache, ResultRecorder
+            recorder = ResultRecorder(cache_key, metrics.script_hash, ResultCache.MAX_ENTRY_BYTES)
+            self.result_recorders[metrics.run_id] = recorder
+            on_output = recorder.wrap(on_output)
 
-            # Make the script executable
-            os.chmod(script_file, 0o755)
+        # Set up timeout handling
+        watch_id = None
+        if timeout:
+            watch_id = self.watchdog.watch(timeout, self._timeout_process, process.pid, timeout, on_output)
 
-            # Run the script with the specified shell
-            shell = self.settings.get("default_shell", "bellos")
+        return process, target, args + (metrics, watch_id, on_output, on_finished, limits["max_output_bytes"])
+
+    def _spawn_script(self, script_content: str, cwd: Optional[str],
+                      preexec_fn: Optional[Callable[[], None]]) -> tuple:
+        # Hand the script to the interpreter without touching the working directory
+        shell = self.settings.get("default_shell", "bellos")
+        args, stdin, pass_fds, script_file = self._prepare_script(shell, script_content)
+        try:
             process = subprocess.Popen(
-                [shell, script_file],
+                args,
+                executable=self._shell_path(shell),
+                stdin=stdin,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True
+                pass_fds=pass_fds,
+                cwd=cwd,
+                # Its own session makes the script a process group leader, so stopping it reaches every descendant
+                start_new_session=True,
+                preexec_fn=preexec_fn
             )
+        except Exception:
+            self._remove_script_file(script_file)
+            raise
+        finally:
+            # The child holds its own copies of the script descriptors
+            for fd in pass_fds:
+                os.close(fd)
+            if stdin != self._devnull:
+                os.close(stdin)
+        return process, script_file
 
-            self.active_processes[process.pid] = process
+    def _shell_path(self, shell: str) -> Optional[str]:
+        key = (shell, os.environ.get("PATH"))
+        if key not in self._shell_paths:
+            import shutil
+            self._shell_paths[key] = shutil.which(shell)
+        return self._shell_paths[key]
 
-            # Set up timeout handling
-            timer = threading.Timer(timeout, self.kill_process, args=[process.pid])
-            timer.start()
+    def run_limits(self, limits: Optional[dict] = None) -> dict:
+        resolved = {key: self.settings.get(setting) for key, setting in self.LIMIT_SETTINGS.items()}
+        resolved.update({key: value for key, value in (limits or {}).items() if key in resolved})
+        return resolved
 
-            try:
-                stdout, stderr = process.communicate()
-                timer.cancel()  # Cancel the timeout if process completes normally
-            except subprocess.TimeoutExpired:
-                return f"Script execution timed out after {timeout} seconds"
+    def _limit_preexec(self, limits: dict) -> Optional[Callable[[], None]]:
+        rlimits = []
+        if limits["cpu_seconds"]:
+            rlimits.append((resource.RLIMIT_CPU, int(limits["cpu_seconds"])))
+        if limits["address_space_mb"]:
+            rlimits.append((resource.RLIMIT_AS, int(limits["address_space_mb"]) * 1024 * 1024))
+        if limits["open_files"]:
+            rlimits.append((resource.RLIMIT_NOFILE, int(limits["open_files"])))
+
+        # Without limits there is no hook, which keeps the fast vfork spawn path
+        if not rlimits:
+            return None
+
+        def apply_limits():
+            for limit, value in rlimits:
+                _, hard = resource.getrlimit(limit)
+                if hard != resource.RLIM_INFINITY:
+                    value = min(value, hard)
+                resource.setrlimit(limit, (value, hard))
+        return apply_limits
+
+    def _prepare_script(self, shell: str, script_content: str) -> tuple:
+        data = script_content.encode()
+        script_input = self.settings.get("script_input", "auto")
+        has_memfd = self._has_memfd
+
+        # Interpreter reads the script from stdin, backed by an anonymous file so large scripts never block
+        if script_input == "stdin":
+            if has_memfd:
+                fd = os.memfd_create("bellos_script")
+            else:
+                import tempfile
+                fd = os.dup(tempfile.TemporaryFile(dir=self._script_temp_dir()).fileno())
+            os.write(fd, data)
+            os.lseek(fd, 0, os.SEEK_SET)
+            return [shell], fd, (), None
 
-            if process.pid in self.active_processes:
-                del self.active_processes[process.pid]
+        # Interpreter opens the script through /dev/fd, nothing is written to disk
+        if script_input in ("auto", "memfd") and has_memfd:
+            fd = os.memfd_create("bellos_script")
+            os.write(fd, data)
+            return [shell, f"/dev/fd/{fd}"], self._devnull, (fd,), None
 
-            # Add to history
-            self.script_history.append(script_content)
+        # Fall back to a uniquely named file, preferably on tmpfs
+        import tempfile
+        fd, script_file = tempfile.mkstemp(prefix="temp_script_",
+                                           suffix=self.settings.get('script_extension', '.bellos'),
+                                           dir=self._script_temp_dir())
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(script_file, 0o755)
+        return [shell, script_file], self._devnull, (), script_file
 
-            # Return combined output
-            output = stdout
-            if stderr:
-                output += f"\nErrors:\n{stderr}"
-            return output
+    def _script_temp_dir(self) -> str:
+        if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+            return "/dev/shm"
+        import tempfile
+        return tempfile.gettempdir()
 
+    def _remove_script_file(self, script_file: Optional[str]):
+        if script_file and os.path.exists(script_file):
+            os.remove(script_file)
+
+    def _stream_output(self, process: subprocess.Popen, script_file: Optional[str], metrics: RunMetrics,
+                       watch_id: Optional[int], on_output: Optional[Callable[[str, str], None]],
+                       on_finished: Optional[Callable[[int, int], None]],
+                       max_output_bytes: Optional[int] = None):
+        # Two pipes per run, poll needs no kernel object of its own the way epoll does
+        selector = selectors.PollSelector() if hasattr(selectors, "PollSelector") else selectors.DefaultSelector()
+        selector.register(process.stdout, selectors.EVENT_READ, "stdout")
+        selector.register(process.stderr, selectors.EVENT_READ, "stderr")
+        pending = {"stdout": b"", "stderr": b""}
+
+        try:
+            while selector.get_map():
+                for key, _ in selector.select():
+                    stream = key.data
+                    data = os.read(key.fileobj.fileno(), 65536)
+                    if stream == "stdout":
+                        metrics.stdout_bytes += len(data)
+                    else:
+                        metrics.stderr_bytes += len(data)
+
+                    # Past the output limit the script is stopped and the rest is drained unseen
+                    if max_output_bytes and metrics.stdout_bytes + metrics.stderr_bytes > max_output_bytes:
+                        if process.pid not in self.kill_reasons:
+                            if on_output:
+                                on_output(f"Script output exceeded {max_output_bytes} bytes", "stderr")
+                            self.kill_process(process.pid, "output limit exceeded")
+                        if data:
+                            continue
+
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        if pending[stream] and on_output:
+                            on_output(pending[stream].decode(errors="replace"), stream)
+                        pending[stream] = b""
+                        continue
+
+                    # Only hand complete lines to the callback, keep the partial tail
+                    lines = (pending[stream] + data).rsplit(b"\n", 1)
+                    if len(lines) == 1:
+                        pending[stream] = lines[0]
+                    else:
+                        pending[stream] = lines[1]
+                        if on_output:
+                            on_output(lines[0].decode(errors="replace"), stream)
         finally:
+            selector.close()
+            process.stdout.close()
+            process.stderr.close()
+
+            # A stopped script's leader is not reaped yet, so its group id cannot have been reused
+            kill_watch = self.kill_watches.pop(process.pid, None)
+            if kill_watch is not None:
+                self.watchdog.cancel(kill_watch)
+                self._signal_group(process.pid, signal.SIGKILL)
+
+            returncode, rusage = self._reap(process)
+            if watch_id is not None:
+                self.watchdog.cancel(watch_id)  # Cancel the timeout if process completes normally
+            self.active_processes.pop(process.pid, None)
+            peak_rss_kb = self.memory_sampler.untrack(process.pid)
+
             # Clean up temporary script file
-            if os.path.exists(script_file):
-                os.remove(script_file)
+            self._remove_script_file(script_file)
 
-    def kill_process(self, pid: int):
-        if pid in self.active_processes:
-            process = self.active_processes[pid]
+            status = self.kill_reasons.pop(process.pid, None)
+            if status is None:
+                status = "cpu limit exceeded" if returncode == -signal.SIGXCPU else "finished"
+            metrics.finish(returncode, rusage, status, peak_rss_kb)
+            self._record_run(metrics)
+
+            if on_finished:
+                on_finished(process.pid, returncode)
+
+    def _stream_pooled_output(self, pool: "WarmPool", worker: "WarmWorker", metrics: RunMetrics,
+                              watch_id: Optional[int], on_output: Optional[Callable[[str, str], None]],
+                              on_finished: Optional[Callable[[int, int], None]],
+                              max_output_bytes: Optional[int] = None):
+        # The worker outlives the run, so the run ends at its marker on both streams rather than at EOF
+        process = worker.process
+        selector = selectors.DefaultSelector()
+        selector.register(process.stdout, selectors.EVENT_READ, "stdout")
+        selector.register(process.stderr, selectors.EVENT_READ, "stderr")
+        pending = {"stdout": b"", "stderr": b""}
+        returncode: Optional[int] = None
+        worker_lost = False
+
+        def emit(data: bytes, stream: str):
+            lines = data.rsplit(b"\n", 1)
+            if on_output and lines[0]:
+                on_output(lines[0].decode(errors="replace"), stream)
+            if on_output and len(lines) == 2 and lines[1]:
+                on_output(lines[1].decode(errors="replace"), stream)
+
+        try:
+            while selector.get_map():
+                for key, _ in selector.select():
+                    stream = key.data
+                    data = os.read(key.fileobj.fileno(), 65536)
+                    if not data:
+                        # The worker died with the run, killed or taken down by the script
+                        worker_lost = True
+                        selector.unregister(key.fileobj)
+                        if pending[stream]:
+                            emit(pending[stream], stream)
+                        pending[stream] = b""
+                        continue
+
+                    if stream == "stdout":
+                        metrics.stdout_bytes += len(data)
+                    else:
+                        metrics.stderr_bytes += len(data)
+
+                    if max_output_bytes and metrics.stdout_bytes + metrics.stderr_bytes > max_output_bytes:
+                        if process.pid not in self.kill_reasons:
+                            if on_output:
+                                on_output(f"Script output exceeded {max_output_bytes} bytes", "stderr")
+                            self.kill_process(process.pid, "output limit exceeded")
+                        continue
+
+                    buffer = pending[stream] + data
+                    index = buffer.find(worker.marker)
+                    if index != -1:
+                        tail = buffer[index + len(worker.marker):]
+                        if b"\n" not in tail:
+                            pending[stream] = buffer
+                            continue
+                        if stream == "stdout":
+                            metrics.stdout_bytes -= len(buffer) - index
+                            returncode = int(tail.split(b"\n", 1)[0])
+                        else:
+                            metrics.stderr_bytes -= len(buffer) - index
+                        emit(buffer[:index], stream)
+                        pending[stream] = b""
+                        selector.unregister(key.fileobj)
+                        continue
+
+                    # Only hand complete lines to the callback, keep the partial tail
+                    lines = buffer.rsplit(b"\n", 1)
+                    if len(lines) == 1:
+                        pending[stream] = lines[0]
+                    else:
+                        pending[stream] = lines[1]
+                        if on_output:
+                            on_output(lines[0].decode(errors="replace"), stream)
+        finally:
+            selector.close()
+            if watch_id is not None:
+                self.watchdog.cancel(watch_id)
+
+            kill_watch = self.kill_watches.pop(process.pid, None)
+            if kill_watch is not None:
+                self.watchdog.cancel(kill_watch)
+                self._signal_group(process.pid, signal.SIGKILL)
+            status = self.kill_reasons.pop(process.pid, None)
+
+            # A stopped or lost worker is reaped here and never goes back to the pool
+            worker_lost = worker_lost or status is not None or returncode is None
+            if worker_lost:
+                exit_code, _ = self._reap(process)
+                if returncode is None:
+                    returncode = exit_code
+            cpu_times = None if worker_lost else worker.children_cpu_times()
+            self.active_processes.pop(process.pid, None)
+            peak_rss_kb = self.memory_sampler.untrack(process.pid)
+
+            metrics.finish(returncode, None, status or ("worker exited" if worker_lost else "finished"), peak_rss_kb)
+            if cpu_times is not None and worker.cpu_baseline is not None:
+                metrics.user_time = cpu_times[0] - worker.cpu_baseline[0]
+                metrics.system_time = cpu_times[1] - worker.cpu_baseline[1]
+            self._record_run(metrics)
+
+            if on_finished:
+                on_finished(process.pid, returncode)
+
+            # Handed back only after on_finished, so the pid cannot be reused while the run is still being settled
+            if worker_lost:
+                pool.discard(worker)
+            else:
+                pool.release(worker)
+
+    def _record_run(self, metrics: RunMetrics):
+        log = self.run_logs.pop(metrics.run_id, None)
+        if log is not None:
+            log.close()
+            metrics.log_file = log.path
+            from .run_log import RunLog
+            if os.path.basename(log.path) != RunLog.file_name(metrics.run_id):
+                self.run_log_paths[metrics.run_id] = log.path
+            else:
+                self.run_log_paths.pop(metrics.run_id, None)
+        recorder = self.result_recorders.pop(metrics.run_id, None)
+        if recorder is not None and metrics.status == "finished":
             try:
-                os.kill(pid, signal.SIGTERM)
-                process.wait(timeout=1)  # Give it a second to terminate gracefully
-            except (ProcessLookupError, subprocess.TimeoutExpired):
-                try:
-                    os.kill(pid, signal.SIGKILL)  # Force kill if necessary
-                except ProcessLookupError:
-                    pass
-            finally:
-                del self.active_processes[pid]
+                self.result_cache.put(recorder, metrics.exit_code)
+            except Exception:
+                pass
+        try:
+            self.history.finish_run(metrics.run_id, metrics.to_dict())
+        except Exception:
+            pass
+        self.run_metrics.append(metrics)
+        for listener in self.metrics_listeners:
+            listener(metrics)
+
+    def _reap(self, process: subprocess.Popen) -> tuple:
+        # wait4 reports the child's CPU time along with its exit status
+        try:
+            _, status, rusage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            # Already reaped through the Popen object, the exit code survives but the usage does not
+            return process.wait(), None
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return process.returncode, rusage
+
+    def _timeout_process(self, pid: int, timeout: int, on_output: Optional[Callable[[str, str], None]]):
+        if pid in self.active_processes and pid not in self.kill_reasons:
+            if on_output:
+                on_output(f"Script execution timed out after {timeout} seconds", "stderr")
+            self.kill_process(pid, "timed out")
+
+    def kill_process(self, pid: int, reason: str = "cancelled"):
+        # Never blocks: the group gets SIGTERM now and the watchdog sends SIGKILL if it outlives the grace period
+        if pid not in self.active_processes or pid in self.kill_watches:
+            return
+        self.kill_reasons.setdefault(pid, reason)
+        self.kill_watches[pid] = self.watchdog.watch(self.KILL_GRACE_PERIOD, self._force_kill, pid)
+        self._signal_group(pid, signal.SIGTERM)
+
+    def _force_kill(self, pid: int):
+        if self.kill_watches.pop(pid, None) is not None and pid in self.active_processes:
+            self._signal_group(pid, signal.SIGKILL)
+
+    def _signal_group(self, pid: int, sig: int):
+        try:
+            os.killpg(pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
 
     def kill_all_processes(self):
+        # Drop queued jobs first so killing running ones does not start the next batch
+        with self._job_lock:
+            while self.job_queue:
+                job = self.job_queue.popleft()
+                job.status = "cancelled"
+                self._notify_job(job)
+            for job in self.running_jobs.values():
+                job.status = "cancelled"
+
         for pid in list(self.active_processes.keys()):
             self.kill_process(pid)
 
-    def get_script_history(self) -> List[str]:
-        return self.script_history
+    def submit_job(self, script_content: str, cwd: Optional[str] = None, timeout: Optional[int] = None,
+                   on_output: Optional[Callable[[ScriptJob, str, str], None]] = None,
+                   name: Optional[str] = None, limits: Optional[dict] = None) -> ScriptJob:
+        with self._job_lock:
+            job = ScriptJob(next(self._job_ids), script_content, cwd, timeout, on_output, name, limits)
+            self.jobs[job.job_id] = job
+            self.job_queue.append(job)
+            self._notify_job(job)
+            self._dispatch_jobs()
+        return job
+
+    def set_max_concurrency(self, max_concurrency: int):
+        with self._job_lock:
+            self.max_concurrency = max(1, max_concurrency)
+            self._dispatch_jobs()
+
+    def cancel_job(self, job_id: int):
+        with self._job_lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status not in ("queued", "running"):
+                return
+            if job.status == "queued":
+                self.job_queue.remove(job)
+                job.status = "cancelled"
+                self._notify_job(job)
+                return
+            job.status = "cancelled"
+            pid = job.pid
+
+        self.kill_process(pid)
+
+    def get_jobs(self) -> List[ScriptJob]:
+        with self._job_lock:
+            return list(self.jobs.values())
+
+    def clear_finished_jobs(self):
+        with self._job_lock:
+            for job_id, job in list(self.jobs.items()):
+                if job.status not in ("queued", "running"):
+                    del self.jobs[job_id]
+
+    def add_job_listener(self, listener: Callable[[ScriptJob], None]):
+        self.job_listeners.append(listener)
+
+    def _notify_job(self, job: ScriptJob):
+        for listener in self.job_listeners:
+            listener(job)
+
+    def _dispatch_jobs(self):
+        while self.job_queue and len(self.running_jobs) < self.max_concurrency:
+            job = self.job_queue.popleft()
+
+            def forward_output(text: str, stream: str, job=job):
+                if job.on_output:
+                    job.on_output(job, text, stream)
+
+            # _finish_job waits on the lock, so pid bookkeeping below always lands first
+            job.status = "running"
+            job.start_time = time.monotonic()
+            try:
+                process = self.start_script(job.script_content,
+                                            on_output=forward_output,
+                                            on_finished=lambda pid, returncode, job=job: self._finish_job(job, returncode),
+                                            timeout=job.timeout,
+                                            cwd=job.cwd,
+                                            name=job.name,
+                                            limits=job.limits)
+            except Exception as e:
+                job.status = "failed"
+                job.end_time = time.monotonic()
+                forward_output(f"Error: {str(e)}", "stderr")
+                self._notify_job(job)
+                continue
+
+            job.pid = process.pid
+            job.metrics = process.metrics
+            self.running_jobs[process.pid] = job
+            self._notify_job(job)
+
+    def _finish_job(self, job: ScriptJob, returncode: int):
+        with self._job_lock:
+            self.running_jobs.pop(job.pid, None)
+            job.exit_code = returncode
+            job.end_time = time.monotonic()
+            if job.status != "cancelled":
+                job.status = job.metrics.status if job.metrics is not None else "finished"
+            self._notify_job(job)
+            self._dispatch_jobs()
+
+    def get_script_history(self) -> Iterator[str]:
+        # Script bodies of past runs, oldest first, paged in from the history store as iterated
+        return self.history.iter_scripts()
+
+    def get_run_history(self, before_id: Optional[int] = None, limit: Optional[int] = None,
+                        name: Optional[str] = None) -> List[dict]:
+        return self.history.get_runs(before_id, limit, name)
 
     def clear_history(self):
-        self.script_history.clear()
+        self.history.clear()
+        self.run_log_paths.clear()
+        from .run_log import RunLog
+        RunLog.prune(self.run_log_dir, 0, [log.path for log in list(self.run_logs.values())])
 
     def validate_script(self, script_content: str) -> bool:
-        # Basic script validation
-        try:
-            shell = self.settings.get("default_shell", "bellos")
-            process = subprocess.run(
-                [shell, "-n"],
-                input=script_content,
-                text=True,
-                capture_output=True
-            )
-            return process.returncode == 0
-        except Exception:
-            return False
+        # Results are cached by content, so repeated checks of the same text spawn nothing
+        return self.validator.validate(script_content).valid
 
     def get_active_processes(self) -> Dict[int, subprocess.Popen]:
-        # Clean up finished processes
-        for pid in list(self.active_processes.keys()):
-            if self.active_processes[pid].poll() is not None:
-                del self.active_processes[pid]
-        return self.active_processes
+        # Reader threads drop processes as they exit, polling here would reap them before wait4 can
+        return dict(self.active_processes)
+
+    def add_metrics_listener(self, listener: Callable[[RunMetrics], None]):
+        self.metrics_listeners.append(listener)
+
+    def get_run_metrics(self, limit: Optional[int] = None) -> List[RunMetrics]:
+        runs = list(self.run_metrics)
+        return runs[-limit:] if limit else runs
+
+    def get_metrics_summary(self) -> Dict[str, dict]:
+        # Totals per script name, the slowest and hungriest scripts stand out here
+        summary: Dict[str, dict] = {}
+        for metrics in list(self.run_metrics):
+            entry = summary.setdefault(metrics.name, {"runs": 0, "failures": 0, "wall_time": 0.0,
+                                                      "cpu_time": 0.0, "peak_rss_kb": 0})
+            entry["runs"] += 1
+            entry["failures"] += metrics.status != "finished" or metrics.exit_code != 0
+            entry["wall_time"] += metrics.wall_time or 0.0
+            entry["cpu_time"] += (metrics.user_time or 0.0) + (metrics.system_time or 0.0)
+            entry["peak_rss_kb"] = max(entry["peak_rss_kb"], metrics.peak_rss_kb or 0)
+        return summary
+
+    def clear_run_metrics(self):
+        self.run_metrics.clear()
+
+    def export_metrics(self, path: str, format: Optional[str] = None):
+        runs = [metrics.to_dict() for metrics in list(self.run_metrics)]
+        if (format or os.path.splitext(path)[1].lstrip(".").lower()) == "csv":
+            import csv
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=RunMetrics.FIELDS)
+            writer.writeheader()
+            writer.writerows(runs)
+            data = buffer.getvalue()
+        else:
+            data = json.dumps(runs, indent=4)
+        atomic_write(path, data.encode())
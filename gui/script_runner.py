@@ -0,0 +1,67 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Optional
+from PyQt6.QtCore import pyqtSignal, QObject
+
+class ScriptRunner(QObject):
+    output_received = pyqtSignal(str, str)
+    script_finished = pyqtSignal(int, int)
+    job_updated = pyqtSignal(object)
+    run_recorded = pyqtSignal(object)
+    result_reused = pyqtSignal(object)
+
+    def __init__(self, script_manager, parent=None):
+        super().__init__(parent)
+        self.script_manager = script_manager
+        self.script_manager.add_job_listener(self.job_updated.emit)
+        self.script_manager.add_metrics_listener(self.run_recorded.emit)
+
+    def run(self, script_content: str, timeout: Optional[int] = None, name: Optional[str] = None) -> int:
+        # A cached result is replayed instead of starting a process, and there is no pid to return
+        key, cached = self.script_manager.lookup_result(script_content)
+        if cached is not None:
+            for stream, text in cached.output:
+                self.output_received.emit(text, stream)
+            self.result_reused.emit(cached)
+            self.script_finished.emit(0, cached.exit_code)
+            return 0
+
+        # Callbacks fire on the reader thread, the signals queue them onto the GUI thread
+        process = self.script_manager.start_script(
+            script_content,
+            on_output=self.output_received.emit,
+            on_finished=self.script_finished.emit,
+            timeout=timeout,
+            name=name,
+            cache_key=key
+        )
+        return process.pid
+
+    def submit(self, script_content: str, cwd: Optional[str] = None, timeout: Optional[int] = None,
+               name: Optional[str] = None) -> int:
+        job = self.script_manager.submit_job(script_content, cwd=cwd, timeout=timeout,
+                                             on_output=self._emit_job_output, name=name)
+        return job.job_id
+
+    def cancel(self, job_id: int):
+        self.script_manager.cancel_job(job_id)
+
+    def cancel_all(self):
+        self.script_manager.kill_all_processes()
+
+    def _emit_job_output(self, job, text: str, stream: str):
+        prefix = f"[{job.name}] "
+        self.output_received.emit(prefix + text.replace("\n", "\n" + prefix), stream)
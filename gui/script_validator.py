@@ -0,0 +1,156 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, json, re, threading, subprocess
+from collections import OrderedDict
+from typing import Optional, Dict, List, Callable
+
+from .file_io import atomic_write
+
+class ValidationResult:
+    def __init__(self, valid: bool, errors: Optional[List[tuple]] = None):
+        self.valid = valid
+        # (line number or None, message) pairs as reported by the shell
+        self.errors: List[tuple] = errors or []
+
+    def to_dict(self) -> dict:
+        return {"valid": self.valid, "errors": [{"line": line, "message": message} for line, message in self.errors]}
+
+
+class ScriptValidator:
+    # "sh: 3: Syntax error: ..." from dash, "bash: line 3: syntax error ..." from bash
+    ERROR_LINE_PATTERN = re.compile(r"(?:\bline |:\s*)(\d+):\s*(.*)")
+
+    SKIP_DIRECTORIES = {".git", ".hg", ".svn", "__pycache__", "node_modules"}
+    SCRIPT_EXTENSIONS = (".bellos",)
+
+    MAX_CACHE_ENTRIES = 4096
+    CHECK_TIMEOUT = 10
+
+    def __init__(self, get_shell: Callable[[], str], cache_path: Optional[str] = None, max_workers: Optional[int] = None):
+        self.get_shell = get_shell
+        self.cache_path = cache_path if cache_path is not None else self.default_cache_path()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache: Optional[OrderedDict] = None
+        self.cache_dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def default_cache_path() -> str:
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(cache_home, "bellos_application_manager", "validation_cache.json")
+
+    def cache_key(self, shell: str, script_content: str) -> str:
+        # The verdict depends on the interpreter as much as on the text
+        import hashlib
+        return hashlib.sha256(shell.encode() + b"\0" + script_content.encode()).hexdigest()
+
+    def validate(self, script_content: str) -> ValidationResult:
+        shell = self.get_shell()
+        key = self.cache_key(shell, script_content)
+        with self._lock:
+            self._load_cache()
+            entry = self.cache.get(key)
+            if entry is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return ValidationResult(entry[0], [tuple(error) for error in entry[1]])
+            self.misses += 1
+
+        try:
+            process = subprocess.run([shell, "-n"], input=script_content, text=True,
+                                     capture_output=True, timeout=self.CHECK_TIMEOUT)
+        except Exception as e:
+            # A missing shell or a hung check says nothing about the script, so it is not cached
+            return ValidationResult(False, [(None, str(e))])
+
+        result = ValidationResult(process.returncode == 0, self.parse_errors(process.stderr))
+        if not result.valid and not result.errors:
+            result.errors.append((None, f"{shell} -n exited with code {process.returncode}"))
+
+        with self._lock:
+            self.cache[key] = [result.valid, [list(error) for error in result.errors]]
+            while len(self.cache) > self.MAX_CACHE_ENTRIES:
+                self.cache.popitem(last=False)
+            self.cache_dirty = True
+        return result
+
+    def parse_errors(self, stderr: str) -> List[tuple]:
+        errors = []
+        for line in stderr.splitlines():
+            match = self.ERROR_LINE_PATTERN.search(line)
+            if match:
+                errors.append((int(match.group(1)), match.group(2).strip()))
+            elif line.strip():
+                # A line without the file: line N: prefix continues the error before it
+                if errors:
+                    number, message = errors[-1]
+                    errors[-1] = (number, f"{message} {line.strip()}")
+                else:
+                    errors.append((None, line.strip()))
+        return errors
+
+    def validate_files(self, paths: List[str]) -> Dict[str, ValidationResult]:
+        def validate_file(path: str) -> ValidationResult:
+            try:
+                with open(path, 'r') as f:
+                    return self.validate(f.read())
+            except Exception as e:
+                return ValidationResult(False, [(None, str(e))])
+
+        # The checks are separate processes, so threads are enough to run them side by side
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = dict(zip(paths, executor.map(validate_file, paths)))
+        self.save()
+        return results
+
+    def validate_project(self, root: str) -> Dict[str, ValidationResult]:
+        return self.validate_files(self.find_scripts(root))
+
+    def find_scripts(self, root: str) -> List[str]:
+        scripts = []
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories[:] = sorted(name for name in subdirectories if name not in self.SKIP_DIRECTORIES)
+            scripts.extend(os.path.join(directory, name) for name in sorted(files)
+                           if name.endswith(self.SCRIPT_EXTENSIONS))
+        return scripts
+
+    def save(self):
+        with self._lock:
+            if not self.cache_dirty:
+                return
+            data = json.dumps({"version": 2, "entries": [[key] + entry for key, entry in self.cache.items()]})
+            self.cache_dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            atomic_write(self.cache_path, data.encode())
+        except Exception:
+            pass
+
+    def _load_cache(self):
+        if self.cache is not None:
+            return
+        self.cache = OrderedDict()
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == 2:
+                for key, valid, errors in data.get("entries", [])[-self.MAX_CACHE_ENTRIES:]:
+                    self.cache[key] = [valid, errors]
+        except Exception:
+            pass
@@ -0,0 +1,190 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, json, time, threading
+from typing import Optional, Dict, List, Callable, Any
+
+from .file_io import atomic_write
+
+class SettingsService:
+    DEFAULTS = {
+        "project_name": "",
+        "project_path": "",
+        "default_shell": "bellos",
+        "tab_width": 4,
+        "auto_save": False,
+        "auto_indent": True,
+        "show_line_numbers": True,
+        "live_validation": True,
+        "tab_memory_budget": 256,
+        "terminal_font_size": 10,
+        "terminal_history_size": 1000,
+        "script_extension": ".bellos",
+        "default_timeout": 30,
+        "script_input": "auto",
+        "result_cache": False,
+        "result_cache_inputs": [],
+        "result_cache_env": []
+    }
+
+    # Written by the settings tab before both sides shared one file, read when the new file does not exist yet
+    LEGACY_FILE = "bellos_settings.bellande"
+
+    # Quiet period after the last change before the file is rewritten
+    WRITE_DELAY = 0.5
+
+    def __init__(self, path: Optional[str] = None, autosave: bool = True):
+        # Resolved once, a later change of working directory does not move the file
+        self.path = os.path.abspath(path or "bellos_settings.json")
+        self.autosave = autosave
+        self.listeners: List[Callable[[str, Any], None]] = []
+        self.write_error: Optional[Exception] = None
+
+        # Loaded on first use, global values and overrides keyed by absolute project path
+        self._values: Optional[dict] = None
+        self._projects: Dict[str, dict] = {}
+        self._lock = threading.RLock()
+        self._condition = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        self._write_deadline: Optional[float] = None
+        self._writer: Optional[threading.Thread] = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            self._load()
+            return self._lookup(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.get(key)
+
+    def __setitem__(self, key: str, value: Any):
+        self.update({key: value})
+
+    def values(self) -> dict:
+        # Effective settings for the current project
+        with self._lock:
+            self._load()
+            values = dict(self.DEFAULTS, **self._values)
+            values.update(self._projects.get(self._project_key(), {}))
+            return values
+
+    def project_overrides(self, project: str) -> dict:
+        with self._lock:
+            self._load()
+            return dict(self._projects.get(os.path.abspath(project), {}))
+
+    def update(self, values: Optional[dict] = None, project: Optional[str] = None, **kwargs):
+        # Without a project the values are global, with one they apply only while that project is open
+        values = dict(values or {}, **kwargs)
+        with self._lock:
+            before = self.values()
+            if project:
+                self._projects.setdefault(os.path.abspath(project), {}).update(values)
+            else:
+                self._values.update(values)
+            after = self.values()
+            self._schedule_write()
+        self._notify(before, after)
+
+    def clear_project_overrides(self, project: str):
+        with self._lock:
+            before = self.values()
+            if self._projects.pop(os.path.abspath(project), None) is None:
+                return
+            after = self.values()
+            self._schedule_write()
+        self._notify(before, after)
+
+    def add_listener(self, listener: Callable[[str, Any], None]):
+        self.listeners.append(listener)
+
+    def flush(self):
+        # Writes a pending change now, errors are raised to the caller
+        with self._condition:
+            if self._write_deadline is None:
+                return
+            self._write_deadline = None
+        self._write()
+
+    def _load(self):
+        if self._values is not None:
+            return
+        self._values = {}
+        for path in (self.path, os.path.join(os.path.dirname(self.path), self.LEGACY_FILE)):
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                continue
+            except Exception:
+                break
+            if isinstance(data, dict):
+                projects = data.pop("projects", {})
+                self._projects = projects if isinstance(projects, dict) else {}
+                self._values = data
+            break
+
+    def _lookup(self, key: str, default: Any) -> Any:
+        overrides = self._projects.get(self._project_key(), {})
+        if key in overrides:
+            return overrides[key]
+        if key in self._values:
+            return self._values[key]
+        return self.DEFAULTS.get(key, default)
+
+    def _project_key(self) -> str:
+        project_path = self._values.get("project_path")
+        return os.path.abspath(project_path) if project_path else ""
+
+    def _notify(self, before: dict, after: dict):
+        for key in sorted(set(before) | set(after)):
+            if before.get(key) != after.get(key):
+                for listener in self.listeners:
+                    listener(key, after.get(key))
+
+    def _schedule_write(self):
+        if not self.autosave:
+            return
+        self._write_deadline = time.monotonic() + self.WRITE_DELAY
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run_writer, name="bellos-settings", daemon=True)
+            self._writer.start()
+        self._condition.notify()
+
+    def _run_writer(self):
+        while True:
+            with self._condition:
+                while self._write_deadline is None:
+                    self._condition.wait()
+                remaining = self._write_deadline - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                self._write_deadline = None
+            try:
+                self._write()
+                self.write_error = None
+            except Exception as e:
+                self.write_error = e
+
+    def _write(self):
+        # Snapshots are taken and written in order, so an older one never lands last
+        with self._write_lock:
+            with self._lock:
+                data = dict(self._values)
+                if self._projects:
+                    data["projects"] = self._projects
+                data = json.dumps(data, indent=4)
+            atomic_write(self.path, data.encode())
@@ -0,0 +1,205 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+from typing import TYPE_CHECKING, Dict, List, Optional
+from PyQt6.QtWidgets import QHBoxLayout, QLineEdit, QPushButton, QStackedWidget, QVBoxLayout, QWidget
+from PyQt6.QtCore import Qt, QEvent, pyqtSignal
+
+from .terminal import Terminal
+
+# Opening a pseudo-terminal is only needed once the shell tab is shown
+if TYPE_CHECKING:
+    from .shell_session import ShellSession
+
+class ShellInput(QLineEdit):
+    interrupt_requested = pyqtSignal()
+    eof_requested = pyqtSignal()
+
+    MAX_HISTORY = 1000
+
+    def __init__(self):
+        super().__init__()
+        self.history: List[str] = []
+        self.history_index = 0
+        self.draft = ""
+
+    def add_history(self, line: str):
+        if line.strip() and (not self.history or self.history[-1] != line):
+            self.history.append(line)
+            del self.history[:-self.MAX_HISTORY]
+        self.history_index = len(self.history)
+        self.draft = ""
+
+    def show_history(self, step: int):
+        # The line being typed is kept aside while browsing and comes back past the newest entry
+        if self.history_index == len(self.history):
+            self.draft = self.text()
+        self.history_index = max(0, min(len(self.history), self.history_index + step))
+        self.setText(self.history[self.history_index] if self.history_index < len(self.history) else self.draft)
+
+    def keyPressEvent(self, event):
+        control = event.modifiers() & Qt.KeyboardModifier.ControlModifier
+        if event.key() == Qt.Key.Key_Up:
+            self.show_history(-1)
+        elif event.key() == Qt.Key.Key_Down:
+            self.show_history(1)
+        elif control and event.key() == Qt.Key.Key_C and not self.hasSelectedText():
+            self.interrupt_requested.emit()
+        elif control and event.key() == Qt.Key.Key_D and not self.text():
+            self.eof_requested.emit()
+        else:
+            super().keyPressEvent(event)
+
+
+class ShellPanel(QWidget):
+    def __init__(self, settings):
+        super().__init__()
+        self.settings = settings
+
+        # One shell per project, each with its own output, kept alive while switching between projects
+        self.sessions: Dict[str, "ShellSession"] = {}
+        self.terminals: Dict[str, Terminal] = {}
+        self.active = False
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.stack = QStackedWidget()
+        layout.addWidget(self.stack)
+
+        input_layout = QHBoxLayout()
+        self.input = ShellInput()
+        self.input.setPlaceholderText("Command")
+        self.input.returnPressed.connect(self.submit_input)
+        self.input.interrupt_requested.connect(self.interrupt)
+        self.input.eof_requested.connect(self.send_eof)
+        input_layout.addWidget(self.input)
+        interrupt_button = QPushButton("Interrupt")
+        interrupt_button.clicked.connect(self.interrupt)
+        restart_button = QPushButton("Restart")
+        restart_button.clicked.connect(self.restart_session)
+        input_layout.addWidget(interrupt_button)
+        input_layout.addWidget(restart_button)
+        layout.addLayout(input_layout)
+
+        self.setLayout(layout)
+
+    def project_key(self) -> str:
+        return os.path.abspath(self.settings.get("project_path") or os.getcwd())
+
+    def current_session(self) -> "Optional[ShellSession]":
+        return self.sessions.get(self.project_key())
+
+    def set_active(self, active: bool):
+        # The shell starts the first time its tab is brought to the front, not with the window
+        self.active = active
+        if active:
+            self.ensure_session()
+            self.input.setFocus()
+
+    def ensure_session(self) -> "ShellSession":
+        key = self.project_key()
+        terminal = self.terminals.get(key)
+        if terminal is None:
+            terminal = Terminal(self.settings.get("terminal_history_size"))
+            terminal.set_font_size(self.settings.get("terminal_font_size"))
+            terminal.viewport().installEventFilter(self)
+            self.stack.addWidget(terminal)
+            self.terminals[key] = terminal
+        self.stack.setCurrentWidget(terminal)
+
+        session = self.sessions.get(key)
+        if session is None or not session.is_running:
+            from .shell_session import ShellSession
+            shell = self.settings.get("default_shell")
+            session = ShellSession(shell, key, self)
+            session.output_received.connect(terminal.append_stream)
+            session.finished.connect(lambda code: terminal.append_output(f"Shell exited with code {code}"))
+            try:
+                session.start(*self.terminal_size(terminal))
+            except Exception as e:
+                terminal.append_output(f"Could not start {shell}: {str(e)}")
+            self.sessions[key] = session
+        return session
+
+    def terminal_size(self, terminal: Terminal) -> tuple:
+        metrics = terminal.fontMetrics()
+        viewport = terminal.viewport()
+        return (max(1, viewport.height() // metrics.lineSpacing()),
+                max(1, viewport.width() // max(1, metrics.horizontalAdvance("M"))))
+
+    def eventFilter(self, obj, event):
+        # Programs in the shell see the window size of the visible output area
+        if event.type() == QEvent.Type.Resize:
+            self.update_sizes()
+        return False
+
+    def update_sizes(self):
+        for key, terminal in self.terminals.items():
+            if key in self.sessions:
+                self.sessions[key].resize(*self.terminal_size(terminal))
+
+    def send_text(self, text: str):
+        session = self.ensure_session()
+        if not session.is_running:
+            return
+        for line in text.splitlines():
+            self.input.add_history(line)
+        session.write(text if text.endswith("\n") else text + "\n")
+
+    def submit_input(self):
+        text = self.input.text()
+        self.input.clear()
+        self.send_text(text)
+
+    def interrupt(self):
+        session = self.current_session()
+        if session is not None:
+            session.interrupt()
+
+    def send_eof(self):
+        session = self.current_session()
+        if session is not None:
+            session.send_eof()
+
+    def restart_session(self):
+        # A fresh shell with the current settings, in case the old one hung or the shell setting changed
+        session = self.sessions.pop(self.project_key(), None)
+        if session is not None:
+            session.finished.disconnect()
+            session.close()
+        self.ensure_session()
+
+    def on_project_changed(self):
+        if self.active:
+            self.ensure_session()
+
+    def set_history_size(self, history_size: int):
+        for terminal in self.terminals.values():
+            terminal.set_history_size(history_size)
+
+    def set_font_size(self, font_size: int):
+        for terminal in self.terminals.values():
+            terminal.set_font_size(font_size)
+        self.update_sizes()
+
+    def close_sessions(self):
+        for session in self.sessions.values():
+            session.finished.disconnect()
+            session.close()
+        self.sessions.clear()
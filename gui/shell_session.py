@@ -0,0 +1,174 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, pty, fcntl, codecs, signal, struct, termios, subprocess
+from typing import Optional
+from PyQt6.QtCore import pyqtSignal, QObject, QSocketNotifier
+
+class ShellSession(QObject):
+    output_received = pyqtSignal(str)
+    finished = pyqtSignal(int)
+
+    # Bytes read per wakeup, a shell flooding output still lets the event loop breathe between reads
+    READ_SIZE = 65536
+    MAX_READ_PER_WAKEUP = 1024 * 1024
+
+    def __init__(self, shell: str, cwd: Optional[str] = None, parent=None):
+        super().__init__(parent)
+        self.shell = shell
+        self.cwd = cwd
+        self.process: Optional[subprocess.Popen] = None
+        self.master_fd: Optional[int] = None
+        self.read_notifier: Optional[QSocketNotifier] = None
+        self.write_notifier: Optional[QSocketNotifier] = None
+        self.pending_input = b""
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    @property
+    def is_running(self) -> bool:
+        return self.process is not None and self.master_fd is not None and self.process.poll() is None
+
+    def start(self, rows: int = 24, columns: int = 80):
+        master_fd, slave_fd = pty.openpty()
+        # The terminal widget shows colors but does not move the cursor, programs are told as much
+        env = dict(os.environ, TERM="dumb", PAGER="cat", GIT_PAGER="cat")
+        try:
+            self.resize(rows, columns, master_fd)
+            self.process = subprocess.Popen(
+                [self.shell],
+                stdin=slave_fd,
+                stdout=slave_fd,
+                stderr=slave_fd,
+                cwd=self.cwd or None,
+                env=env,
+                start_new_session=True,
+                preexec_fn=self._set_controlling_terminal
+            )
+        except Exception:
+            os.close(master_fd)
+            raise
+        finally:
+            os.close(slave_fd)
+
+        # Reads and writes never block, the notifiers call back from the GUI event loop when the pty is ready
+        os.set_blocking(master_fd, False)
+        self.master_fd = master_fd
+        self.read_notifier = QSocketNotifier(master_fd, QSocketNotifier.Type.Read, self)
+        self.read_notifier.activated.connect(self.read_output)
+        self.write_notifier = QSocketNotifier(master_fd, QSocketNotifier.Type.Write, self)
+        self.write_notifier.setEnabled(False)
+        self.write_notifier.activated.connect(self.write_pending)
+
+    @staticmethod
+    def _set_controlling_terminal():
+        # Runs in the child after setsid, so Ctrl+C and window size changes reach the shell's foreground job
+        fcntl.ioctl(0, termios.TIOCSCTTY, 0)
+
+    def read_output(self):
+        chunks = []
+        total = 0
+        closed = False
+        while total < self.MAX_READ_PER_WAKEUP:
+            try:
+                data = os.read(self.master_fd, self.READ_SIZE)
+            except BlockingIOError:
+                break
+            except OSError:
+                # EIO once the shell has exited and nothing holds the other side open
+                data = b""
+            if not data:
+                closed = True
+                break
+            chunks.append(data)
+            total += len(data)
+
+        text = self.decoder.decode(b"".join(chunks), final=closed)
+        if text:
+            self.output_received.emit(text)
+        if closed:
+            self.finished.emit(self._release())
+
+    def write(self, text: str):
+        if self.master_fd is None:
+            return
+        self.pending_input += text.encode()
+        self.write_pending()
+
+    def write_pending(self):
+        while self.pending_input:
+            try:
+                written = os.write(self.master_fd, self.pending_input)
+            except BlockingIOError:
+                break
+            except OSError:
+                self.pending_input = b""
+                break
+            self.pending_input = self.pending_input[written:]
+        # Whatever the pty did not take yet goes out when it has room again
+        self.write_notifier.setEnabled(bool(self.pending_input))
+
+    def interrupt(self):
+        # The pty turns these into SIGINT and end of input for the foreground job
+        self.write("\x03")
+
+    def send_eof(self):
+        self.write("\x04")
+
+    def resize(self, rows: int, columns: int, master_fd: Optional[int] = None):
+        master_fd = self.master_fd if master_fd is None else master_fd
+        if master_fd is None:
+            return
+        try:
+            fcntl.ioctl(master_fd, termios.TIOCSWINSZ, struct.pack("HHHH", rows, columns, 0, 0))
+        except OSError:
+            pass
+
+    def close(self):
+        if self.process is not None and self.process.poll() is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGHUP)
+                self.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                try:
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            except OSError:
+                # Already gone, or the shell moved itself to a group we may not signal
+                pass
+        self._release()
+
+    def _release(self) -> int:
+        for notifier in (self.read_notifier, self.write_notifier):
+            if notifier is not None:
+                notifier.setEnabled(False)
+                notifier.deleteLater()
+        self.read_notifier = self.write_notifier = None
+        if self.master_fd is not None:
+            os.close(self.master_fd)
+            self.master_fd = None
+        self.pending_input = b""
+
+        if self.process is None:
+            return -1
+        try:
+            return self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            # The shell closed its terminal but has not exited, it will not be heard from again
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            return self.process.wait()
@@ -13,34 +13,305 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from header_imports import *
+import re
+import time
+from bisect import bisect_right
+from collections import deque
+from itertools import accumulate
+from operator import itemgetter
+from typing import Dict, List
+from PyQt6.QtWidgets import QPlainTextEdit
+from PyQt6.QtCore import QTimer
+from PyQt6.QtGui import QColor, QFont, QTextCharFormat, QTextCursor
 
-class Terminal(QTextEdit):
-    def __init__(self):
+from .ansi_parser import AnsiParser
+
+class Terminal(QPlainTextEdit):
+    BACKGROUND = "#1E1E1E"
+    FOREGROUND = "#FFFFFF"
+
+    # Interactive output is shown as soon as it arrives unless the last flush was more recent than this
+    STREAM_FLUSH_INTERVAL = 0.01
+
+    # Distinct attribute sets kept as formats, truecolor output could otherwise grow this without bound
+    MAX_FORMATS = 256
+
+    # Carriage returns and backspaces move the cursor back over the current line, as bash does when it redraws the prompt
+    CURSOR_CONTROL = re.compile(r"([\r\b])")
+    NEWLINE = re.compile("\n")
+
+    # A flush with more attribute spans than this is inserted as plain text, each line gets its
+    # colors once it is scrolled into view. Inserting span by span costs about as much per span as per line
+    DEFERRED_FORMAT_RUNS = 64
+
+    def __init__(self, history_size: int = 1000):
         super().__init__()
+        self.history_size = history_size
+
+        # Colors and styles carry over between chunks, so output is parsed as it arrives
+        self.ansi_parser = AnsiParser()
+        self.formats: Dict[tuple, QTextCharFormat] = {}
+
+        # Parsed output is coalesced here and flushed once per frame
+        self.pending_output: deque = deque(maxlen=history_size)
+        # Spans inserted without their formats, as [first line, last line, first column, spans, text, span starts,
+        # line starts]. Lines are numbered from the top of the document when it was last cleared, first_line is the top block's
+        self.deferred_spans: deque = deque()
+        self.first_line = 0
+        self.inserting = False
+        self.line_open = False
+        self.last_flush = 0.0
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(33)
+        self.flush_timer.timeout.connect(self.flush_output)
+
         self.setup_ui()
+        self.output_cursor = QTextCursor(self.document())
+        self.format_cursor = QTextCursor(self.document())
+        self.verticalScrollBar().valueChanged.connect(self.format_visible_blocks)
+        self.set_history_size(history_size)
 
     def setup_ui(self):
         # Set read-only mode
         self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
 
         # Set monospace font
         font = QFont("Courier New", 10)
         self.setFont(font)
 
         # Set background and text colors
-        self.setStyleSheet("""
-            QTextEdit {
-                background-color: #1E1E1E;
-                color: #FFFFFF;
+        self.setStyleSheet(f"""
+            QPlainTextEdit {{
+                background-color: {self.BACKGROUND};
+                color: {self.FOREGROUND};
                 border: none;
-            }
+            }}
         """)
 
+    def set_history_size(self, history_size: int):
+        self.history_size = history_size
+        block_count = self.document().blockCount()
+        self.setMaximumBlockCount(history_size)
+        self.first_line += block_count - self.document().blockCount()
+        self.pending_output = deque(self.pending_output, maxlen=history_size)
+
+    def set_font_size(self, font_size: int):
+        font = self.font()
+        font.setPointSize(font_size)
+        self.setFont(font)
+
     def append_output(self, text):
-        self.moveCursor(QTextCursor.MoveOperation.End)
-        self.insertPlainText(text + '\n')
-        self.moveCursor(QTextCursor.MoveOperation.End)
+        # Each call is shown as its own line
+        self.queue_output(text, True)
 
-    def clear_output(self):
+    def append_stream(self, text):
+        # Raw output from an interactive session, continuing wherever the last chunk stopped
+        self.queue_output(text, False)
+        if time.monotonic() - self.last_flush >= self.STREAM_FLUSH_INTERVAL:
+            # Echoed input, prompts and command output show right away, a flood waits for the timer
+            self.flush_output()
+
+    def queue_output(self, text: str, new_line: bool):
+        # Only the tail of a large chunk could ever be shown, the full output is in the run's log file
+        if text.count("\n") >= self.history_size:
+            lines = text.rsplit("\n", self.history_size)
+            self.ansi_parser.feed("".join(lines[:-self.history_size]))
+            text = "\n".join(lines[-self.history_size:])
+        self.pending_output.append((self.ansi_parser.feed(text), new_line))
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush_output(self):
+        if not self.pending_output:
+            self.flush_timer.stop()
+            return
+
+        # A line entry starts on a new line unless the output before it already ended one
+        default = self.ansi_parser.DEFAULT_ATTRIBUTES
+        spans: List[tuple] = []
+        line_open = self.line_open
+        for chunk, new_line in self.pending_output:
+            if new_line:
+                if line_open:
+                    spans.append(("\n", default))
+                line_open = True
+            elif chunk:
+                line_open = not chunk[-1][0].endswith("\n")
+            spans.extend(chunk)
+        self.pending_output.clear()
+        self.line_open = line_open
+        self.last_flush = time.monotonic()
+        text = "".join(map(itemgetter(0), spans))
+        newlines = text.count("\n")
+
+        # Anything beyond the history size would be trimmed right after insertion, and if the new
+        # output fills the history on its own the old lines are cleared rather than trimmed block by block
+        excess = newlines - self.history_size + 1
+        if excess > 0:
+            self.reset_document()
+            cut = len(text) - len(text.split("\n", excess)[-1])
+            # Usually only the first few lines go, so the spans they cover are counted from the front
+            index = begin = 0
+            while index < len(spans) and begin + len(spans[index][0]) <= cut:
+                begin += len(spans[index][0])
+                index += 1
+            spans = spans[index:]
+            if spans and cut > begin:
+                spans[0] = (spans[0][0][cut - begin:], spans[0][1])
+            text = text[cut:]
+            newlines -= excess
+
+        scroll_bar = self.verticalScrollBar()
+        at_bottom = scroll_bar.value() == scroll_bar.maximum()
+        cursor = self.output_cursor
+        block_count = self.document().blockCount()
+        self.inserting = True
+        cursor.beginEditBlock()
+        if len(spans) > self.DEFERRED_FORMAT_RUNS and cursor.atEnd() and "\r" not in text and "\b" not in text:
+            # The line the output continues is formatted again with the new spans included
+            cursor.block().setUserState(-1)
+            first_line = self.first_line + cursor.blockNumber()
+            self.deferred_spans.append([first_line, first_line + newlines, cursor.positionInBlock(), spans, text, None, None])
+            cursor.insertText(text, self.char_format(default))
+        else:
+            # Neighbouring spans with the same attributes are inserted as one
+            runs: List[list] = []
+            for span_text, attributes in spans:
+                if runs and runs[-1][1] == attributes:
+                    runs[-1][0].append(span_text)
+                else:
+                    runs.append([[span_text], attributes])
+            for texts, attributes in runs:
+                run_text = "".join(texts)
+                if cursor.atEnd() and "\r" not in run_text and "\b" not in run_text:
+                    cursor.insertText(run_text, self.char_format(attributes))
+                else:
+                    # Colors still owed to the line go in first, the overwrite keeps whatever it does not cover
+                    self.format_block(cursor.block())
+                    self.overwrite(cursor, run_text, self.char_format(attributes))
+        cursor.endEditBlock()
+        # Blocks over the maximum count went from the top as the edit ended, the scrolling that
+        # caused formats nothing until the line numbers are right again
+        self.inserting = False
+        self.first_line += block_count + newlines - self.document().blockCount()
+
+        while self.deferred_spans and self.deferred_spans[0][1] < self.first_line:
+            self.deferred_spans.popleft()
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
+        self.format_visible_blocks()
+
+    def format_visible_blocks(self):
+        if not self.deferred_spans or self.inserting:
+            return
+        block = self.firstVisibleBlock()
+        offset = self.contentOffset()
+        height = self.viewport().height()
+        self.format_cursor.beginEditBlock()
+        while block.isValid() and self.blockBoundingGeometry(block).translated(offset).top() <= height:
+            self.format_block(block)
+            block = block.next()
+        self.format_cursor.endEditBlock()
+
+    def format_block(self, block):
+        # Blocks start with state -1, once formatted the line's deferred spans are done with
+        if block.userState() != -1 or not self.deferred_spans:
+            return
+        block.setUserState(0)
+        line = self.first_line + block.blockNumber()
+        default = self.ansi_parser.DEFAULT_ATTRIBUTES
+        for record in reversed(self.deferred_spans):
+            first_line, last_line, first_column, spans, text, span_starts, line_starts = record
+            if last_line < line:
+                break
+            if first_line > line:
+                continue
+
+            # Where each span and each line starts in the inserted text, worked out once the first line is shown
+            if span_starts is None:
+                span_starts = record[5] = list(accumulate(map(len, map(itemgetter(0), spans)), initial=0))
+                line_starts = record[6] = [0] + [match.end() for match in self.NEWLINE.finditer(text)]
+            number = line - first_line
+            start = line_starts[number]
+            end = line_starts[number + 1] - 1 if number + 1 < len(line_starts) else len(text)
+            line_text = text[start:end]
+            base = block.position() + (first_column if number == 0 else 0)
+
+            index = bisect_right(span_starts, start) - 1
+            while index < len(spans) and span_starts[index] < end:
+                attributes = spans[index][1]
+                if attributes != default:
+                    segment_start = max(span_starts[index], start) - start
+                    segment_end = min(span_starts[index + 1], end) - start
+                    if segment_end > segment_start:
+                        if not line_text.isascii():
+                            segment_start, segment_end = (len(line_text[:offset].encode("utf-16-le")) // 2
+                                                          for offset in (segment_start, segment_end))
+                        self.format_cursor.setPosition(base + segment_start)
+                        self.format_cursor.setPosition(base + segment_end, QTextCursor.MoveMode.KeepAnchor)
+                        self.format_cursor.setCharFormat(self.char_format(attributes))
+                index += 1
+
+    def overwrite(self, cursor: QTextCursor, text: str, char_format: QTextCharFormat):
+        # The cursor only ever moves within the last line, so text after a newline is always appended
+        for piece in self.CURSOR_CONTROL.split(text):
+            if piece == "\r":
+                cursor.movePosition(QTextCursor.MoveOperation.StartOfBlock)
+            elif piece == "\b":
+                if not cursor.atBlockStart():
+                    cursor.movePosition(QTextCursor.MoveOperation.Left)
+            elif piece:
+                line, newline, rest = piece.partition("\n")
+                if line:
+                    block = cursor.block()
+                    remaining = block.position() + block.length() - 1 - cursor.position()
+                    if remaining > 0:
+                        cursor.movePosition(QTextCursor.MoveOperation.Right, QTextCursor.MoveMode.KeepAnchor,
+                                            min(len(line), remaining))
+                    cursor.insertText(line, char_format)
+                if newline:
+                    cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock)
+                    cursor.insertText(newline + rest, char_format)
+
+    def char_format(self, attributes: tuple) -> QTextCharFormat:
+        char_format = self.formats.get(attributes)
+        if char_format is not None:
+            return char_format
+
+        foreground, background, bold, italic, underline, inverse = attributes
+        if inverse:
+            foreground, background = background or self.BACKGROUND, foreground or self.FOREGROUND
+        char_format = QTextCharFormat()
+        if foreground:
+            char_format.setForeground(QColor(foreground))
+        if background:
+            char_format.setBackground(QColor(background))
+        if bold:
+            char_format.setFontWeight(QFont.Weight.Bold)
+        if italic:
+            char_format.setFontItalic(True)
+        if underline:
+            char_format.setFontUnderline(True)
+
+        if len(self.formats) >= self.MAX_FORMATS:
+            self.formats.clear()
+        self.formats[attributes] = char_format
+        return char_format
+
+    def reset_document(self):
+        self.deferred_spans.clear()
+        self.first_line = 0
         self.clear()
+        self.output_cursor = QTextCursor(self.document())
+        self.format_cursor = QTextCursor(self.document())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.format_visible_blocks()
+
+    def clear_output(self):
+        self.pending_output.clear()
+        self.ansi_parser.reset()
+        self.line_open = False
+        self.reset_document()
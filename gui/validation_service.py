@@ -0,0 +1,76 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import threading
+from typing import Optional, Dict
+from PyQt6.QtCore import pyqtSignal, QObject, QTimer
+
+from .script_validator import ScriptValidator
+
+class ValidationService(QObject):
+    buffer_validated = pyqtSignal(object, int, object)
+    project_validated = pyqtSignal(str, object)
+
+    # Quiet period after the last keystroke before the buffer is checked
+    DEBOUNCE_MS = 500
+
+    def __init__(self, validator: ScriptValidator, parent=None):
+        super().__init__(parent)
+        self.validator = validator
+        self.scheduled: Dict[int, object] = {}
+
+        # Latest snapshot per editor, a newer one replaces a check that has not started yet
+        self.pending: Dict[int, tuple] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(self.DEBOUNCE_MS)
+        self.debounce_timer.timeout.connect(self.submit_scheduled)
+
+    def schedule(self, editor):
+        self.scheduled[id(editor)] = editor
+        self.debounce_timer.start()
+
+    def forget(self, editor):
+        self.scheduled.pop(id(editor), None)
+        with self._condition:
+            self.pending.pop(id(editor), None)
+
+    def submit_scheduled(self):
+        # Snapshot on the GUI thread, the shell runs on the validation thread
+        with self._condition:
+            for key, editor in self.scheduled.items():
+                self.pending[key] = (editor, editor.document().revision(), editor.toPlainText())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="bellos-validate", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        self.scheduled.clear()
+
+    def validate_project(self, root: str):
+        def run():
+            self.project_validated.emit(root, self.validator.validate_project(root))
+
+        threading.Thread(target=run, name="bellos-validate-project", daemon=True).start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self.pending:
+                    self._condition.wait()
+                _, (editor, revision, text) = self.pending.popitem()
+            self.buffer_validated.emit(editor, revision, self.validator.validate(text))
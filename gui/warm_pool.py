@@ -0,0 +1,155 @@
+# Copyright (C) 2024 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, uuid, signal, threading, subprocess
+from collections import deque
+from typing import Optional
+
+class WarmWorker:
+    def __init__(self, shell: str):
+        self.shell = shell
+        # Printed after each script so its output can be told apart from the end of the run
+        self.marker = f"__bellos_done_{uuid.uuid4().hex}__".encode()
+        self.jobs_run = 0
+        self.cpu_baseline: Optional[tuple] = None
+        self.process = subprocess.Popen([shell], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE, start_new_session=True)
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    @staticmethod
+    def quote(text: str) -> str:
+        return "'" + text.replace("'", "'\\''") + "'"
+
+    def submit(self, script_content: str, cwd: str):
+        # A subshell keeps the script's variables, traps and directory changes away from the next run
+        marker = self.marker.decode()
+        command = (f"( cd -- {self.quote(cwd)} && eval {self.quote(script_content)} ) </dev/null\n"
+                   f"printf '%s %s\\n' {marker} \"$?\"\n"
+                   f"printf '%s\\n' {marker} >&2\n")
+        self.cpu_baseline = self.children_cpu_times()
+        self.process.stdin.write(command.encode())
+        self.process.stdin.flush()
+
+    def children_cpu_times(self) -> Optional[tuple]:
+        # CPU time of the worker's reaped children, the subshells it ran, from /proc
+        try:
+            with open(f"/proc/{self.pid}/stat", 'rb') as f:
+                fields = f.read().rsplit(b")", 1)[1].split()
+        except (OSError, IndexError):
+            return None
+        ticks = os.sysconf("SC_CLK_TCK")
+        return int(fields[13]) / ticks, int(fields[14]) / ticks
+
+    def stop(self):
+        for pipe in (self.process.stdin, self.process.stdout, self.process.stderr):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        try:
+            self.process.wait()
+        except ChildProcessError:
+            pass
+
+
+class WarmPool:
+    def __init__(self, shell: str, size: int, max_jobs: int):
+        self.shell = shell
+        self.size = size
+        self.max_jobs = max_jobs
+        self.idle: deque = deque()
+        # Workers handed out and not yet back, together with idle ones they make up the pool
+        self.busy = 0
+        self.closed = False
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._refilling = False
+        self.refill()
+
+    def acquire(self) -> Optional[WarmWorker]:
+        # None when no worker is ready, the caller spawns the script cold instead
+        worker = None
+        with self._lock:
+            while self.idle:
+                candidate = self.idle.popleft()
+                if candidate.process.poll() is None:
+                    worker = candidate
+                    break
+                candidate.stop()
+            if worker is not None:
+                self.busy += 1
+                self.hits += 1
+            else:
+                self.misses += 1
+        self.refill()
+        return worker
+
+    def release(self, worker: WarmWorker):
+        worker.jobs_run += 1
+        with self._lock:
+            if not self.closed and worker.jobs_run < self.max_jobs:
+                self.busy -= 1
+                self.idle.append(worker)
+                return
+        self.discard(worker)
+
+    def discard(self, worker: WarmWorker):
+        with self._lock:
+            self.busy -= 1
+        worker.stop()
+        self.refill()
+
+    def refill(self):
+        # Spawning happens off the caller's thread, a run never waits for the pool
+        with self._lock:
+            if self._refilling or self.closed or len(self.idle) + self.busy >= self.size:
+                return
+            self._refilling = True
+        threading.Thread(target=self._refill, name="bellos-warm-pool", daemon=True).start()
+
+    def _refill(self):
+        try:
+            while True:
+                with self._lock:
+                    if self.closed or len(self.idle) + self.busy >= self.size:
+                        return
+                try:
+                    worker = WarmWorker(self.shell)
+                except Exception:
+                    return
+                with self._lock:
+                    if self.closed:
+                        break
+                    self.idle.append(worker)
+            worker.stop()
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            workers = list(self.idle)
+            self.idle.clear()
+        for worker in workers:
+            worker.stop()
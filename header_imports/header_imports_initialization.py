@@ -1,20 +0,0 @@
-# Copyright (C) 2025 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
-
-# This program is free software: you can redistribute it and/or modify
-# it under the terms of the GNU General Public License as published by
-# the Free Software Foundation, either version 3 of the License, or
-# (at your option) any later version.
-
-# This program is distributed in the hope that it will be useful,
-# but WITHOUT ANY WARRANTY; without even the implied warranty of
-# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
-# GNU General Public License for more details.
-
-# You should have received a copy of the GNU General Public License
-# along with this program.  If not, see <https://www.gnu.org/licenses/>.
-
-from script_editor import ScriptEditor
-from file_explorer import FileExplorer
-from terminal import Terminal
-from project_system import ProjectSettings
-from script_manager import ScriptManager
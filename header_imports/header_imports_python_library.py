@@ -1,26 +0,0 @@
-# Copyright (C) 2025 Bellande Application Interoperability Xenogen Research Innovation Center, Ronaldson Bellande
-
-# This program is free software: you can redistribute it and/or modify
-# it under the terms of the GNU General Public License as published by
-# the Free Software Foundation, either version 3 of the License, or
-# (at your option) any later version.
-
-# This program is distributed in the hope that it will be useful,
-# but WITHOUT ANY WARRANTY; without even the implied warranty of
-# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
-# GNU General Public License for more details.
-
-# You should have received a copy of the GNU General Public License
-# along with this program.  If not, see <https://www.gnu.org/licenses/>.
-
-import os, sys, json, threading, signal, subprocess
-from typing import Optional, Dict, List
-from PyQt6.QtWidgets import (QMainWindow, QDockWidget, QFileDialog, QMessageBox, 
-                             QTabWidget, QTreeView, QAbstractItemView, QWidget, 
-                             QVBoxLayout, QFormLayout, QLineEdit, QPushButton, 
-                             QComboBox, QSpinBox, QCheckBox, QFileDialog, QMessageBox, 
-                             QHBoxLayout, QPlainTextEdit, QTextEdit, QApplication)
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import (QStandardItemModel, QStandardItem, QTextCharFormat, 
-                         QSyntaxHighlighter, QColor, QFont, QTextCursor, QFont,
-                         QAction)